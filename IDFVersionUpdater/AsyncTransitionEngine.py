@@ -0,0 +1,208 @@
+"""
+An asyncio engine for running transition chains, for embedding the transitions in asyncio applications.
+This module needs Python 3.7 or newer, unlike the rest of the package, so it is only imported by code that uses it.
+"""
+import asyncio
+import collections
+import os
+import shutil
+import time
+
+from EnergyPlusVersion import EnergyPlusVersion
+from PreflightCheck import preflight_check
+from TransitionOutput import MAX_OUTPUT_LINES, parse_progress
+from TransitionWorkspace import TransitionWorkspace
+
+# The kinds of progress event published by the engine
+EVENT_STARTED = 'started'
+EVENT_STEP_STARTED = 'step_started'
+EVENT_PROGRESS = 'progress'
+EVENT_STEP_FINISHED = 'step_finished'
+EVENT_FINISHED = 'finished'
+
+
+class TransitionResult(object):
+    """
+    This class holds the outcome of transitioning one file with :py:meth:`AsyncTransitionEngine.transition`
+
+    :ivar input_path: Absolute path to the original input file
+    :ivar output_path: Absolute path to the transitioned file, or None if the transition failed
+    :ivar source_version: The :py:class:`EnergyPlusVersion <EnergyPlusVersion.EnergyPlusVersion>` of the input file
+    :ivar target_version: The :py:class:`EnergyPlusVersion <EnergyPlusVersion.EnergyPlusVersion>` asked for
+    :ivar steps: The list of :py:class:`TransitionBinary <TransitionBinary.TransitionBinary>` instances run
+    :ivar success: True if the file reached the target version
+    :ivar message: A human friendly description of the outcome
+    :ivar output: The last lines written by the final transition program run, as bytes
+    :ivar elapsed: The wall clock time in seconds spent on the file
+    """
+
+    def __init__(self, input_path, output_path, source_version, target_version):
+        self.input_path = input_path
+        self.output_path = output_path
+        self.source_version = source_version
+        self.target_version = target_version
+        self.steps = []
+        self.success = False
+        self.message = ''
+        self.output = b''
+        self.elapsed = 0.0
+
+
+class ProgressEvent(object):
+    """
+    This class describes something that happened while the engine was transitioning a file
+
+    :ivar kind: One of the EVENT_* constants in this module
+    :ivar input_path: Absolute path to the file being transitioned
+    :ivar transition: The :py:class:`TransitionBinary <TransitionBinary.TransitionBinary>` the event is about, if any
+    :ivar fraction_complete: For progress events, the fraction of the running transition completed
+    :ivar message: A human friendly description of the event
+    """
+
+    def __init__(self, kind, input_path, transition=None, fraction_complete=None, message=''):
+        self.kind = kind
+        self.input_path = input_path
+        self.transition = transition
+        self.fraction_complete = fraction_complete
+        self.message = message
+
+
+class AsyncTransitionEngine(object):
+    """
+    This class runs transition chains as asyncio tasks, so many files can be transitioned concurrently from within an
+    event loop.  Each file runs in its own :py:class:`TransitionWorkspace <TransitionWorkspace.TransitionWorkspace>`,
+    and a semaphore bounds how many transition programs run at once across all files.
+    Cancelling the task awaiting :py:meth:`transition` kills the running transition program and stops the rest of its
+    chain, and the scratch directory is removed either way.
+
+    :param ep_path: An :py:class:`EnergyPlusPath <EnergyPlusPath.EnergyPlusPath>` instance to plan chains with
+    :param max_concurrent: The number of transition programs to run at once, defaulting to the number of processors
+    :param scratch_parent: The directory to create each file's scratch directory in, defaulting to the system temp
+        directory
+    """
+
+    def __init__(self, ep_path, max_concurrent=None, scratch_parent=None):
+        self.ep_path = ep_path
+        self.max_concurrent = max_concurrent or os.cpu_count() or 1
+        self.scratch_parent = scratch_parent
+        self._semaphore = None
+        self._subscribers = []
+
+    async def transition(self, path, target=None, output_path=None):
+        """
+        This function transitions one file up to a target version, running each transition in its chain in turn
+
+        :param path: Path to the input file, which is never modified
+        :param target: The :py:class:`EnergyPlusVersion <EnergyPlusVersion.EnergyPlusVersion>` (or version text, such
+            as '9.0') to bring the file up to, defaulting to the newest installation's version
+        :param output_path: Path to write the transitioned file to, defaulting to <stem>_V<version><extension> next to
+            the input file; the error file from the last transition is written alongside as .VCpErr
+        :rtype: A :py:class:`TransitionResult`
+        """
+        start = time.time()
+        path = os.path.abspath(path)
+        if target is None:
+            target = self.ep_path.latest_version
+        elif not isinstance(target, EnergyPlusVersion):
+            target = EnergyPlusVersion.parse(str(target))
+        if output_path is None:
+            stem, extension = os.path.splitext(path)
+            output_path = '%s_V%d-%d-%d%s' % ((stem,) + target.as_tuple() + (extension,))
+        # the check reads the whole file, so it runs on a worker thread rather than holding up the event loop
+        preflight = await asyncio.get_running_loop().run_in_executor(
+            None, lambda: preflight_check(path, self.ep_path, target, self.scratch_parent))
+        result = TransitionResult(path, None, preflight.version, target)
+        if not preflight.ok:
+            result.message = '; '.join(preflight.problems)
+            return result
+        chain = preflight.chain
+        self._publish(ProgressEvent(EVENT_STARTED, path, message="%s -> %s" % (result.source_version, target)))
+        workspace = TransitionWorkspace(self.ep_path.transition_directory, self.scratch_parent)
+        try:
+            run_dir = workspace.create()
+            for tr in chain:
+                transition_directory = os.path.dirname(tr.full_path_to_binary)
+                if transition_directory != self.ep_path.transition_directory:
+                    workspace.add_resources(transition_directory)
+            file_name = os.path.basename(path)
+            shutil.copy(path, run_dir)
+            for tr in chain:
+                result.steps.append(tr)
+                if not await self._run_step(tr, run_dir, file_name, result):
+                    result.message = "Failed Transition %s -> %s" % (tr.source_version, tr.target_version)
+                    break
+            else:
+                shutil.copyfile(os.path.join(run_dir, file_name), output_path)
+                result.output_path = os.path.abspath(output_path)
+                result.success = True
+                result.message = "Transitioned %s -> %s" % (result.source_version, target)
+            error_file = os.path.join(run_dir, os.path.splitext(file_name)[0] + '.VCpErr')
+            if os.path.exists(error_file):
+                shutil.copyfile(error_file, os.path.splitext(output_path)[0] + '.VCpErr')
+        finally:
+            workspace.cleanup()
+            result.elapsed = time.time() - start
+        self._publish(ProgressEvent(EVENT_FINISHED, path, message=result.message))
+        return result
+
+    async def events(self):
+        """
+        This function yields the progress events of every transition run by the engine, from the time of the call
+        until :py:meth:`close` is called.  It is an asynchronous iterator, used as ``async for event in
+        engine.events()``.
+        """
+        subscriber = asyncio.Queue()
+        self._subscribers.append(subscriber)
+        try:
+            while True:
+                event = await subscriber.get()
+                if event is None:
+                    return
+                yield event
+        finally:
+            self._subscribers.remove(subscriber)
+
+    def close(self):
+        """
+        This function ends every iteration over :py:meth:`events`
+        """
+        for subscriber in self._subscribers:
+            subscriber.put_nowait(None)
+
+    async def _run_step(self, tr, run_dir, file_name, result):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)  # created here to belong to the running loop
+        async with self._semaphore:
+            self._publish(ProgressEvent(EVENT_STEP_STARTED, result.input_path, tr))
+            process = await asyncio.create_subprocess_exec(
+                os.path.join(run_dir, tr.binary_name), file_name, cwd=run_dir,
+                stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+            output = collections.deque(maxlen=MAX_OUTPUT_LINES)
+            try:
+                await asyncio.gather(self._read_output(process.stdout, output, tr, result),
+                                     self._read_output(process.stderr, output, tr, result))
+                return_code = await process.wait()
+            except asyncio.CancelledError:
+                if process.returncode is None:
+                    process.kill()
+                    await process.wait()
+                raise
+            result.output = b''.join(output)
+        self._publish(ProgressEvent(EVENT_STEP_FINISHED, result.input_path, tr, message=str(return_code)))
+        return return_code == 0
+
+    async def _read_output(self, stream, output, tr, result):
+        last_percent = None
+        while True:
+            line = await stream.readline()
+            if not line:
+                return
+            output.append(line)
+            fraction = parse_progress(line.decode('utf-8', 'replace'))
+            if fraction is not None and int(fraction * 100) != last_percent:
+                last_percent = int(fraction * 100)
+                self._publish(ProgressEvent(EVENT_PROGRESS, result.input_path, tr, fraction))
+
+    def _publish(self, event):
+        for subscriber in self._subscribers:
+            subscriber.put_nowait(event)
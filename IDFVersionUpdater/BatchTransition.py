@@ -0,0 +1,323 @@
+import fnmatch
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from PreflightCheck import preflight_check
+from TransitionCache import CACHED_ARTIFACT_EXTENSIONS
+from TransitionRunThread import TransitionRunThread
+from TransitionScheduler import TransitionScheduler, queue
+
+# These are the input file types that the transition programs know how to process
+INPUT_FILE_PATTERNS = ['*.idf', '*.imf']
+
+
+class BatchFileResult(object):
+    """
+    This class holds the outcome of transitioning a single file as part of a batch
+
+    :param input_path: Absolute path to the original input file
+    :param relative_path: The path of the input file relative to the root of the batch
+
+    :ivar size_bytes: The size of the original input file in bytes
+    :ivar source_version: The version detected in the input file, or None if it could not be determined
+    :ivar target_version: The version the file was transitioned to, or None if no transitions were run
+    :ivar steps: The number of transition programs run on this file
+    :ivar success: True if the file was transitioned successfully or was already up to date
+    :ivar message: A human friendly description of the outcome
+    :ivar output_path: Absolute path to the transitioned file, or None if the transition failed
+    :ivar elapsed: The wall clock time in seconds spent on this file
+    :ivar log: The status messages reported while transitioning this file
+    :ivar bytes_copied: The number of bytes copied to keep intermediate versions of this file
+    :ivar bytes_avoided: The number of bytes of intermediate versions of this file kept without copying
+    :ivar report: The :py:class:`RunReport <TransitionReport.RunReport>` of the transitions run on this file, or None
+        if none were started
+    """
+
+    def __init__(self, input_path, relative_path):
+        self.input_path = input_path
+        self.relative_path = relative_path
+        self.size_bytes = os.path.getsize(input_path)
+        self.source_version = None
+        self.target_version = None
+        self.steps = 0
+        self.success = False
+        self.message = ''
+        self.output_path = None
+        self.elapsed = 0.0
+        self.log = []
+        self.bytes_copied = 0
+        self.bytes_avoided = 0
+        self.report = None
+
+    def to_dict(self):
+        """
+        This function describes the outcome for the file in a form which can be written out as JSON
+
+        :rtype: A dictionary of JSON-serializable values
+        """
+        return {
+            'input_path': self.input_path,
+            'relative_path': self.relative_path,
+            'size_bytes': self.size_bytes,
+            'source_version': str(self.source_version) if self.source_version else None,
+            'target_version': str(self.target_version) if self.target_version else None,
+            'steps': self.steps,
+            'success': self.success,
+            'message': self.message,
+            'output_path': self.output_path,
+            'elapsed': self.elapsed,
+            'report': self.report.to_dict() if self.report is not None else None,
+        }
+
+
+class BatchTransition(object):
+    """
+    This class transitions every input file found in a directory tree, running files concurrently on a pool of workers
+
+    :param root_directory: The directory to search recursively for input files
+    :param output_directory: The directory to write transitioned files to, mirroring the layout under root_directory
+    :param ep_path: An :py:class:`EnergyPlusPath <EnergyPlusPath.EnergyPlusPath>` instance describing the installation
+    :param workers: The number of transitions to run at once, defaulting to the number of processors
+    :param keep_old: A boolean flag for whether to keep intermediate versions of each file alongside its output
+    :param scratch_parent: The directory to create each file's private scratch directory in, defaulting to the system
+        temp directory
+    :param queue_factory: A callable returning the queue of ready transition steps; see
+        :py:class:`TransitionScheduler <TransitionScheduler.TransitionScheduler>`
+    :param cache: An optional :py:class:`TransitionCache <TransitionCache.TransitionCache>` to reuse earlier results
+    :param ram_directory: An optional RAM-backed directory, such as /dev/shm, to run each file in when it has room
+    :param compression: When keep_old is set, an optional method from
+        :py:func:`available_compressions <IntermediateArchive.available_compressions>` to store the intermediate
+        versions of each file with
+    :param step_callback: An optional Python function called with the
+        :py:class:`StepReport <TransitionReport.StepReport>` of each transition as soon as it has ended, from whichever
+        worker ran it
+    :param metrics: An optional :py:class:`TransitionMetrics <TransitionMetrics.TransitionMetrics>` instance to count
+        every file and transition in
+    :param shard_workers: The number of processes each large file may be split across when transitions are run in
+        this process by their rule sets, on top of the workers running files at once
+    :param memo_directory: An optional directory to keep the output of transitions run in this process in, so that
+        when a file is run again after being edited only its changed objects are transformed; see
+        :py:func:`transform_file_incremental <IncrementalTransform.transform_file_incremental>`
+
+    :ivar results: A list of :py:class:`BatchFileResult` instances, in order of completion, filled in by :py:meth:`run`
+    :ivar elapsed: The wall clock time in seconds of the whole batch
+    :ivar cancelled: True once :py:meth:`cancel` has been called
+    """
+
+    def __init__(self, root_directory, output_directory, ep_path, workers=None, keep_old=False, scratch_parent=None,
+                 queue_factory=queue.Queue, cache=None, ram_directory=None, compression=None, step_callback=None,
+                 metrics=None, shard_workers=1, memo_directory=None):
+        self.root_directory = os.path.abspath(root_directory)
+        self.output_directory = os.path.abspath(output_directory)
+        self.ep_path = ep_path
+        self.workers = workers
+        self.keep_old = keep_old
+        self.scratch_parent = scratch_parent
+        self.queue_factory = queue_factory
+        self.cache = cache
+        self.ram_directory = ram_directory
+        self.compression = compression
+        self.step_callback = step_callback
+        self.metrics = metrics
+        self.shard_workers = shard_workers
+        self.memo_directory = memo_directory
+        self.results = []
+        self.elapsed = 0.0
+        self.cancelled = False
+        self._results_lock = threading.Lock()
+        self._result_callback = None
+        self._scheduler = None
+
+    @staticmethod
+    def discover_input_files(root_directory):
+        """
+        This function walks a directory tree looking for EnergyPlus input files
+
+        :param root_directory: The directory to search recursively
+        :rtype: A sorted list of absolute paths to every idf and imf file found
+        """
+        found = []
+        for dir_path, dir_names, file_names in os.walk(root_directory):
+            for file_name in file_names:
+                if any(fnmatch.fnmatch(file_name.lower(), pattern) for pattern in INPUT_FILE_PATTERNS):
+                    found.append(os.path.abspath(os.path.join(dir_path, file_name)))
+        return sorted(found)
+
+    def run(self, result_callback=None):
+        """
+        This function transitions all the discovered input files and returns once they are all complete.
+        The files are checked and their chains handed to a
+        :py:class:`TransitionScheduler <TransitionScheduler.TransitionScheduler>` by the scheduler's own workers, so
+        checking one file overlaps the transitions of the others, and the individual transition steps of different
+        files are interleaved across the workers.
+
+        :param result_callback: An optional Python function called with each :py:class:`BatchFileResult` as soon as
+            that file is finished; calls may be made from the worker threads, but never concurrently
+        :rtype: The list of :py:class:`BatchFileResult` instances
+        """
+        self.results = []
+        self._result_callback = result_callback
+        start = time.time()
+        scheduler = TransitionScheduler(self.workers, self.queue_factory)
+        self._scheduler = scheduler
+        if self.cancelled:
+            scheduler.cancel()
+        scheduler.run(self._plan_files(start))
+        self.elapsed = time.time() - start
+        return self.results
+
+    def _plan_files(self, start):
+        # drawn from by the scheduler's workers, which each check their file while the transitions of others are running
+        for input_path in self.discover_input_files(self.root_directory):
+            yield lambda input_path=input_path: self._plan_input(input_path, start)
+
+    def _plan_input(self, input_path, start):
+        result = BatchFileResult(input_path, os.path.relpath(input_path, self.root_directory))
+        try:
+            thread = self.plan_file(result)
+        except Exception as e:
+            result.message = str(e)
+            thread = None
+        if thread is None:
+            result.elapsed = time.time() - start
+            self._record(result)
+            return None
+        return thread, lambda job: self._complete_file(result, job)
+
+    def cancel(self):
+        """
+        This function stops the batch from starting any more transitions and attempts to stop those running.
+        It may be called from another thread, before or during :py:meth:`run`; the files not transitioned are reported
+        as failed.
+        """
+        self.cancelled = True
+        if self._scheduler is not None:
+            self._scheduler.cancel()
+
+    def plan_file(self, result):
+        """
+        This function checks a single file with :py:func:`preflight_check <PreflightCheck.preflight_check>` and builds
+        the transition run for its chain.  Files which need no transitions are dealt with immediately: those already at
+        the latest version are copied straight to the output directory, and those failing the check are marked as
+        failed without running anything.
+
+        :param result: The :py:class:`BatchFileResult` for the file, which is updated in place
+        :rtype: A :py:class:`TransitionRunThread <TransitionRunThread.TransitionRunThread>` instance ready to be
+            scheduled, or None if the file needs no transitions run
+        """
+        preflight = preflight_check(result.input_path, self.ep_path,
+                                    run_directory=self.scratch_parent or tempfile.gettempdir(), keep_old=self.keep_old,
+                                    cached=self.cache is not None)
+        result.source_version = preflight.version
+        if not preflight.ok:
+            result.message = '; '.join(preflight.problems)
+            return None
+        chain = preflight.chain
+        result.output_path = os.path.join(self.output_directory, result.relative_path)
+        if not os.path.isdir(os.path.dirname(result.output_path)):
+            try:
+                os.makedirs(os.path.dirname(result.output_path))
+            except OSError:
+                if not os.path.isdir(os.path.dirname(result.output_path)):
+                    raise  # otherwise another worker planning a file in the same folder made it first
+        if not chain:
+            shutil.copyfile(result.input_path, result.output_path)
+            result.success = True
+            result.message = "Already at the latest version"
+            return None
+        result.steps = len(chain)
+        return TransitionRunThread(chain, self.ep_path.transition_directory, result.input_path, self.keep_old,
+                                   result.log.append, result.log.append, isolated=True,
+                                   scratch_parent=self.scratch_parent, cache=self.cache,
+                                   ram_directory=self.ram_directory, compression=self.compression,
+                                   step_callback=self.step_callback, metrics=self.metrics,
+                                   shard_workers=self.shard_workers, memo_directory=self.memo_directory)
+
+    def _complete_file(self, result, job):
+        thread = job.run_thread
+        base_name = os.path.basename(result.input_path)
+        result.bytes_copied = thread.bytes_copied
+        result.bytes_avoided = thread.bytes_avoided
+        result.report = thread.report
+        self.ep_path.record_step_times(thread.step_times)
+        try:
+            self._copy_artifacts(thread.run_dir, base_name, result.output_path)
+            if self.keep_old:
+                for file_name in thread.kept_intermediate_files():
+                    shutil.copyfile(os.path.join(thread.run_dir, file_name),
+                                    os.path.join(os.path.dirname(result.output_path), file_name))
+            if thread.failed or thread.cancelled:
+                result.output_path = None
+                result.message = ': '.join(reversed(result.log[-2:]))
+                if job.error is not None:
+                    result.message = str(job.error)
+            else:
+                shutil.copyfile(os.path.join(thread.run_dir, base_name), result.output_path)
+                result.target_version = thread.transitions[-1].target_version
+                result.success = True
+                result.message = "Transitioned %s -> %s" % (result.source_version, result.target_version)
+                if thread.cache_hit:
+                    result.message += " (from cache)"
+        except Exception as e:
+            result.success = False
+            result.output_path = None
+            result.message = str(e)
+        finally:
+            thread.cleanup()
+        result.elapsed = job.elapsed
+        self._record(result)
+
+    def _record(self, result):
+        with self._results_lock:
+            self.results.append(result)
+            if self._result_callback:
+                self._result_callback(result)
+
+    @staticmethod
+    def _copy_artifacts(run_dir, base_name, output_path):
+        # the error and audit files from the last transition run, such as in.VCpErr and in.audit
+        stem = os.path.splitext(base_name)[0]
+        for file_name in os.listdir(run_dir):
+            root, extension = os.path.splitext(file_name)
+            if root == stem and extension.lower() in CACHED_ARTIFACT_EXTENSIONS:
+                shutil.copyfile(os.path.join(run_dir, file_name), os.path.splitext(output_path)[0] + extension)
+
+    def files_per_minute(self):
+        """
+        This function returns the overall throughput of the most recent run in files per minute
+
+        :rtype: A floating point number of files processed per minute of wall clock time
+        """
+        if self.elapsed <= 0:
+            return 0.0
+        return len(self.results) * 60.0 / self.elapsed
+
+    def megabytes_per_second(self):
+        """
+        This function returns the overall throughput of the most recent run in megabytes of input per second
+
+        :rtype: A floating point number of input megabytes processed per second of wall clock time
+        """
+        if self.elapsed <= 0:
+            return 0.0
+        return sum(r.size_bytes for r in self.results) / (1024.0 * 1024.0) / self.elapsed
+
+    def save_report(self, path):
+        """
+        This function writes the outcome of every file in the most recent run, with the timing and resource usage of
+        each of its transitions, to a JSON file
+
+        :param path: The file to write
+        """
+        report = {
+            'elapsed': self.elapsed,
+            'files_per_minute': self.files_per_minute(),
+            'megabytes_per_second': self.megabytes_per_second(),
+            'files': [result.to_dict() for result in self.results],
+        }
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
@@ -0,0 +1,422 @@
+from __future__ import print_function
+
+import argparse
+import os
+import sys
+
+from BatchTransition import BatchTransition
+from EnergyPlusPath import EnergyPlusPath
+from EnergyPlusVersion import EnergyPlusVersion
+from IncrementalTransform import default_memo_directory
+from InstallationIndex import InstallationIndex
+from IntermediateArchive import IntermediateArchive, available_compressions
+from ObjectIndex import open_object_index
+from PreflightCheck import preflight_check
+from TransitionCache import TransitionCache, DEFAULT_MAX_SIZE_BYTES
+from TransitionMetrics import MetricsHTTPServer, TransitionMetrics
+from TransitionRules import RuleRegistry
+from TransitionServer import TransitionHTTPServer, TransitionService, DEFAULT_MAX_QUEUED_JOBS, DEFAULT_MAX_UPLOAD_BYTES
+from TransitionWorkspace import DEFAULT_RAM_DIRECTORY
+
+
+def build_parser():
+    """
+    This function builds the argument parser for the headless command line interface
+
+    :rtype: An argparse.ArgumentParser instance with a sub-command for each headless operation
+    """
+    parser = argparse.ArgumentParser(prog='python -m IDFVersionUpdater',
+                                     description='Headless tools for transitioning EnergyPlus input files')
+    sub_parsers = parser.add_subparsers(dest='command')
+    sub_parsers.required = True
+
+    batch = sub_parsers.add_parser('batch', help='Transition every idf/imf file found in a directory tree')
+    batch.add_argument('directory', help='Directory to search recursively for input files')
+    batch.add_argument('-o', '--output-dir', default=None,
+                       help='Directory to write transitioned files to (default: <directory>-transitioned)')
+    batch.add_argument('-j', '--workers', type=int, default=None,
+                       help='Number of transitions to run at once (default and maximum: number of processors)')
+    batch.add_argument('--keep-intermediate', action='store_true',
+                       help='Keep intermediate versions of each file alongside the transitioned file')
+    batch.add_argument('--compress', choices=available_compressions(), default=None,
+                       help='With --keep-intermediate, store the intermediate versions compressed, or as a compressed '
+                            'base file plus object-level changes between versions (delta)')
+    batch.add_argument('--scratch-dir', default=None,
+                       help='Directory to create per-file scratch directories in (default: system temp directory)')
+    batch.add_argument('--ram-disk', nargs='?', const=DEFAULT_RAM_DIRECTORY, default=None, metavar='DIR',
+                       help='Run each file in a RAM-backed directory (default: %s) when it has room, '
+                            'falling back to the scratch directory' % DEFAULT_RAM_DIRECTORY)
+    batch.add_argument('--report', default=None, metavar='FILE',
+                       help='Write the outcome of each file and the time, processor time and peak memory of each of '
+                            'its transitions to FILE as JSON')
+    batch.add_argument('--metrics-textfile', default=None, metavar='FILE',
+                       help='Keep Prometheus metrics of the transitions run in FILE, which should end in .prom, for '
+                            'the node exporter\'s textfile collector; it is rewritten as each file finishes')
+    batch.add_argument('--metrics-port', type=int, default=None,
+                       help='Serve Prometheus metrics of the transitions run at http://<host>:<port>/metrics while the '
+                            'batch runs')
+    batch.add_argument('--metrics-host', default='127.0.0.1',
+                       help='Address to serve the metrics on (default: %(default)s)')
+    add_install_root_argument(batch)
+    add_rules_argument(batch)
+    batch.add_argument('--shard-workers', type=int, default=1,
+                       help='Number of processes to split each large file across for transitions run with --rules-dir '
+                            '(default: %(default)d)')
+    batch.add_argument('--incremental', nargs='?', const=default_memo_directory(), default=None, metavar='DIR',
+                       help='Keep the output of transitions run with --rules-dir in DIR (default: %s), so that when a '
+                            'file is run again after being edited only its changed objects are transformed'
+                            % default_memo_directory())
+    add_cache_arguments(batch)
+    batch.add_argument('--no-cache', action='store_true', help='Always run the transitions, ignoring the cache')
+    batch.set_defaults(handler=run_batch)
+
+    cache = sub_parsers.add_parser('cache', help='Inspect or shrink the cache of transition results')
+    cache_parsers = cache.add_subparsers(dest='cache_command')
+    cache_parsers.required = True
+    cache_stats = cache_parsers.add_parser('stats', help='Show the size and hit rate of the cache')
+    add_cache_arguments(cache_stats)
+    cache_stats.set_defaults(handler=run_cache_stats)
+    cache_prune = cache_parsers.add_parser('prune', help='Evict least recently used entries down to the size cap')
+    add_cache_arguments(cache_prune)
+    cache_prune.set_defaults(handler=run_cache_prune)
+
+    check = sub_parsers.add_parser('check', help='Check input files can be transitioned, without running anything')
+    check.add_argument('files', nargs='+', metavar='file', help='The input files to check')
+    check.add_argument('--keep-intermediate', action='store_true',
+                       help='Check there is room to keep every intermediate version as well')
+    check.add_argument('--scratch-dir', default=None,
+                       help='Directory the transitions would run in (default: system temp directory)')
+    add_install_root_argument(check)
+    check.set_defaults(handler=run_check)
+
+    index = sub_parsers.add_parser('index', help='Index the objects of input files and count the objects of each class')
+    index.add_argument('files', nargs='+', metavar='file', help='The input files to index')
+    index.add_argument('--class', dest='class_names', action='append', default=[], metavar='NAME',
+                       help='Print every object of class NAME as well; may be given more than once')
+    index.add_argument('--no-save', action='store_true',
+                       help='Do not keep the index in a sidecar file next to each input file for next time')
+    index.set_defaults(handler=run_index)
+
+    restore = sub_parsers.add_parser('restore', help='Rebuild a compressed intermediate version of a file')
+    restore.add_argument('file', help='The transitioned file whose intermediate versions were kept with --compress')
+    restore.add_argument('version', help='The version to rebuild, for example 8.5')
+    restore.add_argument('-o', '--output', default=None,
+                         help='Path to write the rebuilt file to (default: <file stem>_<version> next to the file)')
+    restore.set_defaults(handler=run_restore)
+
+    serve = sub_parsers.add_parser('serve', help='Run an HTTP service transitioning uploaded files on a worker pool')
+    serve.add_argument('--host', default='127.0.0.1', help='Address to listen on (default: %(default)s)')
+    serve.add_argument('--port', type=int, default=8080, help='Port to listen on (default: %(default)d)')
+    serve.add_argument('-j', '--workers', type=int, default=None,
+                       help='Number of files to transition at once (default: number of processors)')
+    serve.add_argument('--max-queued', type=int, default=DEFAULT_MAX_QUEUED_JOBS,
+                       help='Number of jobs allowed to wait for a worker before uploads are refused '
+                            '(default: %(default)d)')
+    serve.add_argument('--max-upload-mb', type=float, default=DEFAULT_MAX_UPLOAD_BYTES / (1024 * 1024),
+                       help='Size of the largest file accepted in megabytes (default: %(default)d)')
+    serve.add_argument('--jobs-dir', default=None,
+                       help='Directory to keep uploaded files and results in (default: a temporary directory removed '
+                            'on exit)')
+    serve.add_argument('--scratch-dir', default=None,
+                       help='Directory to create per-file scratch directories in (default: system temp directory)')
+    add_install_root_argument(serve)
+    add_rules_argument(serve)
+    add_cache_arguments(serve)
+    serve.add_argument('--no-cache', action='store_true', help='Always run the transitions, ignoring the cache')
+    serve.add_argument('--no-metrics', action='store_true',
+                       help='Do not count the transitions run for /metrics/prometheus')
+    serve.set_defaults(handler=run_serve)
+
+    return parser
+
+
+def add_install_root_argument(parser):
+    """
+    This function adds the option to look for EnergyPlus installations somewhere other than the default location
+
+    :param parser: The argparse parser or sub-parser to add the option to
+    """
+    parser.add_argument('--install-root', default=None,
+                        help='Directory holding the EnergyPlus-* installation folders (default: the platform\'s usual '
+                             'install location)')
+
+
+def add_rules_argument(parser):
+    """
+    This function adds the option to run transitions in this process with rule sets instead of their programs
+
+    :param parser: The argparse parser or sub-parser to add the option to
+    """
+    parser.add_argument('--rules-dir', default=None, metavar='DIR',
+                        help='Directory of JSON transition rule sets; transitions with a rule set are run in this '
+                             'process instead of running the transition program')
+
+
+def attach_rules(args, ep_path):
+    """
+    This function attaches the rule sets in the directory given by the command line options to the transitions of the
+    installations, so they run in this process
+
+    :param args: The parsed command line arguments
+    :param ep_path: The :py:class:`EnergyPlusPath <EnergyPlusPath.EnergyPlusPath>` describing the installations
+    :rtype: True if the rule sets were loaded, or there were none to load; False after printing why they could not be
+    """
+    if args.rules_dir is None:
+        return True
+    registry = RuleRegistry()
+    try:
+        registry.load_directory(args.rules_dir)
+    except (IOError, OSError, ValueError) as e:
+        print("Could not load transition rules: %s" % e, file=sys.stderr)
+        return False
+    attached = registry.attach(ep_path.all_transitions)
+    print("Running %d of %d transitions in this process" % (attached, len(ep_path.all_transitions)))
+    return True
+
+
+def add_cache_arguments(parser):
+    """
+    This function adds the options shared by every command which uses the transition cache
+
+    :param parser: The argparse parser or sub-parser to add the options to
+    """
+    parser.add_argument('--cache-dir', default=None,
+                        help='Directory holding the cache of transition results (default: ~/.idfversionupdater/cache)')
+    parser.add_argument('--cache-size-mb', type=float, default=DEFAULT_MAX_SIZE_BYTES / (1024 * 1024),
+                        help='Size cap of the cache in megabytes (default: %(default)d)')
+
+
+def open_cache(args):
+    """
+    This function opens the transition cache described by the command line options
+
+    :param args: The parsed command line arguments
+    :rtype: A :py:class:`TransitionCache <TransitionCache.TransitionCache>` instance
+    """
+    return TransitionCache(args.cache_dir, int(args.cache_size_mb * 1024 * 1024))
+
+
+def run_batch(args):
+    """
+    This function handles the ``batch`` sub-command, printing a line per file and a final throughput summary
+
+    :param args: The parsed command line arguments
+    :rtype: The process exit code; zero only if every file was transitioned successfully
+    """
+    if not os.path.isdir(args.directory):
+        print("Input directory does not exist: %s" % args.directory, file=sys.stderr)
+        return 2
+    output_dir = args.output_dir
+    if output_dir is None:
+        output_dir = os.path.abspath(args.directory).rstrip(os.sep) + '-transitioned'
+    try:
+        ep_path = EnergyPlusPath(InstallationIndex(), install_root=args.install_root)
+    except IndexError:
+        print("Could not find an EnergyPlus installation", file=sys.stderr)
+        return 2
+    if not attach_rules(args, ep_path):
+        return 2
+
+    metrics = None
+    metrics_server = None
+    if args.metrics_textfile or args.metrics_port is not None:
+        metrics = TransitionMetrics()
+    if args.metrics_port is not None:
+        metrics_server = MetricsHTTPServer((args.metrics_host, args.metrics_port), metrics)
+        metrics_server.start()
+
+    def print_result(result):
+        print("%-4s %s (%.1f s): %s" % ("OK" if result.success else "FAIL", result.relative_path, result.elapsed,
+                                         result.message))
+        sys.stdout.flush()
+        if args.metrics_textfile:
+            metrics.write_textfile(args.metrics_textfile)
+
+    batch = BatchTransition(args.directory, output_dir, ep_path, workers=args.workers,
+                            keep_old=args.keep_intermediate, scratch_parent=args.scratch_dir,
+                            cache=None if args.no_cache else open_cache(args), ram_directory=args.ram_disk,
+                            compression=args.compress, metrics=metrics, shard_workers=args.shard_workers,
+                            memo_directory=args.incremental)
+    try:
+        results = batch.run(result_callback=print_result)
+    finally:
+        if metrics_server is not None:
+            metrics_server.stop()
+    if args.metrics_textfile:
+        metrics.write_textfile(args.metrics_textfile)
+    num_failed = len([r for r in results if not r.success])
+    print("%d files, %d succeeded, %d failed in %.1f s (%.1f files/min, %.2f MB/s)" % (
+        len(results), len(results) - num_failed, num_failed, batch.elapsed, batch.files_per_minute(),
+        batch.megabytes_per_second()))
+    bytes_copied = sum(r.bytes_copied for r in results)
+    bytes_avoided = sum(r.bytes_avoided for r in results)
+    if bytes_copied or bytes_avoided:
+        print("Intermediate versions: %.1f MB copied, %.1f MB kept without copying" % (
+            bytes_copied / (1024.0 * 1024.0), bytes_avoided / (1024.0 * 1024.0)))
+    slowest = [r.report.slowest_step() for r in results if r.report is not None]
+    slowest = [step for step in slowest if step is not None]
+    if slowest:
+        print("Slowest transition: %s" % max(slowest, key=lambda step: step.wall_seconds).describe())
+    if args.report:
+        batch.save_report(args.report)
+    return 1 if num_failed else 0
+
+
+def run_cache_stats(args):
+    """
+    This function handles the ``cache stats`` sub-command
+
+    :param args: The parsed command line arguments
+    :rtype: The process exit code
+    """
+    cache = open_cache(args)
+    stats = cache.stats()
+    lookups = stats['hits'] + stats['misses']
+    print("Cache directory: %s" % cache.cache_directory)
+    print("Entries:         %d" % stats['entries'])
+    print("Size:            %.1f MB of %.1f MB" % (stats['size_bytes'] / (1024.0 * 1024.0),
+                                                  stats['max_size_bytes'] / (1024.0 * 1024.0)))
+    print("Hits:            %d" % stats['hits'])
+    print("Misses:          %d" % stats['misses'])
+    print("Hit rate:        %.1f%%" % (100.0 * stats['hits'] / lookups if lookups else 0.0))
+    return 0
+
+
+def run_cache_prune(args):
+    """
+    This function handles the ``cache prune`` sub-command
+
+    :param args: The parsed command line arguments
+    :rtype: The process exit code
+    """
+    cache = open_cache(args)
+    evicted = cache.prune()
+    stats = cache.stats()
+    print("Evicted %d entries; %d entries (%.1f MB) remain" % (evicted, stats['entries'],
+                                                             stats['size_bytes'] / (1024.0 * 1024.0)))
+    return 0
+
+
+def run_check(args):
+    """
+    This function handles the ``check`` sub-command, printing a line per file
+
+    :param args: The parsed command line arguments
+    :rtype: The process exit code; zero only if every file can be transitioned
+    """
+    try:
+        ep_path = EnergyPlusPath(InstallationIndex(), install_root=args.install_root)
+    except IndexError:
+        print("Could not find an EnergyPlus installation", file=sys.stderr)
+        return 2
+    num_failed = 0
+    for path in args.files:
+        try:
+            preflight = preflight_check(os.path.abspath(path), ep_path, run_directory=args.scratch_dir,
+                                        keep_old=args.keep_intermediate)
+        except (IOError, OSError) as e:
+            print("FAIL %s: %s" % (path, e))
+            num_failed += 1
+            continue
+        if not preflight.ok:
+            print("FAIL %s: %s" % (path, '; '.join(preflight.problems)))
+            num_failed += 1
+        elif preflight.chain:
+            print("OK   %s: %s -> %s in %d transitions" % (path, preflight.version, ep_path.latest_version,
+                                                           len(preflight.chain)))
+        else:
+            print("OK   %s: already at the latest version" % path)
+    return 1 if num_failed else 0
+
+
+def run_index(args):
+    """
+    This function handles the ``index`` sub-command, printing the version and the number of objects of each class of
+    every file, and the objects of any classes asked for
+
+    :param args: The parsed command line arguments
+    :rtype: The process exit code; zero only if every file could be indexed
+    """
+    num_failed = 0
+    for path in args.files:
+        try:
+            index = open_object_index(os.path.abspath(path), save=not args.no_save)
+            version = index.version()
+        except (IOError, OSError, ValueError) as e:
+            print("FAIL %s: %s" % (path, e))
+            num_failed += 1
+            continue
+        print("%s: %d objects, version %s" % (path, len(index), EnergyPlusVersion(*version) if version else '?'))
+        counts = index.class_counts()
+        for class_name in sorted(counts, key=lambda name: name.upper()):
+            print("  %8d %s" % (counts[class_name], class_name))
+        for class_name in args.class_names:
+            for idf_object in index.objects(class_name):
+                print(idf_object.text.strip())
+    return 1 if num_failed else 0
+
+
+def run_restore(args):
+    """
+    This function handles the ``restore`` sub-command
+
+    :param args: The parsed command line arguments
+    :rtype: The process exit code
+    """
+    path = os.path.abspath(args.file)
+    archive = IntermediateArchive(os.path.dirname(path), os.path.basename(path))
+    if not archive.exists():
+        print("No compressed intermediate versions found for %s" % args.file, file=sys.stderr)
+        return 2
+    try:
+        restored_path = archive.restore(args.version, args.output and os.path.abspath(args.output))
+    except KeyError as e:
+        print(e.args[0], file=sys.stderr)
+        return 2
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    print("Restored version %s to %s" % (args.version, restored_path))
+    return 0
+
+
+def run_serve(args):
+    """
+    This function handles the ``serve`` sub-command, answering requests until interrupted
+
+    :param args: The parsed command line arguments
+    :rtype: The process exit code
+    """
+    try:
+        ep_path = EnergyPlusPath(InstallationIndex(), install_root=args.install_root)
+    except IndexError:
+        print("Could not find an EnergyPlus installation", file=sys.stderr)
+        return 2
+    if not attach_rules(args, ep_path):
+        return 2
+    service = TransitionService(ep_path, args.jobs_dir, workers=args.workers, max_queued=args.max_queued,
+                                cache=None if args.no_cache else open_cache(args), scratch_parent=args.scratch_dir,
+                                transition_metrics=None if args.no_metrics else TransitionMetrics())
+    server = TransitionHTTPServer((args.host, args.port), service, int(args.max_upload_mb * 1024 * 1024))
+    print("Transitioning to %s with %d workers; serving on http://%s:%d/" % (
+        ep_path.latest_version, service.workers, args.host, server.server_address[1]))
+    sys.stdout.flush()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Shutting down, cancelling any unfinished jobs")
+    finally:
+        server.server_close()
+        service.close()
+    return 0
+
+
+def main(argv=None):
+    """
+    This function is the entry point for ``python -m IDFVersionUpdater``
+
+    :param argv: The command line arguments, not including the program name; defaults to sys.argv[1:]
+    :rtype: The process exit code
+    """
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
@@ -1,36 +1,53 @@
 import glob
 import os
+import re
+from EnergyPlusVersion import EnergyPlusVersion
 from TransitionBinary import TransitionBinary
+from TransitionGraph import TransitionGraph
 
 
 class EnergyPlusPath(object):
     """
     This class provides a summary of the latest installed version of EnergyPlus
     The constructor looks up the available installations, picks the most recent (inferred from version number),
-    and sets some parameters
+    and sets some parameters.  The transition programs of every installation found are gathered into a
+    :py:class:`TransitionGraph <TransitionGraph.TransitionGraph>` used to plan transition chains.
 
+    :param index: An optional :py:class:`InstallationIndex <InstallationIndex.InstallationIndex>` to look up the
+        installations and their transition programs in, so that nothing is searched for again until it changes
+    :param install_root: An optional directory to look for EnergyPlus-* installation folders in, instead of the
+        platform's default location
+
+    :ivar installation_paths: Every installation path found, sorted from the oldest version to the newest
     :ivar installation_path: An installation path on Mac, following the form: '/Applications/EnergyPlus-?-?-?/'
     :ivar version_number: The version number suffix, in the form: '?-?-?'
     :ivar transition_directory: Absolute path to a transition run directory within the given installation directory
     :ivar transitions_available: A list of :py:class:`TransitionBinary <TransitionBinary.TransitionBinary>`
         instances available in this installation
+    :ivar all_transitions: A list of :py:class:`TransitionBinary <TransitionBinary.TransitionBinary>` instances
+        available in all the installations, from the oldest installation to the newest
+    :ivar latest_version: The version of the newest installation, which files are brought up to
+    :ivar graph: The :py:class:`TransitionGraph <TransitionGraph.TransitionGraph>` of all the transitions available
     """
 
-    def __init__(self):
+    def __init__(self, index=None, install_root=None):
+        self.index = index
         # get all the installed versions first, and sort them, then return the last one
-        cur_platform = self.get_platform()
+        pattern = self.get_install_pattern(install_root)
         install_folders = []
-        if cur_platform == "linux":
-            install_folders = glob.glob('/usr/local/EnergyPlus*')
-        elif cur_platform == "mac":
-            install_folders = glob.glob('/Applications/EnergyPlus*')
-        elif cur_platform == "windows":
-            install_folders = glob.glob('C:/EnergyPlusV*')
-        ep_versions = sorted([x for x in install_folders])
-        self.installation_path = ep_versions[-1]
+        if pattern is not None:
+            install_folders = index.install_folders(pattern) if index is not None else glob.glob(pattern)
+        self.installation_paths = sorted(install_folders, key=self.get_installation_sort_key)
+        self.installation_path = self.installation_paths[-1]
         self.version_number = self.get_version_number()
         self.transition_directory = self.get_transition_run_dir()
         self.transitions_available = self.get_transitions_available()
+        self.all_transitions = []
+        for installation_path in self.installation_paths[:-1]:
+            self.all_transitions.extend(self.get_transitions_available(self.get_transition_run_dir(installation_path)))
+        self.all_transitions.extend(self.transitions_available)
+        self.graph = TransitionGraph(self.all_transitions, index.step_seconds() if index is not None else None)
+        self.latest_version = self.get_latest_version()
 
     # TODO: Move this to a standalone path class, change to enums
     @staticmethod
@@ -43,6 +60,37 @@ class EnergyPlusPath(object):
         elif _platform.startswith("win32"):
             return "windows"
 
+    @staticmethod
+    def get_install_pattern(install_root=None):
+        """
+        This function returns where EnergyPlus is installed by default on the current platform
+
+        :param install_root: A directory to look in instead, for any installation folder named EnergyPlus*
+        :rtype: A glob pattern matching the installation folders, or None on an unknown platform
+        """
+        if install_root is not None:
+            return os.path.join(os.path.abspath(install_root), 'EnergyPlus*')
+        cur_platform = EnergyPlusPath.get_platform()
+        if cur_platform == "linux":
+            return '/usr/local/EnergyPlus*'
+        elif cur_platform == "mac":
+            return '/Applications/EnergyPlus*'
+        elif cur_platform == "windows":
+            return 'C:/EnergyPlusV*'
+        return None
+
+    @staticmethod
+    def get_installation_sort_key(installation_path):
+        """
+        This function returns a key to sort installation paths by the version in the folder name, so that
+        EnergyPlus-10-0-0 comes after EnergyPlus-9-6-0
+
+        :param installation_path: An installation path, such as '/Applications/EnergyPlus-8-5-0'
+        :rtype: A tuple holding a tuple of the integers in the folder name, then the folder name itself
+        """
+        ep_folder = os.path.basename(installation_path.rstrip('/\\'))
+        return tuple(int(x) for x in re.findall(r'\d+', ep_folder)), ep_folder
+
     def get_version_number(self):
         """
         This function processes the found installation path, and returns just the version number portion.
@@ -55,20 +103,71 @@ class EnergyPlusPath(object):
             return None
         return ep_folder[11:]
 
-    def get_transition_run_dir(self):
+    def get_latest_version(self):
+        """
+        This function returns the version of the found installation path, which files are transitioned up to
+
+        :rtype: The :py:class:`EnergyPlusVersion <EnergyPlusVersion.EnergyPlusVersion>`, for example 8.6, falling
+            back to the newest version any transition reaches when the installation folder does not say
+        """
+        numbers = self.get_installation_sort_key(self.installation_path)[0]
+        if len(numbers) >= 2:
+            return EnergyPlusVersion(numbers[0], numbers[1])
+        versions = self.graph.versions()
+        return versions[-1] if versions else None
+
+    def get_transition_run_dir(self, installation_path=None):
         """
         This function returns the full path to a transition folder in the found installation path
 
+        :param installation_path: Another installation path to use instead of the found one
         :rtype: Absolute path to a transition run directory within the given installation directory
         """
-        return os.path.join(self.installation_path, 'PreProcess', 'IDFVersionUpdater')
+        return os.path.join(installation_path or self.installation_path, 'PreProcess', 'IDFVersionUpdater')
 
-    def get_transitions_available(self):
+    def get_transitions_available(self, transition_directory=None):
         """
         This function returns a list of transition instances available in a given transition run directory
 
+        :param transition_directory: Another transition run directory to use instead of the found installation's
         :rtype: A list of :py:class:`TransitionBinary <TransitionBinary.TransitionBinary>` instances
             available in this installation
         """
-        binary_paths = glob.glob(os.path.join(self.transition_directory, 'Transition-V*'))
+        transition_directory = transition_directory or self.transition_directory
+        if self.index is not None:
+            binary_paths = self.index.transition_binaries(transition_directory)
+        else:
+            binary_paths = glob.glob(os.path.join(transition_directory, 'Transition-V*'))
         return [TransitionBinary(x) for x in binary_paths]
+
+    def get_transition_chain(self, source_version):
+        """
+        This function returns the ordered series of transitions needed to bring a file up to the latest version,
+        starting from the given source version.  The transitions may come from any of the installations, and are
+        chosen by :py:meth:`TransitionGraph.plan <TransitionGraph.TransitionGraph.plan>` to take the least time.
+
+        :param source_version: The current version of the file to be transitioned, as an
+            :py:class:`EnergyPlusVersion <EnergyPlusVersion.EnergyPlusVersion>`
+        :rtype: A list of :py:class:`TransitionBinary <TransitionBinary.TransitionBinary>` instances to run in order,
+            which is empty if the file is already at the latest version or cannot be brought up to it
+        """
+        return self.graph.plan(source_version, self.latest_version) or []
+
+    def record_step_times(self, step_times):
+        """
+        This function remembers how long transition programs took, to plan quicker chains in future.
+        Nothing is remembered without an :py:class:`InstallationIndex <InstallationIndex.InstallationIndex>`.
+
+        :param step_times: A list of (:py:class:`TransitionBinary <TransitionBinary.TransitionBinary>`, run time in
+            seconds) tuples
+        """
+        if self.index is not None:
+            self.index.record_step_seconds([(tr.full_path_to_binary, seconds) for tr, seconds in step_times])
+
+    def get_ep_binary(self):
+        """
+        This function returns the full path to the main EnergyPlus program in the found installation path
+
+        :rtype: Absolute path to the EnergyPlus binary
+        """
+        return os.path.join(self.installation_path, 'EnergyPlus')
@@ -0,0 +1,81 @@
+import re
+from functools import total_ordering
+
+# Matches the first version number in some text, with its parts separated by dots or dashes, such as 8.5, 9-10-0 or
+# 22.1.0; the patch number is optional
+VERSION_PATTERN = re.compile(r'(\d+)[.-](\d+)(?:[.-](\d+))?')
+
+
+@total_ordering
+class EnergyPlusVersion(object):
+    """
+    This class is an EnergyPlus version number, compared and ordered part by part so that 9.10 comes after 9.9 and
+    22.1 after 9.6, which is not the case when versions are treated as floating point numbers.
+    Instances are immutable and hashable, so they can be used as dictionary keys.
+
+    :param major: The major version number, for example 22 in 22.1.0
+    :param minor: The minor version number, for example 1 in 22.1.0
+    :param patch: The patch version number, for example 0 in 22.1.0
+    """
+
+    __slots__ = ('major', 'minor', 'patch')
+
+    def __init__(self, major, minor, patch=0):
+        object.__setattr__(self, 'major', int(major))
+        object.__setattr__(self, 'minor', int(minor))
+        object.__setattr__(self, 'patch', int(patch))
+
+    @classmethod
+    def parse(cls, text):
+        """
+        This function reads the first version number found in some text
+
+        :param text: Text holding a version number, such as '8.5', '9-10-0', 'EnergyPlus-22-1-0' or 'V8-5-0'
+        :rtype: An EnergyPlusVersion instance
+        """
+        match = VERSION_PATTERN.search(text)
+        if match is None:
+            raise ValueError("No version number found in %r" % text)
+        return cls(match.group(1), match.group(2), match.group(3) or 0)
+
+    def release(self):
+        """
+        This function returns the version without its patch number.  Transition programs work on whole releases, so
+        a file at 9.0.1 is transitioned the same way as one at 9.0.0.
+
+        :rtype: An EnergyPlusVersion instance with a patch number of zero
+        """
+        return EnergyPlusVersion(self.major, self.minor)
+
+    def as_tuple(self):
+        return self.major, self.minor, self.patch
+
+    def __setattr__(self, name, value):
+        raise AttributeError("EnergyPlusVersion instances cannot be changed")
+
+    def __reduce__(self):
+        # rebuilt through the constructor when unpickled, as attributes cannot be set on an existing instance
+        return EnergyPlusVersion, self.as_tuple()
+
+    def __eq__(self, other):
+        return isinstance(other, EnergyPlusVersion) and self.as_tuple() == other.as_tuple()
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __lt__(self, other):
+        if not isinstance(other, EnergyPlusVersion):
+            return NotImplemented
+        return self.as_tuple() < other.as_tuple()
+
+    def __hash__(self):
+        return hash(self.as_tuple())
+
+    def __repr__(self):
+        return 'EnergyPlusVersion(%d, %d, %d)' % self.as_tuple()
+
+    def __str__(self):
+        # versions have always been shown to users (and named intermediate files) as major.minor
+        if self.patch:
+            return '%d.%d.%d' % self.as_tuple()
+        return '%d.%d' % (self.major, self.minor)
@@ -0,0 +1,288 @@
+import io
+import re
+
+# The file is read this many characters at a time, so memory use depends on the largest object rather than the file
+DEFAULT_BLOCK_SIZE = 1024 * 1024
+
+# Skips the UTF-8 byte order mark (as read as Latin-1) starting a file, and any blank and comment lines ahead of an
+# object, capturing its class name
+CLASS_NAME_PATTERN = re.compile(r'(?:\xef\xbb\xbf)?(?:[ \t\r\n]*![^\n]*\n)*[ \t\r\n]*([^,;!\r\n]*)')
+
+# The same, for finding the class name of an object in the bytes of a file without copying it out
+CLASS_NAME_BYTES_PATTERN = re.compile(CLASS_NAME_PATTERN.pattern.encode('latin-1'))
+
+# Rewritten objects are laid out as IDF Editor and the transition programs write them, with each field on its own
+# line and its note lined up in a column
+FIELD_INDENT = '    '
+NOTE_COLUMN = 29
+
+
+class IdfObject(object):
+    """
+    This class holds one object of an input file as text, only splitting it into fields if it is changed.
+    An object which is never changed is written back out exactly as it was read, comments and layout included; a
+    changed one is laid out afresh, keeping the comment lines ahead of it and the note after each field, though any
+    other comments inside it are lost.  An object written on one line, such as Version,8.5; stays on one line.
+
+    :param text: The text of the object exactly as in the file, from the end of the object before it (so including any
+        blank and comment lines ahead of it) up to the end of the line holding its semicolon, or up to the semicolon
+        itself when another object follows on the same line
+    :param terminated: False for any text after the last semicolon in the file, which is not an object at all
+
+    :ivar terminated: Copy of the terminated flag passed into the constructor
+    """
+
+    def __init__(self, text, terminated=True):
+        self._text = text
+        self.terminated = terminated
+        self._class_name = None
+        self._prefix = None
+        self._items = None
+        self._single_line = False
+        self._changed = False
+
+    @property
+    def text(self):
+        """
+        The text of the object, as read or as laid out again once changed
+        """
+        if self._changed:
+            self._text = self._format()
+            self._changed = False
+        return self._text
+
+    @property
+    def class_name(self):
+        """
+        The class name of the object, such as 'Zone', or None for text which is not an object
+        """
+        if self._items is not None:
+            return self._items[0][0]
+        if self._class_name is None and self.terminated:
+            self._class_name = CLASS_NAME_PATTERN.match(self._text).group(1).strip()
+        return self._class_name or None
+
+    @property
+    def num_fields(self):
+        """
+        The number of fields after the class name, not counting any optional fields left off the end
+        """
+        return len(self._parse()) - 1
+
+    def field(self, number):
+        """
+        This function returns the value of one field
+
+        :param number: The field number, counting from 1 for the field after the class name as the IDD does
+        :rtype: The value, with surrounding white space removed, or None if the object has fewer fields
+        """
+        items = self._parse()
+        return items[number][0] if 1 <= number < len(items) else None
+
+    def rename(self, class_name):
+        """
+        This function changes the class name of the object
+
+        :param class_name: The new class name
+        """
+        self._change()[0][0] = class_name
+
+    def set_field(self, number, value):
+        """
+        This function changes the value of an existing field
+
+        :param number: The field number, counting from 1
+        :param value: The new value
+        """
+        self._change()[number][0] = value
+
+    def set_note(self, number, note):
+        """
+        This function changes the note written after a field, which names the field in files written by IDF Editor
+
+        :param number: The field number, counting from 1
+        :param note: The new note, such as 'Name', which is written as '!- Name'
+        """
+        self._change()[number][1] = '!- ' + note if note else ''
+
+    def insert_field(self, number, value, note=''):
+        """
+        This function inserts a field, moving the field with that number and all those after it along by one
+
+        :param number: The number the new field will have, counting from 1; it may be one more than the number of fields
+            to add a field at the end
+        :param value: The value of the new field
+        :param note: An optional note for the new field, such as 'Name', which is written as '!- Name'
+        """
+        self._change().insert(number, [value, '!- ' + note if note else ''])
+
+    def delete_field(self, number):
+        """
+        This function deletes a field, moving all the fields after it back by one
+
+        :param number: The field number, counting from 1
+        """
+        del self._change()[number]
+
+    def _change(self):
+        items = self._parse()
+        self._changed = True
+        return items
+
+    def _parse(self):
+        if self._items is not None:
+            return self._items
+        if not self.terminated:
+            raise ValueError("Only a complete object can be changed")
+        match = CLASS_NAME_PATTERN.match(self._text)
+        self._prefix = self._text[:match.start(1)]
+        body = self._text[match.start(1):]
+        self._single_line = '\n' not in body.rstrip('\r\n')
+        items = []
+        current = ''
+        for line in body.split('\n'):
+            bang = line.find('!')
+            code, note = (line, '') if bang == -1 else (line[:bang], line[bang:].rstrip())
+            semicolon = code.find(';')
+            if semicolon != -1:
+                code = code[:semicolon + 1]
+            elif ',' not in code:
+                current += code  # a comment line, or part of a value carried on to the next line
+                continue
+            parts = code.replace(';', ',').split(',')
+            parts[0] = current + parts[0]
+            for part in parts[:-1]:
+                items.append([part.strip(), ''])
+            current = parts[-1]
+            if note:
+                items[-1][1] = note
+            if semicolon != -1:
+                break
+        self._items = items
+        return items
+
+    def _format(self):
+        newline = '\r\n' if '\r\n' in self._text else '\n'
+        end = newline if self._text.endswith('\n') else ''
+        if self._single_line:
+            line = ','.join(value for value, note in self._items) + ';'
+            note = self._items[-1][1]
+            return self._prefix + (line + '  ' + note if note else line) + end
+        last = len(self._items) - 1
+        lines = []
+        for i, (value, note) in enumerate(self._items):
+            line = (FIELD_INDENT + value if i else value) + (';' if i == last else ',')
+            lines.append(line.ljust(NOTE_COLUMN) + note if note else line)
+        return self._prefix + newline.join(lines) + end
+
+
+def iter_idf_objects(stream, block_size=DEFAULT_BLOCK_SIZE):
+    """
+    This function splits an input file into its objects as it streams through it.
+    Semicolons in comments are ignored, and the blocks read are cut at line ends so a comment is never split.
+    Concatenating the text of every object yielded gives back the file exactly.
+
+    :param stream: A text file object to read from, which should be opened with newline='' to keep its line ends
+    :param block_size: The number of characters to read at a time
+    :rtype: A generator of :py:class:`IdfObject` instances, the last of which may be the unterminated text after the
+        final semicolon
+    """
+    carry = ''
+    while True:
+        block = stream.read(block_size)
+        if block:
+            text = carry + block
+            cut = text.rfind('\n') + 1
+            text, carry = text[:cut], text[cut:]
+        else:
+            text, carry = carry, ''
+        start = 0
+        pos = text.find(';')
+        while pos != -1:
+            line_end = text.find('\n', pos) + 1 or len(text)
+            if text.find('!', text.rfind('\n', 0, pos) + 1, pos) != -1:
+                pos = text.find(';', line_end)  # this semicolon is in a comment
+                continue
+            rest = text[pos + 1:line_end]
+            bang = rest.find('!')
+            if (rest if bang == -1 else rest[:bang]).strip():
+                end = pos + 1  # another object follows on the same line
+            else:
+                end = line_end
+            yield IdfObject(text[start:end])
+            start = end
+            pos = text.find(';', end)
+        if not block:
+            if start < len(text):
+                yield IdfObject(text[start:], terminated=False)
+            return
+        carry = text[start:] + carry
+
+
+def open_idf(path, mode='r'):
+    """
+    This function opens an input file for :py:func:`iter_idf_objects`, or for writing objects back out, so that every
+    byte of it is kept: as Latin-1, which maps each byte to one character, and without translating line ends
+
+    :param path: Path to the file
+    :param mode: 'r' to read or 'w' to write
+    :rtype: A text file object
+    """
+    return io.open(path, mode, encoding='latin-1', newline='')
+
+
+def next_object_boundary(data, offset, end=None):
+    """
+    This function finds the first place at or after an offset where :py:func:`iter_idf_objects` would start a new
+    object at the start of a line, so the file can be cut there and each piece split into objects on its own, giving
+    exactly the objects of the whole file.  Like the version sniffer, it looks for semicolons outside comments, but it
+    starts from the beginning of the line holding the offset, where no comment can be open, so it can start anywhere.
+
+    :param data: The bytes of the file, or a memory map of it
+    :param offset: The byte offset to search from
+    :param end: The byte offset to search up to, defaulting to the end of the data
+    :rtype: The byte offset of the start of the line after the end of an object, or end if no object ends before it
+    """
+    end = len(data) if end is None else end
+    pos = data.find(b';', data.rfind(b'\n', 0, offset) + 1, end)
+    while pos != -1:
+        line_end = data.find(b'\n', pos, end) + 1 or end
+        if data.find(b'!', data.rfind(b'\n', 0, pos) + 1, pos) != -1:
+            pos = data.find(b';', line_end, end)  # this semicolon is in a comment
+            continue
+        rest = data[pos + 1:line_end]
+        bang = rest.find(b'!')
+        if (rest if bang == -1 else rest[:bang]).strip():
+            pos = data.find(b';', pos + 1, end)  # another object follows on the same line
+            continue
+        return line_end
+    return end
+
+
+def iter_object_spans(data):
+    """
+    This function finds where every object of a file starts and ends, splitting it exactly as
+    :py:func:`iter_idf_objects` does but working on its bytes in place, so a memory map of the file can be indexed
+    without reading it into memory or copying out any more than the few bytes around each semicolon.
+
+    :param data: The bytes of the file, or a memory map of it
+    :rtype: A generator of (start, end, class name) tuples, with the byte offsets of each object as
+        :py:class:`IdfObject` holds it and its class name, not including any text after the final semicolon
+    """
+    start = 0
+    pos = data.find(b';')
+    while pos != -1:
+        line_end = data.find(b'\n', pos) + 1 or len(data)
+        if data.find(b'!', data.rfind(b'\n', 0, pos) + 1, pos) != -1:
+            pos = data.find(b';', line_end)  # this semicolon is in a comment
+            continue
+        rest = data[pos + 1:line_end]
+        bang = rest.find(b'!')
+        if (rest if bang == -1 else rest[:bang]).strip():
+            end = pos + 1  # another object follows on the same line
+        else:
+            end = line_end
+        class_name = CLASS_NAME_BYTES_PATTERN.match(data, start, end).group(1).strip().decode('latin-1')
+        yield start, end, class_name
+        start = end
+        pos = data.find(b';', end)
@@ -0,0 +1,228 @@
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import tempfile
+from array import array
+
+from IdfObjects import IdfObject, iter_object_spans
+from ObjectIndex import OFFSET_TYPECODE
+from TransitionRules import check_chain, transform_objects
+
+# Changed whenever the layout of the object map file changes, so older ones are ignored rather than misread
+MEMO_FORMAT = 1
+
+# Objects are recognised by the SHA-1 digest of their text, which is this many bytes long
+HASH_SIZE = 20
+
+# Runs of unchanged objects are copied from the previous output this many bytes at a time
+COPY_BLOCK_SIZE = 1024 * 1024
+
+
+def default_memo_directory():
+    """
+    This function returns the directory the outputs of earlier runs are kept in for incremental runs, unless another
+    one is requested
+
+    :rtype: An absolute path within the user's home directory
+    """
+    return os.path.join(os.path.expanduser("~"), ".idfversionupdater", "incremental")
+
+
+def memo_key(original_path, rule_sets):
+    """
+    This function builds the key an input file's earlier output is kept under for a series of rule sets.
+    It is the path of the file rather than its content, since the point is to find the output of an earlier version of
+    the same file after it has been edited; the rule set digests make sure an output is never reused once the rules
+    change.
+
+    :param original_path: Path to the original input file
+    :param rule_sets: The list of :py:class:`RuleSet <TransitionRules.RuleSet>` instances applied, in order
+    :rtype: A hex digest string
+    """
+    parts = ['input:' + os.path.abspath(original_path)]
+    parts.extend('step:native:%s-%s:%s' % (rule_set.source_version, rule_set.target_version, rule_set.digest)
+                 for rule_set in rule_sets)
+    return hashlib.sha256('\n'.join(parts).encode('utf-8')).hexdigest()
+
+
+class ObjectMemo(object):
+    """
+    This class keeps the output of the last run of one input file through one series of rule sets, along with the
+    digest of every object of the input it came from and where that object's output is in it.  An object whose digest
+    is found again in the next run is copied from the old output instead of being transformed again.
+
+    :param memo_directory: The directory to keep the output and its object map in
+    :param key: The key from :py:func:`memo_key`, which the files are named after
+
+    :ivar output_path: The output of the last run
+    :ivar map_path: The object map of the last run
+    """
+
+    def __init__(self, memo_directory, key):
+        self.output_path = os.path.join(memo_directory, key + '.idf')
+        self.map_path = os.path.join(memo_directory, key + '.objmap')
+
+    def load(self):
+        """
+        This function reads the object map of the last run
+
+        :rtype: A dictionary of (byte offset, length in bytes) tuples of each object's output, keyed by the digest of
+            its input, which is empty if there was no last run or its files do not match
+        """
+        try:
+            with open(self.map_path, 'rb') as f:
+                header = json.loads(f.readline().decode('utf-8'))
+                if (header.get('format') != MEMO_FORMAT or header.get('typecode') != OFFSET_TYPECODE or
+                        header.get('output_size') != os.path.getsize(self.output_path)):
+                    return {}
+                count = header['count']
+                hashes = f.read(count * HASH_SIZE)
+                if len(hashes) != count * HASH_SIZE:
+                    return {}
+                offsets = array(OFFSET_TYPECODE)
+                offsets.fromfile(f, count)
+                lengths = array(OFFSET_TYPECODE)
+                lengths.fromfile(f, count)
+        except (IOError, OSError, ValueError, KeyError, EOFError):
+            return {}
+        return dict((hashes[i * HASH_SIZE:(i + 1) * HASH_SIZE], (offsets[i], lengths[i])) for i in range(count))
+
+    def save(self, output_path, hashes, offsets, lengths):
+        """
+        This function keeps the output of a run and its object map in place of the last run's
+
+        :param output_path: The output of the run, which is copied into the memo directory; it is not linked, as
+            the output may later be edited in place
+        :param hashes: The digests of the objects of the input, joined together in order
+        :param offsets: An array of the byte offset of each object's output
+        :param lengths: An array of the length in bytes of each object's output
+        """
+        directory = os.path.dirname(self.map_path)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        header = {'format': MEMO_FORMAT, 'typecode': OFFSET_TYPECODE, 'count': len(offsets),
+                  'output_size': os.path.getsize(output_path)}
+        fd, temp_map = tempfile.mkstemp(dir=directory, prefix='.', suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(json.dumps(header, sort_keys=True).encode('utf-8') + b'\n')
+            f.write(bytes(hashes))
+            offsets.tofile(f)
+            lengths.tofile(f)
+        fd, temp_output = tempfile.mkstemp(dir=directory, prefix='.', suffix='.tmp')
+        os.close(fd)
+        try:
+            shutil.copyfile(output_path, temp_output)
+            # the old map goes first, so a map never describes an output it was not written with
+            for path in [self.map_path, self.output_path]:
+                if os.path.exists(path):
+                    os.remove(path)
+            os.rename(temp_output, self.output_path)
+            os.rename(temp_map, self.map_path)
+        finally:
+            for path in [temp_output, temp_map]:
+                if os.path.exists(path):
+                    os.remove(path)
+
+
+class _SpliceWriter(object):
+    # writes the new output, joining up the runs of objects copied from consecutive places in the old output
+
+    def __init__(self, output_file, previous_file):
+        self.output_file = output_file
+        self.previous_file = previous_file
+        self.position = 0
+        self.copy_start = 0
+        self.copy_end = 0
+
+    def write(self, data):
+        self.flush()
+        self.output_file.write(data)
+        self.position += len(data)
+
+    def copy(self, offset, length):
+        if offset != self.copy_end:
+            self.flush()
+            self.copy_start = self.copy_end = offset
+        self.copy_end += length
+        self.position += length
+
+    def flush(self):
+        remaining = self.copy_end - self.copy_start
+        if remaining:
+            self.previous_file.seek(self.copy_start)
+        while remaining > 0:
+            block = self.previous_file.read(min(remaining, COPY_BLOCK_SIZE))
+            if not block:
+                raise IOError("The output of the previous run is shorter than its object map")
+            self.output_file.write(block)
+            remaining -= len(block)
+        self.copy_start = self.copy_end
+
+
+def _spans(data):
+    last_end = 0
+    for start, end, class_name in iter_object_spans(data):
+        yield start, end, True
+        last_end = end
+    if last_end < len(data):
+        yield last_end, len(data), False  # the text after the final semicolon
+
+
+def transform_file_incremental(rule_sets, input_path, output_path, memo):
+    """
+    This function brings a whole file up through a series of transitions like
+    :py:func:`transform_file <TransitionRules.transform_file>`, but only transforms the objects which have changed
+    since the last run of the same file.  Every object of the input is recognised by the digest of its text: one seen
+    in the last run is copied from that run's output, and only new or edited ones go through the rules.  Since every
+    rule changes one object on its own, the output is exactly that of transforming the whole file, while a small edit
+    to a large file costs little more than reading it.  The output and its object map are then kept for the next run.
+
+    :param rule_sets: The list of :py:class:`RuleSet <TransitionRules.RuleSet>` instances to apply, in order
+    :param input_path: Path to the file at the source version of the first rule set
+    :param output_path: Path to write the file at the target version of the last rule set to
+    :param memo: The :py:class:`ObjectMemo` of the last run of this file through these rule sets
+    :rtype: A (number of objects copied from the last run, number of objects transformed) tuple
+    :raises ValueError: If the rule sets do not chain, or any of their rules needs to see more than one object
+    """
+    check_chain(rule_sets)
+    if not all(rule_set.object_local for rule_set in rule_sets):
+        raise ValueError("Only transitions which change one object at a time can be run incrementally")
+    previous = memo.load()
+    hashes = bytearray()
+    offsets = array(OFFSET_TYPECODE)
+    lengths = array(OFFSET_TYPECODE)
+    reused = transformed = 0
+    with open(input_path, 'rb') as input_file:
+        data = b''
+        if os.path.getsize(input_path):
+            data = mmap.mmap(input_file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            with open(output_path, 'wb') as output_file:
+                with open(memo.output_path if previous else os.devnull, 'rb') as previous_file:
+                    writer = _SpliceWriter(output_file, previous_file)
+                    for start, end, terminated in _spans(data):
+                        text = data[start:end]
+                        digest = hashlib.sha1(text).digest()
+                        offsets.append(writer.position)
+                        hit = previous.get(digest)
+                        if hit is not None:
+                            writer.copy(*hit)
+                            reused += 1
+                        else:
+                            idf_objects = [IdfObject(text.decode('latin-1'), terminated)]
+                            writer.write(''.join(idf_object.text for idf_object in
+                                                 transform_objects(rule_sets, idf_objects)).encode('latin-1'))
+                            transformed += 1
+                        lengths.append(writer.position - offsets[-1])
+                        hashes += digest
+                    writer.flush()
+        finally:
+            if isinstance(data, mmap.mmap):
+                data.close()
+    try:
+        memo.save(output_path, hashes, offsets, lengths)
+    except (IOError, OSError):
+        pass  # an unwritable memo directory just means transforming every object again next time
+    return reused, transformed
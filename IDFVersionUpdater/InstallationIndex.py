@@ -0,0 +1,163 @@
+import glob
+import json
+import os
+import subprocess
+import tempfile
+import threading
+
+# Step timings are averaged over at most this many runs, so that they follow changes in the machine or the models
+MAX_TIMED_RUNS = 20
+
+
+def default_index_path():
+    """
+    This function returns the file the installation index is kept in unless another one is requested
+
+    :rtype: An absolute path within the user's home directory
+    """
+    return os.path.join(os.path.expanduser("~"), ".idfversionupdater", "installations.json")
+
+
+def _modified_time(path):
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+class InstallationIndex(object):
+    """
+    This class remembers, across program launches, what was found when looking for EnergyPlus installations.
+    Searching the install locations, listing each installation's transition programs and asking EnergyPlus for its
+    version all touch the file system, and the last means starting a process, which is slow on network-mounted
+    installations.  Each answer is saved along with the modification time of the directory (or, for the version, the
+    program) it came from, and is reused until that changes: installing or removing a version changes the modification
+    time of the install location, and adding or removing a transition program that of the transition directory.
+    The index also keeps the average measured run time of each transition program, for planning transition chains.
+
+    :param index_path: The file to keep the index in, defaulting to :py:func:`default_index_path`
+    """
+
+    def __init__(self, index_path=None):
+        self.index_path = index_path or default_index_path()
+        self._lock = threading.Lock()
+        self._index = None
+
+    def install_folders(self, pattern):
+        """
+        This function lists the installation folders matching a glob pattern, such as '/Applications/EnergyPlus*'
+
+        :param pattern: A glob pattern whose wildcards are all in the last path component
+        :rtype: A list of matching absolute paths, in no particular order
+        """
+        return self._cached('install_folders', pattern, os.path.dirname(pattern), lambda: glob.glob(pattern))
+
+    def transition_binaries(self, transition_directory):
+        """
+        This function lists the transition programs in an installation's transition directory
+
+        :param transition_directory: Absolute path to the transition directory
+        :rtype: A list of absolute paths to the Transition-V* programs, in no particular order
+        """
+        pattern = os.path.join(transition_directory, 'Transition-V*')
+        return self._cached('transition_binaries', transition_directory, transition_directory,
+                            lambda: glob.glob(pattern))
+
+    def cached_ep_version(self, energyplus_binary):
+        """
+        This function returns the version EnergyPlus reported for itself, if it is known without running it
+
+        :param energyplus_binary: Absolute path to an EnergyPlus main binary
+        :rtype: The version identifier, or None if the binary has not been asked yet or has changed since
+        """
+        with self._lock:
+            entry = self._load().get('ep_versions', {}).get(energyplus_binary)
+        if entry is None or entry['mtime'] != _modified_time(energyplus_binary):
+            return None
+        return entry['value']
+
+    def ep_version(self, energyplus_binary):
+        """
+        This function returns the version EnergyPlus reports for itself with its ``-v`` flag, only running it when
+        the answer is not already in the index
+
+        :param energyplus_binary: Absolute path to an EnergyPlus main binary
+        :rtype: A human friendly EnergyPlus version identifier; the exact format is not defined
+        """
+        version = self.cached_ep_version(energyplus_binary)
+        if version is None:
+            p = subprocess.Popen([energyplus_binary, '-v'], shell=False, stdout=subprocess.PIPE,
+                                 stderr=subprocess.PIPE)
+            std_out, std_err = p.communicate()
+            version = std_out.strip().decode('utf-8', 'replace')
+            self._update('ep_versions', energyplus_binary, _modified_time(energyplus_binary), version)
+        return version
+
+    def step_seconds(self):
+        """
+        This function returns how long each transition program has taken on average in earlier runs
+
+        :rtype: A dictionary of average run times in seconds, keyed by the full path to the transition program
+        """
+        with self._lock:
+            timings = self._load().get('step_seconds', {})
+            return dict((path, timing['mean']) for path, timing in timings.items())
+
+    def record_step_seconds(self, step_times):
+        """
+        This function adds measured run times of transition programs to their averages
+
+        :param step_times: A list of (full path to the transition program, run time in seconds) tuples
+        """
+        if not step_times:
+            return
+        with self._lock:
+            index = self._load()
+            timings = index.setdefault('step_seconds', {})
+            for path, seconds in step_times:
+                timing = timings.setdefault(path, {'mean': 0.0, 'count': 0})
+                timing['count'] = min(timing['count'] + 1, MAX_TIMED_RUNS)
+                timing['mean'] += (seconds - timing['mean']) / timing['count']
+            try:
+                self._save(index)
+            except (IOError, OSError):
+                pass  # an unwritable settings directory just means planning without timings next time
+
+    def _cached(self, section, key, watched_directory, compute):
+        mtime = _modified_time(watched_directory)
+        with self._lock:
+            entry = self._load().get(section, {}).get(key)
+        if entry is not None and mtime is not None and entry['mtime'] == mtime:
+            return entry['value']
+        value = compute()
+        self._update(section, key, mtime, value)
+        return value
+
+    def _update(self, section, key, mtime, value):
+        with self._lock:
+            index = self._load()
+            index.setdefault(section, {})[key] = {'mtime': mtime, 'value': value}
+            try:
+                self._save(index)
+            except (IOError, OSError):
+                pass  # an unwritable settings directory just means searching again next time
+
+    def _load(self):
+        if self._index is None:
+            try:
+                with open(self.index_path) as f:
+                    self._index = json.load(f)
+            except (IOError, OSError, ValueError):
+                self._index = {}
+        return self._index
+
+    def _save(self, index):
+        directory = os.path.dirname(self.index_path)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        fd, temp_path = tempfile.mkstemp(dir=directory)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(index, f, indent=2)
+        if os.path.exists(self.index_path) and os.name == 'nt':
+            os.remove(self.index_path)  # rename will not replace an existing file on Windows
+        os.rename(temp_path, self.index_path)
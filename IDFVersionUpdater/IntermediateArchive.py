@@ -0,0 +1,342 @@
+import gzip
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import tempfile
+
+try:
+    import zstandard
+except ImportError:  # optional; gzip is always available
+    zstandard = None
+
+from EnergyPlusVersion import EnergyPlusVersion
+from IdfObjects import iter_object_spans
+from TransitionCache import file_digest
+
+# Each intermediate version compressed on its own
+COMPRESSION_GZIP = 'gzip'
+COMPRESSION_ZSTD = 'zstd'
+# The oldest version compressed, then each later version stored as the compressed object-level changes from the one
+# before
+COMPRESSION_DELTA = 'delta'
+
+COMPRESSION_EXTENSIONS = {COMPRESSION_GZIP: '.gz', COMPRESSION_ZSTD: '.zst'}
+DELTA_EXTENSION = '.delta'
+MANIFEST_EXTENSION = '.versions.json'
+
+COPY_BLOCK_SIZE = 1024 * 1024
+
+
+def available_compressions():
+    """
+    This function lists the compression methods usable on this machine; zstd needs the optional zstandard package
+
+    :rtype: A list of compression method names
+    """
+    methods = [COMPRESSION_GZIP]
+    if zstandard is not None:
+        methods.append(COMPRESSION_ZSTD)
+    methods.append(COMPRESSION_DELTA)
+    return methods
+
+
+def open_compressed(path, mode):
+    """
+    This function opens a compressed file for binary reading or writing, choosing the format from the file extension
+
+    :param path: Absolute path to a file ending in .gz or .zst
+    :param mode: Either 'rb' or 'wb'
+    :rtype: A file-like object
+    """
+    if path.endswith(COMPRESSION_EXTENSIONS[COMPRESSION_ZSTD]):
+        if zstandard is None:
+            raise ValueError("Reading %s needs the zstandard package" % path)
+        if mode == 'rb':
+            return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+        return zstandard.ZstdCompressor().stream_writer(open(path, 'wb'), closefd=True)
+    return gzip.open(path, mode)
+
+
+def _map_file(f):
+    # a read-only memory map of a whole file, or an empty byte string for an empty file, which cannot be mapped
+    if os.fstat(f.fileno()).st_size == 0:
+        return b''
+    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _object_spans(data):
+    # the (start, end) byte offsets of every object, then of whatever text follows the last one
+    end = 0
+    for start, end, class_name in iter_object_spans(data):
+        yield start, end
+    if end < len(data):
+        yield end, len(data)
+
+
+def _copy_bytes(source_file, output_file, length):
+    while length > 0:
+        block = source_file.read(min(length, COPY_BLOCK_SIZE))
+        if not block:
+            raise ValueError("Corrupt delta: it refers to more text than there is")
+        output_file.write(block)
+        length -= len(block)
+
+
+class _DeltaWriter(object):
+    # writes the instructions of a delta, joining up runs of reused objects which are consecutive in the earlier
+    # version, and runs of new objects up to a block at a time
+
+    def __init__(self, delta_file):
+        self.delta_file = delta_file
+        self.copy_start = 0
+        self.copy_end = 0
+        self.inserted = []
+        self.inserted_bytes = 0
+
+    def copy(self, offset, length):
+        self.flush_inserted()
+        if offset != self.copy_end:
+            self.flush_copy()
+            self.copy_start = self.copy_end = offset
+        self.copy_end += length
+
+    def insert(self, text):
+        self.flush_copy()
+        self.inserted.append(text)
+        self.inserted_bytes += len(text)
+        if self.inserted_bytes >= COPY_BLOCK_SIZE:
+            self.flush_inserted()
+
+    def flush_copy(self):
+        if self.copy_end > self.copy_start:
+            self.delta_file.write(('=%d %d\n' % (self.copy_start, self.copy_end - self.copy_start)).encode('ascii'))
+        self.copy_start = self.copy_end
+
+    def flush_inserted(self):
+        if self.inserted:
+            self.delta_file.write(('+%d\n' % self.inserted_bytes).encode('ascii'))
+            self.delta_file.write(b''.join(self.inserted))
+        self.inserted = []
+        self.inserted_bytes = 0
+
+
+def object_delta(old_path, new_path, delta_file):
+    """
+    This function writes how to build one version of a file from the version before it.
+    The delta is a series of instructions, each either '=<offset> <length>' to reuse that many bytes of the earlier
+    version from that byte offset, or '+<length>' followed by that many bytes of new text.  Objects are matched by the
+    digest of their text, so the work grows only linearly with the size of the files, and neither file is read into
+    memory as a whole.
+
+    :param old_path: Path to the earlier version
+    :param new_path: Path to the later version
+    :param delta_file: A binary file-like object to write the delta to
+    """
+    known = {}
+    with open(old_path, 'rb') as old_file:
+        old_data = _map_file(old_file)
+        try:
+            for start, end in _object_spans(old_data):
+                known.setdefault(hashlib.sha1(old_data[start:end]).digest(), (start, end - start))
+        finally:
+            if isinstance(old_data, mmap.mmap):
+                old_data.close()
+    writer = _DeltaWriter(delta_file)
+    with open(new_path, 'rb') as new_file:
+        new_data = _map_file(new_file)
+        try:
+            for start, end in _object_spans(new_data):
+                text = new_data[start:end]
+                hit = known.get(hashlib.sha1(text).digest())
+                if hit is not None:
+                    writer.copy(*hit)
+                else:
+                    writer.insert(text)
+        finally:
+            if isinstance(new_data, mmap.mmap):
+                new_data.close()
+    writer.flush_copy()
+    writer.flush_inserted()
+
+
+def apply_object_delta(old_file, delta_file, output_file):
+    """
+    This function rebuilds the later version of a file from the earlier version and an :py:func:`object_delta`,
+    a block at a time
+
+    :param old_file: A seekable binary file-like object holding the earlier version
+    :param delta_file: A binary file-like object positioned at the start of the delta
+    :param output_file: A binary file-like object to write the later version to
+    :raises ValueError: If the delta is damaged
+    """
+    while True:
+        instruction = delta_file.readline()
+        if not instruction:
+            return
+        if instruction.startswith(b'='):
+            offset, length = [int(x) for x in instruction[1:].split()]
+            old_file.seek(offset)
+            _copy_bytes(old_file, output_file, length)
+        elif instruction.startswith(b'+'):
+            _copy_bytes(delta_file, output_file, int(instruction[1:]))
+        else:
+            raise ValueError("Corrupt delta instruction: %r" % instruction)
+
+
+class IntermediateArchive(object):
+    """
+    This class stores the intermediate versions of a file, kept when transitioning with keep_old, in compressed form.
+    Successive versions of an input file are nearly identical and IDF text compresses very well, so either every
+    version is compressed on its own, or the oldest version is compressed in full and each later one is stored as the
+    compressed object-level changes from the version before it.
+    A manifest next to the file lists the versions kept, in order, along with a digest of each one to check restores.
+
+    :param directory: The directory holding the file and its intermediate versions
+    :param file_name: The name of the transitioned file, which the intermediate versions are named after
+    """
+
+    def __init__(self, directory, file_name):
+        self.directory = directory
+        self.file_name = file_name
+        self.stem, self.extension = os.path.splitext(file_name)
+        self.manifest_path = os.path.join(directory, self.stem + MANIFEST_EXTENSION)
+
+    def exists(self):
+        """
+        This function checks whether intermediate versions of the file have been archived
+
+        :rtype: True if there is a manifest for the file
+        """
+        return os.path.exists(self.manifest_path)
+
+    def pack(self, versions, compression=COMPRESSION_GZIP):
+        """
+        This function compresses intermediate versions of the file into the archive, removing the uncompressed files
+
+        :param versions: A list of (version, file name) tuples, oldest first, naming the uncompressed intermediate
+            versions in the archive directory
+        :param compression: One of the methods from :py:func:`available_compressions`
+        :rtype: The list of file names, including the manifest, now making up the archive
+        """
+        if compression not in available_compressions():
+            raise ValueError("Unsupported compression method: %s" % compression)
+        entries = []
+        previous_source = None
+        for version, file_name in versions:
+            source = os.path.join(self.directory, file_name)
+            entry = {'version': str(version), 'sha256': file_digest(source)}
+            if compression == COMPRESSION_DELTA and previous_source is not None:
+                entry['file'] = file_name + DELTA_EXTENSION + COMPRESSION_EXTENSIONS[COMPRESSION_GZIP]
+                with open_compressed(os.path.join(self.directory, entry['file']), 'wb') as f:
+                    object_delta(previous_source, source, f)
+            else:
+                extension = COMPRESSION_EXTENSIONS.get(compression, COMPRESSION_EXTENSIONS[COMPRESSION_GZIP])
+                entry['file'] = file_name + extension
+                with open(source, 'rb') as source_file:
+                    with open_compressed(os.path.join(self.directory, entry['file']), 'wb') as f:
+                        shutil.copyfileobj(source_file, f, COPY_BLOCK_SIZE)
+            entries.append(entry)
+            # each version is kept until the delta of the next one has been made from it
+            if previous_source is not None:
+                os.remove(previous_source)
+            previous_source = source
+        if previous_source is not None:
+            os.remove(previous_source)
+        with open(self.manifest_path, 'w') as f:
+            json.dump({'compression': compression, 'versions': entries}, f, indent=2)
+        return self.file_names()
+
+    def versions(self):
+        """
+        This function lists the versions held in the archive
+
+        :rtype: A list of version strings, oldest first, or an empty list if there is no archive
+        """
+        if not self.exists():
+            return []
+        return [entry['version'] for entry in self._manifest()['versions']]
+
+    def file_names(self):
+        """
+        This function lists the files making up the archive
+
+        :rtype: A list of file names within the archive directory, including the manifest
+        """
+        if not self.exists():
+            return []
+        return [entry['file'] for entry in self._manifest()['versions']] + [os.path.basename(self.manifest_path)]
+
+    def restore(self, version, target_path=None):
+        """
+        This function rebuilds one intermediate version of the file from the archive
+
+        :param version: The version to rebuild, as listed by :py:meth:`versions`
+        :param target_path: Absolute path to write the version to, defaulting to the name the uncompressed
+            intermediate version had, for example in_8.5.idf, in the archive directory
+        :rtype: The absolute path of the rebuilt file
+        """
+        manifest = self._manifest()
+        entries = manifest['versions']
+        positions = [i for i, entry in enumerate(entries) if _same_version(entry['version'], version)]
+        if not positions:
+            raise KeyError("Version %s is not in the archive; available versions: %s" % (
+                version, ', '.join(entry['version'] for entry in entries)))
+        position = positions[0]
+        if target_path is None:
+            target_path = os.path.join(self.directory,
+                                       self.stem + '_' + entries[position]['version'] + self.extension)
+        if manifest['compression'] == COMPRESSION_DELTA:
+            # each version in turn is rebuilt on disk from the one before, so no version is ever held in memory
+            current = self._decompress_to_temporary_file(entries[0]['file'])
+            temp_paths = [current]
+            try:
+                for entry in entries[1:position + 1]:
+                    fd, rebuilt = tempfile.mkstemp(dir=self.directory, prefix='.', suffix='.tmp')
+                    temp_paths.append(rebuilt)
+                    with os.fdopen(fd, 'wb') as output_file:
+                        with open(current, 'rb') as old_file:
+                            with open_compressed(os.path.join(self.directory, entry['file']), 'rb') as delta_file:
+                                apply_object_delta(old_file, delta_file, output_file)
+                    os.remove(current)
+                    current = rebuilt
+                if os.path.exists(target_path):
+                    os.remove(target_path)  # rename will not replace an existing file on Windows
+                shutil.move(current, target_path)
+            finally:
+                for path in temp_paths:
+                    if os.path.exists(path):
+                        os.remove(path)
+        else:
+            with open_compressed(os.path.join(self.directory, entries[position]['file']), 'rb') as source_file:
+                with open(target_path, 'wb') as f:
+                    shutil.copyfileobj(source_file, f, COPY_BLOCK_SIZE)
+        if file_digest(target_path) != entries[position]['sha256']:
+            os.remove(target_path)
+            raise ValueError("Restored version %s does not match the original; the archive is damaged" % version)
+        return target_path
+
+    def _decompress_to_temporary_file(self, file_name):
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, prefix='.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                with open_compressed(os.path.join(self.directory, file_name), 'rb') as source_file:
+                    shutil.copyfileobj(source_file, f, COPY_BLOCK_SIZE)
+        except Exception:
+            os.remove(temp_path)
+            raise
+        return temp_path
+
+    def _manifest(self):
+        with open(self.manifest_path) as f:
+            return json.load(f)
+
+
+def _same_version(stored, requested):
+    # so that 8.6, 8.6.0 and 8-6-0 all find the same version
+    try:
+        return EnergyPlusVersion.parse(stored) == EnergyPlusVersion.parse(str(requested))
+    except ValueError:
+        return stored == str(requested)
+
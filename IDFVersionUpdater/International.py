@@ -29,6 +29,10 @@ EnglishDictionary = {
     'Program Initialized': 'Program Initialized',
     'Running Transition': 'Running Transition',
     'Transition Cancelled': 'Transition Cancelled',
+    'Attempting to cancel simulation ...': 'Attempting to cancel simulation ...',
+    'Slowest transition': 'Slowest transition',
+    'Input file cannot be transitioned': 'Input file cannot be transitioned',
+    'Checking input file ...': 'Checking input file ...',
     'Completed Transition': 'Completed Transition',
     'Failed Transition': 'Failed Transition',
     'All transitions completed successfully - Open run directory for transitioned file':
@@ -38,7 +42,11 @@ EnglishDictionary = {
     'Cannot find a matching transition tool for this idf version': 'Cannot find a matching transition tool for this idf version',
     'Open File for Transition': '',
     'IDF File doesn\'t exist at path given; cannot transition': '',
-    'IDF File exists, ready to go': ''
+    'IDF File exists, ready to go': '',
+    'Restored transitioned file from cache': 'Restored transitioned file from cache',
+    'Resuming from cached version': 'Resuming from cached version',
+    'Not enough free memory for this file; running on disk': 'Not enough free memory for this file; running on disk',
+    'Objects reused from the previous run': 'Objects reused from the previous run'
 }
 
 SpanishDictionary = {
@@ -56,6 +64,10 @@ SpanishDictionary = {
     'Program Initialized': 'Programa Initialized',
     'Running Transition': 'Transición corriendo',
     'Transition Cancelled': 'transición Cancelado',
+    'Attempting to cancel simulation ...': 'Intentando cancelar la simulación ...',
+    'Slowest transition': 'Transición más lenta',
+    'Input file cannot be transitioned': 'El archivo de entrada no se puede transicionar',
+    'Checking input file ...': 'Comprobando el archivo de entrada ...',
     'Completed Transition': 'Transición completado',
     'Failed Transition': 'La transición fallida',
     'All transitions completed successfully - Open run directory for transitioned file':
@@ -67,7 +79,12 @@ SpanishDictionary = {
     'Open File for Transition': 'Abrir archivo para la Transición',
     'IDF File doesn\'t exist at path given; cannot transition':
         'IDF El archivo no existe en la ruta dada; no puede transición',
-    'IDF File exists, ready to go': 'existe IDF del archivo, listo para ir'
+    'IDF File exists, ready to go': 'existe IDF del archivo, listo para ir',
+    'Restored transitioned file from cache': 'Archivo de la transición restaurado desde la caché',
+    'Resuming from cached version': 'Reanudando desde la versión en caché',
+    'Not enough free memory for this file; running on disk':
+        'No hay suficiente memoria libre para este archivo; ejecutando en disco',
+    'Objects reused from the previous run': 'Objetos reutilizados de la ejecución anterior'
 
 
 }
@@ -87,6 +104,10 @@ FrenchDictionary = {
     'Program Initialized': 'Programme initialisé',
     'Running Transition': 'Transition en cours',
     'Transition Cancelled': 'transition Annulé',
+    'Attempting to cancel simulation ...': 'Tentative d\'annulation de la simulation ...',
+    'Slowest transition': 'Transition la plus lente',
+    'Input file cannot be transitioned': 'Le fichier d\'entrée ne peut pas être transitionné',
+    'Checking input file ...': 'Vérification du fichier d\'entrée ...',
     'Completed Transition': 'transition Terminé',
     'Failed Transition': 'transition Échec',
     'All transitions completed successfully - Open run directory for transitioned file':
@@ -98,7 +119,12 @@ FrenchDictionary = {
     'Open File for Transition': 'Ouvrir un fichier pour la transition',
     'IDF File doesn\'t exist at path given; cannot transition':
         'IDF fichier n\'existe pas au chemin donné; ne peut pas passer',
-    'IDF File exists, ready to go': 'IDF fichier existe, prêt à aller'
+    'IDF File exists, ready to go': 'IDF fichier existe, prêt à aller',
+    'Restored transitioned file from cache': 'Fichier transition restauré depuis le cache',
+    'Resuming from cached version': 'Reprise à partir de la version en cache',
+    'Not enough free memory for this file; running on disk':
+        'Pas assez de mémoire libre pour ce fichier; exécution sur disque',
+    'Objects reused from the previous run': 'Objets réutilisés de l\'exécution précédente'
 }
 
 
@@ -0,0 +1,325 @@
+import io
+import json
+import mmap
+import os
+import sys
+import tempfile
+from array import array
+
+from IdfObjects import IdfObject, iter_object_spans
+from VersionSniffer import parse_version_string
+
+# The index of an input file is kept next to it, in a file named after it with this added
+SIDECAR_SUFFIX = '.objidx'
+
+# Changed whenever the layout of the sidecar file changes, so older ones are rebuilt rather than misread
+SIDECAR_FORMAT = 2
+
+
+def _typecode_of_size(size):
+    # 'Q' is only known to Python 3, and the size of 'L' depends on the platform
+    for typecode in 'ILQ':
+        try:
+            if array(typecode).itemsize == size:
+                return typecode
+        except ValueError:
+            pass
+    return 'd'
+
+
+# Byte offsets and lengths are held as 64 bit integers, so files of any size can be indexed
+OFFSET_TYPECODE = _typecode_of_size(8)
+
+# Each object's class is held as a number into the list of class names found in the file
+CLASS_TYPECODE = _typecode_of_size(4)
+
+
+def sidecar_path(path_to_idf):
+    """
+    This function returns the file the index of an input file is kept in
+
+    :param path_to_idf: Path to the input file
+    :rtype: The path of the sidecar file, next to the input file
+    """
+    return path_to_idf + SIDECAR_SUFFIX
+
+
+def _stat_key(path_to_idf):
+    stat = os.stat(path_to_idf)
+    return stat.st_size, stat.st_mtime
+
+
+def _read_header(sidecar_file, size, mtime):
+    # the header is a single line of JSON ahead of the arrays, and is None unless it matches the input file as it is
+    header = json.loads(sidecar_file.readline().decode('utf-8'))
+    if (header.get('format') != SIDECAR_FORMAT or header.get('size') != size or header.get('mtime') != mtime or
+            header.get('byteorder') != sys.byteorder or header.get('typecodes') != [OFFSET_TYPECODE, CLASS_TYPECODE]):
+        return None
+    return header
+
+
+def _read_version(path_to_idf, offset, length):
+    with io.open(path_to_idf, 'rb') as f:
+        f.seek(offset)
+        version_field = IdfObject(f.read(length).decode('latin-1')).field(1)
+    return None if version_field is None else parse_version_string(version_field)
+
+
+class ObjectIndex(object):
+    """
+    This class records where every object of an input file is, so that questions such as which version the file is,
+    how many Zone objects it has or what its Output:Variable objects say can be answered by seeking straight to the
+    objects concerned instead of reading the whole file.  The byte offset, length and class of each object are kept in
+    compact arrays, a few bytes per object, and the index can be saved in a sidecar file next to the input file, which
+    is used for as long as the size and modification time of the input file are unchanged.
+    Class names are matched without regard to case, as EnergyPlus does.
+
+    :param path_to_idf: Path to the input file
+    :param size: The size of the input file when it was indexed
+    :param mtime: The modification time of the input file when it was indexed
+    :param offsets: An array of the byte offset of each object, as :py:class:`IdfObject <IdfObjects.IdfObject>` holds it
+        (so including any comment lines ahead of it)
+    :param lengths: An array of the length in bytes of each object
+    :param classes: An array of the class of each object, as a position in class_names
+    :param class_names: A list of the class names found, spelled as they first appear in the file
+
+    :ivar path_to_idf: Copy of the path passed into the constructor
+    :ivar size: Copy of the size passed into the constructor
+    :ivar mtime: Copy of the modification time passed into the constructor
+    """
+
+    def __init__(self, path_to_idf, size, mtime, offsets, lengths, classes, class_names):
+        self.path_to_idf = path_to_idf
+        self.size = size
+        self.mtime = mtime
+        self.offsets = offsets
+        self.lengths = lengths
+        self.classes = classes
+        self.class_names = class_names
+        self._class_numbers = dict((name.upper(), number) for number, name in enumerate(class_names))
+        self._positions = {}
+
+    @classmethod
+    def build(cls, path_to_idf):
+        """
+        This function indexes an input file, in a single pass over a memory map of it
+
+        :param path_to_idf: Path to the input file
+        :rtype: An ObjectIndex instance
+        """
+        size, mtime = _stat_key(path_to_idf)
+        offsets = array(OFFSET_TYPECODE)
+        lengths = array(OFFSET_TYPECODE)
+        classes = array(CLASS_TYPECODE)
+        class_names = []
+        class_numbers = {}
+        if size:
+            with open(path_to_idf, 'rb') as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                try:
+                    for start, end, class_name in iter_object_spans(data):
+                        key = class_name.upper()
+                        number = class_numbers.get(key)
+                        if number is None:
+                            number = class_numbers[key] = len(class_names)
+                            class_names.append(class_name)
+                        offsets.append(start)
+                        lengths.append(end - start)
+                        classes.append(number)
+                finally:
+                    data.close()
+        return cls(path_to_idf, size, mtime, offsets, lengths, classes, class_names)
+
+    @classmethod
+    def load(cls, path_to_idf):
+        """
+        This function reads the index of an input file back from its sidecar file
+
+        :param path_to_idf: Path to the input file
+        :rtype: An ObjectIndex instance, or None if there is no sidecar file, or it is unreadable, or the input file
+            has changed since it was written
+        """
+        try:
+            size, mtime = _stat_key(path_to_idf)
+            with open(sidecar_path(path_to_idf), 'rb') as f:
+                header = _read_header(f, size, mtime)
+                if header is None:
+                    return None
+                count = header['count']
+                columns = []
+                for typecode in [OFFSET_TYPECODE, OFFSET_TYPECODE, CLASS_TYPECODE]:
+                    column = array(typecode)
+                    column.fromfile(f, count)
+                    columns.append(column)
+                class_names = header['class_names']
+        except (IOError, OSError, ValueError, KeyError, EOFError):
+            return None
+        return cls(path_to_idf, size, mtime, columns[0], columns[1], columns[2], class_names)
+
+    def save(self):
+        """
+        This function writes the index to its sidecar file next to the input file, replacing any older one
+        """
+        path = sidecar_path(self.path_to_idf)
+        header = {'format': SIDECAR_FORMAT, 'size': self.size, 'mtime': self.mtime, 'byteorder': sys.byteorder,
+                  'typecodes': [OFFSET_TYPECODE, CLASS_TYPECODE], 'count': len(self), 'class_names': self.class_names,
+                  'version_span': self.version_span()}
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix='.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(json.dumps(header, sort_keys=True).encode('utf-8') + b'\n')
+                for column in [self.offsets, self.lengths, self.classes]:
+                    column.tofile(f)
+            if os.path.exists(path) and os.name == 'nt':
+                os.remove(path)  # rename will not replace an existing file on Windows
+            os.rename(temp_path, path)
+        except Exception:
+            os.remove(temp_path)
+            raise
+
+    def is_current(self):
+        """
+        This function checks the input file has not changed since it was indexed
+
+        :rtype: True if the size and modification time of the input file are those it was indexed at
+        """
+        try:
+            return _stat_key(self.path_to_idf) == (self.size, self.mtime)
+        except OSError:
+            return False
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def class_counts(self):
+        """
+        This function counts the objects of every class in the file
+
+        :rtype: A dictionary of the number of objects, keyed by class name
+        """
+        return dict((name, self.classes.count(number)) for number, name in enumerate(self.class_names))
+
+    def count(self, class_name):
+        """
+        This function counts the objects of one class
+
+        :param class_name: The class name, such as 'Zone'
+        :rtype: The number of objects of that class in the file
+        """
+        number = self._class_numbers.get(class_name.upper())
+        return 0 if number is None else self.classes.count(number)
+
+    def positions(self, class_name):
+        """
+        This function finds the objects of one class
+
+        :param class_name: The class name, such as 'Output:Variable'
+        :rtype: An array of the positions of those objects in the file, counting from 0 for the first object
+        """
+        number = self._class_numbers.get(class_name.upper())
+        if number is None:
+            return array(OFFSET_TYPECODE)
+        if number not in self._positions:
+            self._positions[number] = array(OFFSET_TYPECODE, [position for position, object_class
+                                                              in enumerate(self.classes) if object_class == number])
+        return self._positions[number]
+
+    def span(self, position):
+        """
+        This function returns where one object is in the file
+
+        :param position: The position of the object in the file, counting from 0 for the first object
+        :rtype: A (byte offset, length in bytes) tuple
+        """
+        return self.offsets[position], self.lengths[position]
+
+    def objects(self, class_name):
+        """
+        This function reads the objects of one class from the file, seeking straight to each in turn
+
+        :param class_name: The class name, such as 'Output:Variable'
+        :rtype: A generator of :py:class:`IdfObject <IdfObjects.IdfObject>` instances, in the order of the file
+        """
+        positions = self.positions(class_name)
+        if not positions:
+            return
+        with io.open(self.path_to_idf, 'rb') as f:
+            for position in positions:
+                f.seek(self.offsets[position])
+                yield IdfObject(f.read(self.lengths[position]).decode('latin-1'))
+
+    def first(self, class_name):
+        """
+        This function reads the first object of one class from the file
+
+        :param class_name: The class name, such as 'Version'
+        :rtype: An :py:class:`IdfObject <IdfObjects.IdfObject>` instance, or None if the file has no such object
+        """
+        for idf_object in self.objects(class_name):
+            return idf_object
+        return None
+
+    def version(self):
+        """
+        This function returns the version of the input file from its Version object, like
+        :py:func:`sniff_idf_version <VersionSniffer.sniff_idf_version>` but reading only that object
+
+        :rtype: A tuple of integers in the form (major, minor, patch), or None if no Version object was found
+        :raises ValueError: If the Version object is found but the version field is not a valid version number
+        """
+        span = self.version_span()
+        return None if span is None else _read_version(self.path_to_idf, *span)
+
+    def version_span(self):
+        """
+        This function returns where the Version object is in the file, which is also kept in the header of the sidecar
+        file so that :py:func:`indexed_version` can find it without loading the index
+
+        :rtype: A [byte offset, length in bytes] list, or None if the file has no Version object
+        """
+        number = self._class_numbers.get('VERSION')
+        if number is None:
+            return None
+        position = self.classes.index(number)
+        return [self.offsets[position], self.lengths[position]]
+
+
+def open_object_index(path_to_idf, save=True):
+    """
+    This function returns the index of an input file, from its sidecar file when that is still current, or else by
+    indexing the file afresh and, if asked, saving the result to the sidecar file for next time
+
+    :param path_to_idf: Path to the input file
+    :param save: A boolean flag for whether a new index is saved; a directory which cannot be written to is not an error
+    :rtype: An :py:class:`ObjectIndex` instance
+    """
+    index = ObjectIndex.load(path_to_idf)
+    if index is None:
+        index = ObjectIndex.build(path_to_idf)
+        if save:
+            try:
+                index.save()
+            except (IOError, OSError):
+                pass  # a read-only directory just means indexing the file again next time
+    return index
+
+
+def indexed_version(path_to_idf):
+    """
+    This function returns the version of an input file from its sidecar file, reading only the header of the sidecar
+    file, which says where the Version object is, and then that object, so the cost does not grow with the size of the
+    file or of its index
+
+    :param path_to_idf: Path to the input file
+    :rtype: A tuple of integers in the form (major, minor, patch), or None if there is no current sidecar file or the
+        file has no Version object, in which case the file must be read some other way
+    :raises ValueError: If the Version object is found but the version field is not a valid version number
+    """
+    try:
+        size, mtime = _stat_key(path_to_idf)
+        with open(sidecar_path(path_to_idf), 'rb') as f:
+            header = _read_header(f, size, mtime)
+        span = None if header is None else header['version_span']
+    except (IOError, OSError, ValueError, KeyError):
+        return None
+    return None if span is None else _read_version(path_to_idf, *span)
@@ -0,0 +1,184 @@
+import codecs
+import os
+import re
+import tempfile
+
+from EnergyPlusVersion import EnergyPlusVersion
+from TransitionWorkspace import estimate_scratch_bytes, free_bytes
+from VersionSniffer import parse_version_string
+
+# The file is read this many bytes at a time, so memory use does not depend on the size of the file
+DEFAULT_BLOCK_SIZE = 1024 * 1024
+
+# Even the largest Schedule:Compact or Schedule:File objects are far shorter than this, so an object which grows past
+# it is really a run of objects with their semicolons missing, or not an input file at all
+MAX_OBJECT_LENGTH = 16 * 1024 * 1024
+
+# The transition programs read single-byte text, so files saved with these encodings cannot be transitioned.  The
+# UTF-32 marks come first because the little-endian one begins with the UTF-16 one.
+WIDE_BYTE_ORDER_MARKS = [(codecs.BOM_UTF32_LE, 'UTF-32'), (codecs.BOM_UTF32_BE, 'UTF-32'),
+                         (codecs.BOM_UTF16_LE, 'UTF-16'), (codecs.BOM_UTF16_BE, 'UTF-16')]
+
+COMMENT_PATTERN = re.compile(r'!.*')
+
+# Both of these start with the semicolon ending the object before, since a pattern starting with a plain character
+# is searched for many times faster than one starting with an anchor or lookbehind
+
+# An object with nothing before its semicolon, which only appears when a semicolon has been doubled or misplaced
+EMPTY_OBJECT_PATTERN = re.compile(r';\s*;')
+
+VERSION_OBJECT_PATTERN = re.compile(r';\s*(version)\s*,([^;]*)(?=;)', re.IGNORECASE)
+
+
+class PreflightResult(object):
+    """
+    This class holds the outcome of checking an input file before any transitions are run on it
+
+    :param path_to_idf: Absolute path to the input file
+
+    :ivar size_bytes: The size of the input file
+    :ivar version: The :py:class:`EnergyPlusVersion <EnergyPlusVersion.EnergyPlusVersion>` of the input file, or None if
+        it could not be determined
+    :ivar chain: The list of :py:class:`TransitionBinary <TransitionBinary.TransitionBinary>` instances to run, which is
+        empty if the file is already at the target version, or None if there is no chain of transitions to it
+    :ivar required_bytes: The estimated scratch space needed for the run, or None if there is nothing to run
+    :ivar problems: A list of human friendly descriptions of everything which would stop the file being transitioned
+    """
+
+    def __init__(self, path_to_idf):
+        self.path_to_idf = path_to_idf
+        self.size_bytes = os.path.getsize(path_to_idf)
+        self.version = None
+        self.chain = None
+        self.required_bytes = None
+        self.problems = []
+
+    @property
+    def ok(self):
+        """
+        True if no problems were found, so the transitions can be run
+        """
+        return not self.problems
+
+
+def preflight_check(path_to_idf, ep_path, target_version=None, run_directory=None, keep_old=False, cached=False,
+                    block_size=DEFAULT_BLOCK_SIZE):
+    """
+    This function checks, in a single streaming pass over an input file, everything which would otherwise only be
+    found by running the transition programs on it: that it is single-byte or UTF-8 text, that every object ends with a
+    semicolon and there are no empty objects, that it has exactly one valid Version object, that there is a chain of
+    transitions from that version to the target, and that there is disk space for the run, including the backups kept
+    by keep_old.  A bad file is rejected in the time it takes to read it, without creating any files.
+
+    :param path_to_idf: Absolute path to the input file
+    :param ep_path: An :py:class:`EnergyPlusPath <EnergyPlusPath.EnergyPlusPath>` instance describing the installations
+    :param target_version: The :py:class:`EnergyPlusVersion <EnergyPlusVersion.EnergyPlusVersion>` to bring the file
+        up to, defaulting to the newest installation's version
+    :param run_directory: The directory the transitions will run in, or the directory their scratch directory will be
+        created in, defaulting to the system temp directory
+    :param keep_old: A boolean flag for whether a backup of the file is kept before each transition
+    :param cached: A boolean flag for whether the intermediate versions will be added to a cache
+    :param block_size: The number of bytes to read from the file at a time
+    :rtype: A :py:class:`PreflightResult`
+    """
+    result = PreflightResult(path_to_idf)
+    versions = _scan(path_to_idf, block_size, result.problems)
+    if not result.ok and not versions:
+        return result  # the file is not one the rest of the checks could make sense of
+    if not versions:
+        result.problems.append("Could not find a Version object")
+        return result
+    if len(versions) > 1:
+        result.problems.append("Found %d Version objects, on lines %s; there must be only one" % (
+            len(versions), ', '.join(str(line) for line, text in versions)))
+    line, version_text = versions[0]
+    try:
+        version = parse_version_string(version_text)
+    except ValueError:
+        result.problems.append("Line %d: the version '%s' in the Version object is not a valid version number" % (
+            line, version_text.strip()))
+        return result
+    result.version = EnergyPlusVersion(version[0], version[1])
+    if target_version is None:
+        target_version = ep_path.latest_version
+    result.chain = ep_path.graph.plan(result.version, target_version)
+    if result.chain is None:
+        if target_version < result.version:
+            result.problems.append("Version %s is newer than the target version %s" % (result.version, target_version))
+        else:
+            result.problems.append("Cannot find a matching transition tool for this idf version")
+        return result
+    if not result.chain:
+        return result
+    result.required_bytes = estimate_scratch_bytes(result.size_bytes, len(result.chain), keep_old, cached)
+    directory = os.path.abspath(run_directory or tempfile.gettempdir())
+    while not os.path.isdir(directory) and os.path.dirname(directory) != directory:
+        directory = os.path.dirname(directory)  # the scratch parent may not have been created yet
+    available = free_bytes(directory)
+    if available is not None and available < result.required_bytes:
+        result.problems.append("Not enough free disk space in %s: the run needs about %.1f MB but %.1f MB is free" % (
+            directory, result.required_bytes / (1024.0 * 1024.0), available / (1024.0 * 1024.0)))
+    return result
+
+
+def _scan(path_to_idf, block_size, problems):
+    # Returns a (line number, version text) tuple for each Version object, adding any problems found along the way;
+    # files which are not text, or have an object too long to be real, return none at all.
+    # Blocks are cut at their last newline so comments never span two blocks; once comments are removed, only the
+    # text of the object still open at the end of a block (the carry) is kept for the next.  The text scanned always
+    # starts with a semicolon standing in for the end of the object before the carry.
+    versions = []
+    carry = ''
+    carry_line = 1
+    partial_line = ''
+    found_empty_object = False
+    first_block = True
+    with open(path_to_idf, 'rb') as f:
+        while True:
+            if first_block:
+                first_block = False
+                block = f.read(max(block_size, len(codecs.BOM_UTF32_LE)))
+                for mark, encoding in WIDE_BYTE_ORDER_MARKS:
+                    if block.startswith(mark):
+                        problems.append("The file is %s encoded; the transition programs can only read single-byte "
+                                        "or UTF-8 text" % encoding)
+                        return []
+                if block.startswith(codecs.BOM_UTF8):
+                    block = block[len(codecs.BOM_UTF8):]
+            else:
+                block = f.read(block_size)
+            at_end = not block
+            text = block.decode('latin-1')
+            if '\x00' in text:
+                problems.append("The file contains NUL characters, so it is not a text input file")
+                return []
+            text = partial_line + text
+            if at_end:
+                partial_line = ''
+            else:
+                newline = text.rfind('\n')
+                partial_line = text[newline + 1:]
+                text = text[:newline + 1]
+            work = ';' + carry + COMMENT_PATTERN.sub('', text)
+            for match in VERSION_OBJECT_PATTERN.finditer(work):
+                versions.append((carry_line + work.count('\n', 0, match.start(1)), match.group(2)))
+            if not found_empty_object:
+                match = EMPTY_OBJECT_PATTERN.search(work)
+                if match is not None:
+                    found_empty_object = True
+                    problems.append("Line %d: a semicolon ends an empty object" % (
+                        carry_line + work.count('\n', 0, match.end() - 1)))
+            last_semicolon = work.rfind(';')
+            carry_line += work.count('\n', 0, last_semicolon + 1)
+            work = work[last_semicolon + 1:]
+            carry = work.lstrip()
+            carry_line += work.count('\n', 0, len(work) - len(carry))
+            if len(carry) + len(partial_line) > MAX_OBJECT_LENGTH:
+                problems.append("Line %d: an object runs on for more than %d MB without a semicolon" % (
+                    carry_line, MAX_OBJECT_LENGTH // (1024 * 1024)))
+                return []
+            if at_end:
+                break
+    if carry:
+        problems.append("Line %d: the last object does not end with a semicolon" % carry_line)
+    return versions
@@ -0,0 +1,135 @@
+import io
+import mmap
+import os
+import shutil
+from multiprocessing import cpu_count
+
+try:
+    from concurrent.futures import ProcessPoolExecutor
+except ImportError:  # Python 2
+    from multiprocessing import Pool
+    ProcessPoolExecutor = None
+
+from IdfObjects import next_object_boundary, open_idf
+from TransitionRules import check_chain, transform_file, transform_stream
+
+# Starting a process and loading the rules costs a fraction of a second, so files are never cut into shards smaller
+# than this; a file under twice this size is always transformed in this process
+MIN_SHARD_BYTES = 8 * 1024 * 1024
+
+# The shards are stitched back together this many bytes at a time
+COPY_BLOCK_SIZE = 1024 * 1024
+
+
+def shard_boundaries(path_to_idf, num_shards):
+    """
+    This function cuts an input file into shards of about equal size at object boundaries, found with
+    :py:func:`next_object_boundary <IdfObjects.next_object_boundary>` on a memory map of the file, so only the bytes
+    around each cut are read
+
+    :param path_to_idf: Path to the input file
+    :param num_shards: The number of shards wanted; fewer are returned if the file has too few objects
+    :rtype: A list of (start, end) byte offsets, covering the whole file in order
+    """
+    size = os.path.getsize(path_to_idf)
+    if size == 0 or num_shards < 2:
+        return [(0, size)]
+    cuts = [0]
+    with open(path_to_idf, 'rb') as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            for i in range(1, num_shards):
+                cut = next_object_boundary(data, max(size * i // num_shards, cuts[-1]))
+                if cut >= size:
+                    break
+                if cut > cuts[-1]:
+                    cuts.append(cut)
+        finally:
+            data.close()
+    cuts.append(size)
+    return list(zip(cuts, cuts[1:]))
+
+
+class ByteRangeReader(object):
+    """
+    This class reads one byte range of a file as Latin-1 text, for splitting a shard into objects with
+    :py:func:`iter_idf_objects <IdfObjects.iter_idf_objects>`
+
+    :param f: A file object opened for reading in binary mode
+    :param start: The byte offset the range starts at
+    :param end: The byte offset the range ends at
+    """
+
+    def __init__(self, f, start, end):
+        self.f = f
+        self.f.seek(start)
+        self.remaining = end - start
+
+    def read(self, size):
+        data = self.f.read(min(size, self.remaining))
+        self.remaining -= len(data)
+        return data.decode('latin-1')
+
+
+def transform_shard(task):
+    """
+    This function applies a series of rule sets to one shard of a file, in a worker process
+
+    :param task: A (rule sets, input path, start, end, output path) tuple
+    :rtype: The output path
+    """
+    rule_sets, input_path, start, end, output_path = task
+    with io.open(input_path, 'rb') as input_file:
+        with open_idf(output_path, 'w') as output_file:
+            transform_stream(rule_sets, ByteRangeReader(input_file, start, end), output_file)
+    return output_path
+
+
+def transform_file_sharded(rule_sets, input_path, output_path, workers=None, min_shard_bytes=MIN_SHARD_BYTES):
+    """
+    This function brings a whole file up through a series of transitions like
+    :py:func:`transform_file <TransitionRules.transform_file>`, but spreads a large file across processes: it is cut
+    into a shard per worker at object boundaries, each shard is transformed by a worker process, and the results are
+    joined back together in order.  The output is exactly that of transforming the whole file at once.
+    Rule sets which need to see more than one object at a time (see
+    :py:attr:`RuleSet.object_local <TransitionRules.RuleSet.object_local>`) cannot be split this way, so the file is
+    transformed in this process as a whole, as are files too small to be worth splitting.
+
+    :param rule_sets: The list of :py:class:`RuleSet <TransitionRules.RuleSet>` instances to apply, in order
+    :param input_path: Path to the file at the source version of the first rule set
+    :param output_path: Path to write the file at the target version of the last rule set to
+    :param workers: The number of worker processes, defaulting to the number of processors
+    :param min_shard_bytes: The smallest shard worth giving a process of its own
+    :rtype: The number of shards the file was split into, which is 1 if it was transformed in this process
+    """
+    check_chain(rule_sets)
+    workers = workers or cpu_count()
+    num_shards = min(workers, os.path.getsize(input_path) // max(1, min_shard_bytes))
+    shards = [(0, None)]
+    if num_shards > 1 and all(rule_set.object_local for rule_set in rule_sets):
+        shards = shard_boundaries(input_path, num_shards)
+    if len(shards) < 2:
+        transform_file(rule_sets, input_path, output_path)
+        return 1
+    shard_paths = ['%s.shard%d' % (output_path, i) for i in range(len(shards))]
+    tasks = [(rule_sets, input_path, start, end, shard_path) for (start, end), shard_path in zip(shards, shard_paths)]
+    try:
+        if ProcessPoolExecutor is not None:
+            with ProcessPoolExecutor(len(tasks)) as executor:
+                list(executor.map(transform_shard, tasks))
+        else:
+            pool = Pool(len(tasks))
+            try:
+                pool.map(transform_shard, tasks)
+            finally:
+                pool.close()
+                pool.join()
+        with open(output_path, 'wb') as output_file:
+            for shard_path in shard_paths:
+                with open(shard_path, 'rb') as shard_file:
+                    shutil.copyfileobj(shard_file, output_file, COPY_BLOCK_SIZE)
+    finally:
+        for shard_path in shard_paths:
+            if os.path.exists(shard_path):
+                os.remove(shard_path)
+    return len(shards)
@@ -1,4 +1,11 @@
 import os
+import re
+
+from EnergyPlusVersion import EnergyPlusVersion
+
+# Transition program names hold the source and target versions, such as Transition-V8-5-0-to-V8-6-0 or
+# Transition-V9-6-0-to-V22-1-0.exe
+BINARY_NAME_PATTERN = re.compile(r'^Transition-V(\d+-\d+-\d+)-to-V(\d+-\d+-\d+)')
 
 
 class TransitionBinary(object):
@@ -10,13 +17,21 @@ class TransitionBinary(object):
 
     :ivar full_path_to_binary: Copy of the full path to binary passed into the constructor
     :ivar binary_name: This is just the filename portion of the binary executable
-    :ivar source_version: This is the source version of this particular transition, for example, in V8-5-0-to-8-6-0, this will be 8.5
-    :ivar target_version: This is the target version of this particular transition, for example, in V8-5-0-to-8-6-0, this will be 8.6
+    :ivar source_version: This is the source version of this particular transition, for example, in V8-5-0-to-8-6-0, this will be 8.5,
+        as an :py:class:`EnergyPlusVersion <EnergyPlusVersion.EnergyPlusVersion>`
+    :ivar target_version: This is the target version of this particular transition, for example, in V8-5-0-to-8-6-0, this will be 8.6,
+        as an :py:class:`EnergyPlusVersion <EnergyPlusVersion.EnergyPlusVersion>`
+    :ivar native_rules: The :py:class:`RuleSet <TransitionRules.RuleSet>` to run this transition with in this process
+        instead of running the binary, or None to run the binary; see
+        :py:meth:`RuleRegistry.attach <TransitionRules.RuleRegistry.attach>`
     """
 
     def __init__(self, full_path):
         self.full_path_to_binary = full_path
         self.binary_name = os.path.basename(full_path)
-        self.source_version = float(self.binary_name[12:15].replace('-', '.'))
-        self.target_version = float(self.binary_name[22:25].replace('-', '.'))
-
+        match = BINARY_NAME_PATTERN.match(self.binary_name)
+        if match is None:
+            raise ValueError("Not a transition program name: %s" % self.binary_name)
+        self.source_version = EnergyPlusVersion.parse(match.group(1))
+        self.target_version = EnergyPlusVersion.parse(match.group(2))
+        self.native_rules = None
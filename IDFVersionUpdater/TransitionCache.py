@@ -0,0 +1,350 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:  # anywhere but Windows
+    msvcrt = None
+
+# Transitioned models are big, so by default keep a couple of gigabytes of them around
+DEFAULT_MAX_SIZE_BYTES = 2 * 1024 * 1024 * 1024
+
+# Besides the transitioned file itself, these are the run outputs worth keeping, matched on the file extension
+CACHED_ARTIFACT_EXTENSIONS = ['.vcperr', '.audit']
+
+# The input file's own name is stored as this placeholder, so an entry can be restored for a differently named file
+STEM_PLACEHOLDER = '{stem}'
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+# Hashing a transition program is only worth doing once per process, as long as the file itself has not changed
+_binary_digests = {}
+_binary_digests_lock = threading.Lock()
+
+
+def default_cache_directory():
+    """
+    This function returns the directory the cache lives in unless another one is requested
+
+    :rtype: An absolute path within the user's home directory
+    """
+    return os.path.join(os.path.expanduser("~"), ".idfversionupdater", "cache")
+
+
+def file_digest(path):
+    """
+    This function computes the SHA-256 digest of a file, reading it a block at a time
+
+    :param path: Absolute path to the file to hash
+    :rtype: The hex digest string
+    """
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(HASH_BLOCK_SIZE)
+            if not block:
+                break
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def binary_identity(transition_instance):
+    """
+    This function returns a string identifying exactly which transition program a
+    :py:class:`TransitionBinary <TransitionBinary.TransitionBinary>` refers to.
+    The program name alone is not enough since the same name ships with every EnergyPlus release, so the digest of the
+    program itself is included; it is remembered for as long as the file's size and modification time are unchanged.
+
+    A transition run in this process by its rule set is identified by the digest of the rules instead.
+
+    :param transition_instance: A :py:class:`TransitionBinary <TransitionBinary.TransitionBinary>` instance
+    :rtype: A string of the form '<binary name>:<sha-256 digest>', or 'native:<source>-<target>:<sha-256 digest>'
+    """
+    if transition_instance.native_rules is not None:
+        return 'native:%s-%s:%s' % (transition_instance.source_version, transition_instance.target_version,
+                                    transition_instance.native_rules.digest)
+    path = transition_instance.full_path_to_binary
+    stat = os.stat(path)
+    memo_key = (os.path.realpath(path), stat.st_size, stat.st_mtime)
+    with _binary_digests_lock:
+        digest = _binary_digests.get(memo_key)
+    if digest is None:
+        digest = file_digest(path)
+        with _binary_digests_lock:
+            _binary_digests[memo_key] = digest
+    return '%s:%s' % (transition_instance.binary_name, digest)
+
+
+class _IndexLock(object):
+    # held while the index is read, changed and written back: a lock for the threads of this process, and an exclusive
+    # lock on a file next to the index for the other processes sharing the cache directory (batch, serve and the GUI)
+
+    def __init__(self, thread_lock, lock_path):
+        self.thread_lock = thread_lock
+        self.lock_path = lock_path
+        self.lock_file = None
+
+    def __enter__(self):
+        self.thread_lock.acquire()
+        try:
+            self.lock_file = open(self.lock_path, 'a+')
+            if fcntl is not None:
+                fcntl.flock(self.lock_file.fileno(), fcntl.LOCK_EX)
+            elif msvcrt is not None:
+                self.lock_file.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(self.lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except (IOError, OSError):
+                        pass  # still held by another process after msvcrt's own ten seconds of retries
+        except Exception:
+            if self.lock_file is not None:
+                self.lock_file.close()
+            self.thread_lock.release()
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if fcntl is not None:
+                fcntl.flock(self.lock_file.fileno(), fcntl.LOCK_UN)
+            elif msvcrt is not None:
+                self.lock_file.seek(0)
+                msvcrt.locking(self.lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self.lock_file.close()
+            self.lock_file = None
+            self.thread_lock.release()
+
+
+class TransitionCache(object):
+    """
+    This class is a local on-disk cache of transition results, keyed by the content of the input file, the identity of
+    every transition program in the chain, and the target version.
+    Each entry holds the transitioned file along with the error and audit files from the run.  The total size of the
+    entries is capped, with the least recently used entries evicted first, and hit and miss counts are kept alongside.
+    The cache directory may be shared by several processes at once, so the index is only changed under a lock on a
+    file next to it.
+
+    The cache also holds the intermediate version of a file reached after each transition, keyed by the content of the
+    original input and the names of the transition programs run so far (see :py:meth:`intermediate_keys_for`).
+    Those keys deliberately leave out the program digests, so that a chain which only partly overlaps an earlier one,
+    even when run from a newer installation, can resume from the deepest version reached before.
+
+    :param cache_directory: The directory holding the cache, defaulting to :py:func:`default_cache_directory`
+    :param max_size_bytes: The total size of cached files above which old entries are evicted
+
+    :ivar hits: The number of lookups which found an entry, over the lifetime of the cache directory
+    :ivar misses: The number of lookups which did not find an entry, over the lifetime of the cache directory
+    """
+
+    def __init__(self, cache_directory=None, max_size_bytes=DEFAULT_MAX_SIZE_BYTES):
+        self.cache_directory = cache_directory or default_cache_directory()
+        self.max_size_bytes = max_size_bytes
+        self.entries_directory = os.path.join(self.cache_directory, 'entries')
+        self.index_path = os.path.join(self.cache_directory, 'index.json')
+        self._lock = _IndexLock(threading.Lock(), os.path.join(self.cache_directory, 'index.lock'))
+        if not os.path.isdir(self.entries_directory):
+            try:
+                os.makedirs(self.entries_directory)
+            except OSError:
+                if not os.path.isdir(self.entries_directory):
+                    raise
+
+    @property
+    def hits(self):
+        return self._load_index()['hits']
+
+    @property
+    def misses(self):
+        return self._load_index()['misses']
+
+    @staticmethod
+    def key_for(input_path, transitions, input_digest=None):
+        """
+        This function builds the cache key for running a chain of transitions on an input file
+
+        :param input_path: Absolute path to the original input file
+        :param transitions: The list of :py:class:`TransitionBinary <TransitionBinary.TransitionBinary>` instances to be
+            run, in order
+        :param input_digest: The :py:func:`file_digest` of the input file, if already known
+        :rtype: A hex digest string
+        """
+        parts = ['input:' + (input_digest or file_digest(input_path))]
+        parts.extend('step:' + binary_identity(tr) for tr in transitions)
+        parts.append('target:%s' % (transitions[-1].target_version if transitions else None))
+        return hashlib.sha256('\n'.join(parts).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def intermediate_keys_for(input_digest, transitions):
+        """
+        This function builds the cache keys for the intermediate versions of a file along a chain of transitions
+
+        :param input_digest: The :py:func:`file_digest` of the original input file
+        :param transitions: The list of :py:class:`TransitionBinary <TransitionBinary.TransitionBinary>` instances to be
+            run, in order
+        :rtype: A list of hex digest strings, where item i is the key for the file after transitions[i] has been run
+        """
+        keys = []
+        sha = hashlib.sha256(('input:' + input_digest).encode('utf-8'))
+        for tr in transitions:
+            # a version reached in this process is laid out differently from one written by the program
+            reached = tr.binary_name if tr.native_rules is None else binary_identity(tr)
+            sha.update(('\nreached:' + reached).encode('utf-8'))
+            keys.append(sha.copy().hexdigest())
+        return keys
+
+    def contains(self, key):
+        """
+        This function checks whether there is an entry for a key, without counting a hit or miss
+
+        :param key: The cache key
+        :rtype: True if there is an entry for the key
+        """
+        return os.path.isdir(os.path.join(self.entries_directory, key))
+
+    def lookup(self, key, run_dir, input_file_name, count=True):
+        """
+        This function restores a cached result into a run directory if there is one, counting the hit or miss
+
+        :param key: The cache key from :py:meth:`key_for` or :py:meth:`intermediate_keys_for`
+        :param run_dir: The directory to restore the transitioned file and its artifacts into
+        :param input_file_name: The file name of the input file in the run directory, which the results are named after
+        :param count: A boolean flag for whether to count this lookup in the hit and miss statistics
+        :rtype: True if the entry was found and restored, otherwise False
+        """
+        entry_directory = os.path.join(self.entries_directory, key)
+        found = os.path.isdir(entry_directory)
+        if found:
+            stem = os.path.splitext(input_file_name)[0]
+            try:
+                for stored_name in os.listdir(entry_directory):
+                    shutil.copyfile(os.path.join(entry_directory, stored_name),
+                                    os.path.join(run_dir, stored_name.replace(STEM_PLACEHOLDER, stem, 1)))
+            except (IOError, OSError):
+                found = False  # evicted by another process part way through
+        if not found and not count:
+            return False
+        with self._lock:
+            index = self._load_index()
+            if found and key in index['entries']:
+                index['entries'][key]['last_used'] = time.time()
+            if count:
+                index['hits' if found else 'misses'] += 1
+            self._save_index(index)
+        return found
+
+    def store(self, key, run_dir, input_file_name, artifacts=True):
+        """
+        This function adds the results of a successful run to the cache, then evicts old entries if it is too big
+
+        :param key: The cache key from :py:meth:`key_for` or :py:meth:`intermediate_keys_for`
+        :param run_dir: The directory holding the transitioned file and its artifacts
+        :param input_file_name: The file name of the transitioned file in the run directory
+        :param artifacts: A boolean flag for whether to store the error and audit files along with the transitioned file
+        """
+        if self.contains(key):
+            return
+        stem = os.path.splitext(input_file_name)[0]
+        names = [input_file_name]
+        for file_name in os.listdir(run_dir) if artifacts else []:
+            root, extension = os.path.splitext(file_name)
+            if root == stem and extension.lower() in CACHED_ARTIFACT_EXTENSIONS:
+                names.append(file_name)
+        # build the entry off to the side and move it into place, so nobody ever sees a partial entry
+        staging_directory = tempfile.mkdtemp(dir=self.cache_directory)
+        size = 0
+        for file_name in names:
+            stored_name = STEM_PLACEHOLDER + file_name[len(stem):]
+            shutil.copyfile(os.path.join(run_dir, file_name), os.path.join(staging_directory, stored_name))
+            size += os.path.getsize(os.path.join(staging_directory, stored_name))
+        entry_directory = os.path.join(self.entries_directory, key)
+        try:
+            os.rename(staging_directory, entry_directory)
+        except OSError:
+            shutil.rmtree(staging_directory, ignore_errors=True)  # another run stored the same result first
+            return
+        with self._lock:
+            index = self._load_index()
+            index['entries'][key] = {'size': size, 'last_used': time.time()}
+            self._save_index(index)
+        self.prune()
+
+    def prune(self, max_size_bytes=None):
+        """
+        This function evicts the least recently used entries until the cache fits within its size cap.  Any entry found
+        on disk but missing from the index is counted too, as last used when it was stored.
+
+        :param max_size_bytes: The size to prune down to, defaulting to the cache's own cap
+        :rtype: The number of entries evicted
+        """
+        if max_size_bytes is None:
+            max_size_bytes = self.max_size_bytes
+        with self._lock:
+            index = self._load_index()
+            entries = index['entries']
+            for key in os.listdir(self.entries_directory):
+                if key not in entries:
+                    # an entry the index lost track of, say through a crash between storing it and indexing it
+                    entry_directory = os.path.join(self.entries_directory, key)
+                    try:
+                        entries[key] = {'last_used': os.path.getmtime(entry_directory),
+                                        'size': sum(os.path.getsize(os.path.join(entry_directory, name))
+                                                    for name in os.listdir(entry_directory))}
+                    except OSError:
+                        pass  # evicted by another process meanwhile
+            total = sum(entry['size'] for entry in entries.values())
+            evicted = 0
+            for key in sorted(entries, key=lambda k: entries[k]['last_used']):
+                if total <= max_size_bytes:
+                    break
+                total -= entries[key]['size']
+                del entries[key]
+                shutil.rmtree(os.path.join(self.entries_directory, key), ignore_errors=True)
+                evicted += 1
+            self._save_index(index)
+        return evicted
+
+    def stats(self):
+        """
+        This function summarizes the contents and effectiveness of the cache
+
+        :rtype: A dictionary with the entry count, total size in bytes, size cap, and hit and miss counts
+        """
+        index = self._load_index()
+        return {
+            'entries': len(index['entries']),
+            'size_bytes': sum(entry['size'] for entry in index['entries'].values()),
+            'max_size_bytes': self.max_size_bytes,
+            'hits': index['hits'],
+            'misses': index['misses'],
+        }
+
+    def _load_index(self):
+        try:
+            with open(self.index_path) as f:
+                index = json.load(f)
+        except (IOError, OSError, ValueError):
+            index = {}
+        index.setdefault('entries', {})
+        index.setdefault('hits', 0)
+        index.setdefault('misses', 0)
+        return index
+
+    def _save_index(self, index):
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_directory)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(index, f)
+        if os.path.exists(self.index_path) and os.name == 'nt':
+            os.remove(self.index_path)  # rename will not replace an existing file on Windows
+        os.rename(temp_path, self.index_path)
@@ -0,0 +1,94 @@
+import heapq
+
+# The cost assumed for a transition program that has never been timed, when no other program has been timed either
+DEFAULT_STEP_SECONDS = 1.0
+
+
+class TransitionGraph(object):
+    """
+    This class plans the cheapest series of transitions between two versions using every transition program available.
+    Each program is an edge from its source version to its target version.  Every installation ships the programs for
+    the versions before it, and some releases also ship programs jumping several versions at once, so there is often
+    more than one way up; where several installations ship a program for the same step, the one from the newest
+    installation is used.  The cost of a step is how long that program has taken on average, as measured on earlier
+    runs, so a multi-version program is preferred when it is quicker than the single steps it replaces.
+
+    :param transitions: A list of :py:class:`TransitionBinary <TransitionBinary.TransitionBinary>` instances, ordered
+        from the oldest installation to the newest
+    :param step_seconds: An optional dictionary of the average measured run time in seconds of each transition
+        program, keyed by the full path to the program
+
+    :ivar edges: A dictionary of the transitions leaving each source version, keyed by source version, so that the
+        next steps from any version are found in a single lookup
+    """
+
+    def __init__(self, transitions, step_seconds=None):
+        self.step_seconds = step_seconds or {}
+        steps = {}
+        for tr in transitions:
+            steps[(tr.source_version, tr.target_version)] = tr  # later (newer) installations replace earlier ones
+        self.edges = {}
+        for tr in steps.values():
+            self.edges.setdefault(tr.source_version, []).append(tr)
+        measured = [self.step_seconds[tr.full_path_to_binary] for tr in steps.values()
+                    if tr.full_path_to_binary in self.step_seconds]
+        self.unmeasured_seconds = sum(measured) / len(measured) if measured else DEFAULT_STEP_SECONDS
+
+    def versions(self):
+        """
+        This function lists every version a file can be transitioned from or to
+
+        :rtype: A sorted list of versions
+        """
+        found = set(self.edges)
+        for transitions in self.edges.values():
+            found.update(tr.target_version for tr in transitions)
+        return sorted(found)
+
+    def step_cost(self, transition_instance):
+        """
+        This function returns the expected cost of running one transition program
+
+        :param transition_instance: A :py:class:`TransitionBinary <TransitionBinary.TransitionBinary>` instance
+        :rtype: The average measured run time in seconds, or the average over all measured programs if this one has
+            not been timed
+        """
+        return self.step_seconds.get(transition_instance.full_path_to_binary, self.unmeasured_seconds)
+
+    def plan(self, source_version, target_version):
+        """
+        This function finds the cheapest series of transitions from one version to another with Dijkstra's algorithm,
+        preferring fewer transitions between series of equal cost
+
+        :param source_version: The current version of the file, as an
+            :py:class:`EnergyPlusVersion <EnergyPlusVersion.EnergyPlusVersion>`
+        :param target_version: The version to bring the file up to, as an
+            :py:class:`EnergyPlusVersion <EnergyPlusVersion.EnergyPlusVersion>`
+        :rtype: A list of :py:class:`TransitionBinary <TransitionBinary.TransitionBinary>` instances to run in order,
+            which is empty if the file is already at the target version, or None if the target cannot be reached
+        """
+        if source_version == target_version:
+            return []
+        best = {source_version: (0.0, 0)}
+        previous = {}
+        heap = [(0.0, 0, source_version)]
+        while heap:
+            cost, hops, version = heapq.heappop(heap)
+            if version == target_version:
+                chain = []
+                while version != source_version:
+                    tr = previous[version]
+                    chain.append(tr)
+                    version = tr.source_version
+                return list(reversed(chain))
+            if (cost, hops) > best[version]:
+                continue  # already reached this version more cheaply
+            for tr in self.edges.get(version, []):
+                if tr.target_version <= version:
+                    continue  # transitions only ever go forward
+                candidate = (cost + self.step_cost(tr), hops + 1)
+                if tr.target_version not in best or candidate < best[tr.target_version]:
+                    best[tr.target_version] = candidate
+                    previous[tr.target_version] = tr
+                    heapq.heappush(heap, (candidate[0], candidate[1], tr.target_version))
+        return None
@@ -0,0 +1,305 @@
+import os
+import tempfile
+import threading
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:  # Python 2
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+from TransitionReport import OUTCOME_CANCELLED, OUTCOME_FAILED, OUTCOME_SUCCEEDED
+
+# Every metric name starts with this, so they are easy to find among those of other programs on a dashboard
+METRIC_PREFIX = 'idfversionupdater_'
+
+# The upper bounds of the histogram buckets for the time each transition takes, in seconds
+DEFAULT_DURATION_BUCKETS = (0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+# The upper bounds of the histogram buckets for the size of the file going into each transition, in bytes
+DEFAULT_SIZE_BUCKETS = (10 * 1024, 100 * 1024, 1024 * 1024, 10 * 1024 * 1024, 100 * 1024 * 1024, 1024 * 1024 * 1024)
+
+# The content type of the Prometheus text exposition format
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+OUTCOMES = [OUTCOME_SUCCEEDED, OUTCOME_FAILED, OUTCOME_CANCELLED]
+
+
+def escape_label_value(value):
+    """
+    This function escapes a label value for the Prometheus text exposition format
+
+    :param value: The value, which is converted to a string
+    :rtype: The escaped string, without the surrounding quotes
+    """
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(labels):
+    """
+    This function formats the labels of one sample, such as {source="8.5",target="8.6"}
+
+    :param labels: A list of (name, value) tuples, in the order they are to be written
+    :rtype: The formatted string, which is empty when there are no labels
+    """
+    if not labels:
+        return ''
+    return '{' + ','.join('%s="%s"' % (name, escape_label_value(value)) for name, value in labels) + '}'
+
+
+def format_value(value):
+    """
+    This function formats the value of one sample, writing whole numbers without a decimal point
+
+    :param value: An integer or floating point number
+    :rtype: The formatted string
+    """
+    if isinstance(value, float) and not value.is_integer():
+        return repr(value)
+    return str(int(value))
+
+
+class Histogram(object):
+    """
+    This class counts observed values into buckets by their upper bounds, as a Prometheus histogram does
+
+    :param buckets: The upper bounds of the buckets, in increasing order; an unbounded bucket is always added
+
+    :ivar counts: The number of observations in each bucket, not including those in lower buckets
+    :ivar total: The sum of every observed value
+    :ivar count: The number of observations
+    """
+
+    def __init__(self, buckets):
+        self.buckets = list(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        """
+        This function adds an observation
+
+        :param value: The observed value
+        """
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.total += value
+        self.count += 1
+
+    def samples(self, name, labels):
+        """
+        This function lists the samples of the histogram for the text exposition format, with cumulative bucket counts
+
+        :param name: The name of the histogram, without the _bucket, _sum or _count suffix
+        :param labels: A list of (name, value) label tuples common to every sample
+        :rtype: A list of lines
+        """
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + ['+Inf'], self.counts):
+            cumulative += count
+            bound = bound if bound == '+Inf' else format_value(bound)
+            lines.append('%s_bucket%s %d' % (name, format_labels(labels + [('le', bound)]), cumulative))
+        lines.append('%s_sum%s %s' % (name, format_labels(labels), format_value(self.total)))
+        lines.append('%s_count%s %d' % (name, format_labels(labels), self.count))
+        return lines
+
+
+class TransitionMetrics(object):
+    """
+    This class collects counts and histograms of the transitions run, for dashboards to scrape in the Prometheus text
+    format.  It is fed by every :py:class:`TransitionRunThread <TransitionRunThread.TransitionRunThread>` given it as
+    their metrics parameter, which may be running on many threads at once; a run given no metrics does no extra work.
+    The metrics can be served over HTTP with :py:class:`MetricsHTTPServer`, or written with :py:meth:`write_textfile`
+    for the textfile collector of the Prometheus node exporter.
+
+    :param duration_buckets: The upper bounds of the buckets of the transition duration histogram, in seconds
+    :param size_buckets: The upper bounds of the buckets of the input file size histogram, in bytes
+    """
+
+    def __init__(self, duration_buckets=DEFAULT_DURATION_BUCKETS, size_buckets=DEFAULT_SIZE_BUCKETS):
+        self.duration_buckets = duration_buckets
+        self.size_buckets = size_buckets
+        self._lock = threading.Lock()
+        self._started = {}
+        self._finished = {}
+        self._durations = {}
+        self._sizes = {}
+        self._runs = dict((outcome, 0) for outcome in OUTCOMES)
+        self._in_flight = set()
+
+    @staticmethod
+    def _hop(transition):
+        return str(transition.source_version), str(transition.target_version)
+
+    def transition_started(self, transition):
+        """
+        This function counts a transition program being started
+
+        :param transition: The :py:class:`TransitionBinary <TransitionBinary.TransitionBinary>` instance being run
+        """
+        hop = self._hop(transition)
+        with self._lock:
+            self._started[hop] = self._started.get(hop, 0) + 1
+
+    def transition_finished(self, step):
+        """
+        This function counts a transition program having ended, adding its duration and the size of the file it was
+        given to the histograms
+
+        :param step: The :py:class:`StepReport <TransitionReport.StepReport>` of the transition
+        """
+        hop = self._hop(step.transition)
+        with self._lock:
+            self._finished[hop + (step.outcome,)] = self._finished.get(hop + (step.outcome,), 0) + 1
+            if hop not in self._durations:
+                self._durations[hop] = Histogram(self.duration_buckets)
+                self._sizes[hop] = Histogram(self.size_buckets)
+            self._durations[hop].observe(step.wall_seconds)
+            if step.input_bytes is not None:
+                self._sizes[hop].observe(step.input_bytes)
+
+    def run_started(self, run):
+        """
+        This function counts a file as being in flight
+
+        :param run: The :py:class:`TransitionRunThread <TransitionRunThread.TransitionRunThread>` starting its run
+        """
+        with self._lock:
+            self._in_flight.add(id(run))
+
+    def run_finished(self, run):
+        """
+        This function counts a file as no longer being in flight, and counts the outcome of its run.  Runs which were
+        never started, such as those cancelled while still queued, are ignored.
+
+        :param run: The :py:class:`TransitionRunThread <TransitionRunThread.TransitionRunThread>` ending its run
+        """
+        with self._lock:
+            if id(run) not in self._in_flight:
+                return
+            self._in_flight.discard(id(run))
+            outcome = OUTCOME_CANCELLED if run.cancelled else OUTCOME_FAILED if run.failed else OUTCOME_SUCCEEDED
+            self._runs[outcome] += 1
+
+    def render(self, gauges=None):
+        """
+        This function writes out every metric in the Prometheus text exposition format
+
+        :param gauges: An optional list of (name, help, value) tuples of further gauges to include, whose names are
+            given without the metric prefix
+        :rtype: The text, ending with a newline
+        """
+        lines = []
+
+        def header(name, help_text, metric_type):
+            lines.append('# HELP %s%s %s' % (METRIC_PREFIX, name, help_text))
+            lines.append('# TYPE %s%s %s' % (METRIC_PREFIX, name, metric_type))
+
+        with self._lock:
+            header('transitions_started_total', 'Transition programs started, by source and target version', 'counter')
+            for (source, target), count in sorted(self._started.items()):
+                lines.append('%stransitions_started_total%s %d' % (
+                    METRIC_PREFIX, format_labels([('source', source), ('target', target)]), count))
+            header('transitions_finished_total',
+                   'Transition programs which have ended, by source and target version and outcome', 'counter')
+            for (source, target, outcome), count in sorted(self._finished.items()):
+                lines.append('%stransitions_finished_total%s %d' % (
+                    METRIC_PREFIX, format_labels([('source', source), ('target', target), ('outcome', outcome)]),
+                    count))
+            header('transition_duration_seconds', 'Wall clock time of each transition program', 'histogram')
+            for (source, target), histogram in sorted(self._durations.items()):
+                lines.extend(histogram.samples(METRIC_PREFIX + 'transition_duration_seconds',
+                                               [('source', source), ('target', target)]))
+            header('transition_input_bytes', 'Size of the file given to each transition program', 'histogram')
+            for (source, target), histogram in sorted(self._sizes.items()):
+                lines.extend(histogram.samples(METRIC_PREFIX + 'transition_input_bytes',
+                                               [('source', source), ('target', target)]))
+            header('runs_total', 'Files whose transition runs have ended, by outcome', 'counter')
+            for outcome in OUTCOMES:
+                lines.append('%sruns_total%s %d' % (METRIC_PREFIX, format_labels([('outcome', outcome)]),
+                                                    self._runs[outcome]))
+            header('runs_in_flight', 'Files being transitioned now', 'gauge')
+            lines.append('%sruns_in_flight %d' % (METRIC_PREFIX, len(self._in_flight)))
+        for name, help_text, value in gauges or []:
+            header(name, help_text, 'gauge')
+            lines.append('%s%s %s' % (METRIC_PREFIX, name, format_value(value)))
+        return '\n'.join(lines) + '\n'
+
+    def write_textfile(self, path):
+        """
+        This function writes out every metric for the textfile collector of the node exporter, which only reads files
+        ending in .prom.  The file is replaced in one step, so the collector never reads a partly written file.
+
+        :param path: The file to write
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.', suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            f.write(self.render())
+        if os.path.exists(path) and os.name == 'nt':
+            os.remove(path)  # rename will not replace an existing file on Windows
+        os.rename(temp_path, path)
+
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    """
+    This class answers ``GET /metrics`` for a :py:class:`MetricsHTTPServer` with the metrics in the Prometheus text
+    format
+    """
+
+    def do_GET(self):
+        if self.path.split('?')[0].rstrip('/') != '/metrics':
+            self.send_error(404)
+            return
+        body = self.server.metrics.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # scrapes come every few seconds and would drown out everything else
+
+
+class MetricsHTTPServer(ThreadingMixIn, HTTPServer):
+    """
+    This class serves the metrics of a :py:class:`TransitionMetrics` over HTTP for Prometheus to scrape, on a
+    background thread once :py:meth:`start` is called
+
+    :param address: A (host, port) tuple to listen on; a port of 0 picks any free port
+    :param metrics: The :py:class:`TransitionMetrics` to serve
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, metrics):
+        HTTPServer.__init__(self, address, MetricsRequestHandler)
+        self.metrics = metrics
+        self._thread = None
+
+    def start(self):
+        """
+        This function starts serving on a background thread
+        """
+        self._thread = threading.Thread(target=self.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """
+        This function stops serving and closes the listening socket
+        """
+        if self._thread is not None:
+            self.shutdown()
+            self._thread.join()
+            self._thread = None
+        self.server_close()
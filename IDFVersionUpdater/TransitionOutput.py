@@ -0,0 +1,159 @@
+import collections
+import os
+import re
+import threading
+import time
+
+try:
+    import queue
+except ImportError:  # Python 2
+    import Queue as queue
+
+# Only the most recent output of a transition program is kept; a large file can produce a great deal of it
+MAX_OUTPUT_LINES = 1000
+
+# Progress messages are passed on at most this often, so that a chatty program does not flood the status bar
+MESSAGE_INTERVAL_SECONDS = 0.5
+
+# The ways a program may report how far through it is: '42%', or an object count such as '1234 of 5678'
+PERCENT_PATTERN = re.compile(r'(\d+(?:\.\d+)?)\s*%')
+COUNT_PATTERN = re.compile(r'(\d+)\s+of\s+(\d+)', re.IGNORECASE)
+
+
+def parse_progress(line):
+    """
+    This function looks for an indication of how far through its work a program is in a line of its output
+
+    :param line: A line of output, as text
+    :rtype: The fraction complete between 0 and 1, or None if the line does not say
+    """
+    match = PERCENT_PATTERN.search(line)
+    if match is not None:
+        return min(float(match.group(1)) / 100.0, 1.0)
+    match = COUNT_PATTERN.search(line)
+    if match is not None and 0 < int(match.group(1)) <= int(match.group(2)):
+        return float(match.group(1)) / int(match.group(2))
+    return None
+
+
+def wait_for_exit(process):
+    """
+    This function waits for a process to exit, collecting the resources it used where the platform reports them for
+    each process.  Unlike resource.getrusage(RUSAGE_CHILDREN), which adds up every child process that has finished,
+    this measures the one process even while others are running alongside it.
+
+    :param process: A subprocess.Popen instance
+    :rtype: A tuple of the exit code and the resource.struct_rusage of the process, which is None where not known
+    """
+    if not hasattr(os, 'wait4') or process.returncode is not None:
+        return process.wait(), None
+    try:
+        pid, status, usage = os.wait4(process.pid, 0)
+    except OSError:
+        return process.wait(), None  # already waited for elsewhere, for example by a poll() while cancelling
+    if os.WIFSIGNALED(status):
+        process.returncode = -os.WTERMSIG(status)
+    else:
+        process.returncode = os.WEXITSTATUS(status)
+    return process.returncode, usage
+
+
+class OutputMonitor(object):
+    """
+    This class follows the output of a running transition program as it is written, rather than once it has exited.
+    Each pipe is read a line at a time on its own thread, since pipes cannot be waited on together on every platform.
+    The latest line, or the percent complete where the program reports it, is passed to a message callback at most
+    every :py:data:`MESSAGE_INTERVAL_SECONDS`, and only the last :py:data:`MAX_OUTPUT_LINES` lines of each pipe are
+    kept.
+
+    :param msg_callback: A Python function called with each progress message
+    :param prefix: The text to start each progress message with, such as 'Running Transition 8.5 -> 8.6'
+    :param max_lines: The number of lines of each pipe to keep
+    :param interval: The shortest time in seconds between progress messages
+
+    :ivar fraction_complete: The most recent fraction complete reported by the program, or None if it has not said
+    :ivar resource_usage: Once the program has exited, its resource.struct_rusage where the platform reports it; see
+        :py:func:`wait_for_exit`
+    """
+
+    def __init__(self, msg_callback, prefix, max_lines=MAX_OUTPUT_LINES, interval=MESSAGE_INTERVAL_SECONDS):
+        self.msg_callback = msg_callback
+        self.prefix = prefix
+        self.interval = interval
+        self.lines = {'stdout': collections.deque(maxlen=max_lines), 'stderr': collections.deque(maxlen=max_lines)}
+        self.fraction_complete = None
+        self.resource_usage = None
+        self._pending = None
+        self._last_message_time = 0.0
+
+    def follow(self, process):
+        """
+        This function reads a process's standard output and error until both are closed, then waits for it to exit
+
+        :param process: A subprocess.Popen instance started with stdout and stderr set to subprocess.PIPE
+        :rtype: The exit code of the process
+        """
+        lines = queue.Queue()
+        readers = [threading.Thread(target=self._read_pipe, args=(pipe, name, lines))
+                   for pipe, name in [(process.stdout, 'stdout'), (process.stderr, 'stderr')]]
+        for reader in readers:
+            reader.daemon = True
+            reader.start()
+        open_pipes = len(readers)
+        while open_pipes:
+            try:
+                name, line = lines.get(timeout=self.interval)
+            except queue.Empty:
+                self._flush()
+                continue
+            if line is None:
+                open_pipes -= 1
+            else:
+                self.add_line(name, line)
+        self._flush()
+        return_code, self.resource_usage = wait_for_exit(process)
+        return return_code
+
+    def add_line(self, name, line):
+        """
+        This function records a line of output and passes on progress, unless a message was sent very recently
+
+        :param name: The pipe the line came from, either 'stdout' or 'stderr'
+        :param line: The line as bytes, including its line ending
+        """
+        self.lines[name].append(line)
+        text = line.decode('utf-8', 'replace').strip()
+        if not text:
+            return
+        fraction = parse_progress(text)
+        if fraction is not None:
+            self.fraction_complete = fraction
+            self._pending = "%s (%d%%)" % (self.prefix, int(fraction * 100))
+        else:
+            self._pending = "%s: %s" % (self.prefix, text)
+        if time.time() - self._last_message_time >= self.interval:
+            self._flush()
+
+    def output(self, name):
+        """
+        This function returns the output kept from one of the pipes
+
+        :param name: Either 'stdout' or 'stderr'
+        :rtype: The last lines written to the pipe, joined together as bytes
+        """
+        return b''.join(self.lines[name])
+
+    def _flush(self):
+        if self._pending is not None:
+            self.msg_callback(self._pending)
+            self._pending = None
+            self._last_message_time = time.time()
+
+    @staticmethod
+    def _read_pipe(pipe, name, lines):
+        try:
+            for line in iter(pipe.readline, b''):
+                lines.put((name, line))
+        finally:
+            pipe.close()
+            lines.put((name, None))
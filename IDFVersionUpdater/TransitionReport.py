@@ -0,0 +1,185 @@
+import json
+import os
+import sys
+import time
+
+# The ways a transition, or a whole run, can end
+OUTCOME_SUCCEEDED = 'succeeded'
+OUTCOME_FAILED = 'failed'
+OUTCOME_CANCELLED = 'cancelled'
+
+# The ways a transition can be run: by its transition program, or in this process by its rule set
+ENGINE_BINARY = 'binary'
+ENGINE_NATIVE = 'native'
+
+
+def file_size(path):
+    """
+    This function returns the size of a file, if it exists
+
+    :param path: Absolute path to the file
+    :rtype: The size in bytes, or None if there is no such file
+    """
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return None
+
+
+class StepReport(object):
+    """
+    This class holds the measurements of one transition program run on one file.
+    The processor time and peak memory are those of the transition program alone, and are only known on platforms
+    which report them for each process (all but Windows); elsewhere they are None.
+
+    :param transition: The :py:class:`TransitionBinary <TransitionBinary.TransitionBinary>` instance run
+    :param input_bytes: The size of the file before the transition
+
+    :ivar engine: ENGINE_BINARY if the transition program was run, or ENGINE_NATIVE if the transition was run in this
+        process by its :py:class:`RuleSet <TransitionRules.RuleSet>`, in which case the processor time and peak memory
+        are not known
+    :ivar outcome: One of the OUTCOME_* constants in this module, once the transition has ended
+    :ivar return_code: The exit code of the transition program, or None if it was never started
+    :ivar wall_seconds: The wall clock time the transition program ran for
+    :ivar user_cpu_seconds: The processor time the transition program spent running its own code
+    :ivar system_cpu_seconds: The processor time spent in the operating system on behalf of the transition program
+    :ivar max_rss_bytes: The peak resident memory of the transition program
+    :ivar output_bytes: The size of the file after the transition, or None if the program left no file behind
+    :ivar backup_seconds: The time taken to keep a backup of the file from before the transition, or None if no backup
+        was made
+    """
+
+    def __init__(self, transition, input_bytes):
+        self.transition = transition
+        self.input_bytes = input_bytes
+        self.engine = ENGINE_BINARY if transition.native_rules is None else ENGINE_NATIVE
+        self.outcome = None
+        self.return_code = None
+        self.wall_seconds = 0.0
+        self.user_cpu_seconds = None
+        self.system_cpu_seconds = None
+        self.max_rss_bytes = None
+        self.output_bytes = None
+        self.backup_seconds = None
+
+    def add_resource_usage(self, usage):
+        """
+        This function records the processor time and peak memory used by the transition program
+
+        :param usage: The resource.struct_rusage of the transition program process, or None if it is not known
+        """
+        if usage is None:
+            return
+        self.user_cpu_seconds = usage.ru_utime
+        self.system_cpu_seconds = usage.ru_stime
+        # Mac reports the peak in bytes, while Linux and the other Unixes report kilobytes
+        self.max_rss_bytes = usage.ru_maxrss if sys.platform == 'darwin' else usage.ru_maxrss * 1024
+
+    def describe(self):
+        """
+        This function returns a short description of the transition and how long it took, such as '8.6 -> 8.7 (4.2 s)'
+
+        :rtype: A string
+        """
+        return "%s -> %s (%.1f s)" % (self.transition.source_version, self.transition.target_version,
+                                      self.wall_seconds)
+
+    def to_dict(self):
+        """
+        This function describes the step in a form which can be written out as JSON
+
+        :rtype: A dictionary of JSON-serializable values
+        """
+        return {
+            'source_version': str(self.transition.source_version),
+            'target_version': str(self.transition.target_version),
+            'binary': self.transition.full_path_to_binary,
+            'engine': self.engine,
+            'outcome': self.outcome,
+            'return_code': self.return_code,
+            'wall_seconds': self.wall_seconds,
+            'user_cpu_seconds': self.user_cpu_seconds,
+            'system_cpu_seconds': self.system_cpu_seconds,
+            'max_rss_bytes': self.max_rss_bytes,
+            'input_bytes': self.input_bytes,
+            'output_bytes': self.output_bytes,
+            'backup_seconds': self.backup_seconds,
+        }
+
+
+class RunReport(object):
+    """
+    This class holds the measurements of a whole transition run of one file, with a :py:class:`StepReport` for each
+    transition program run, so a slow run can be traced to the transition at fault
+
+    :param input_path: Absolute path to the original input file
+
+    :ivar input_bytes: The size of the original input file
+    :ivar started: The time the run started, in seconds since the epoch
+    :ivar elapsed: The wall clock time of the whole run, once finished
+    :ivar outcome: One of the OUTCOME_* constants in this module, once the run has finished
+    :ivar steps: The list of :py:class:`StepReport` instances, in the order the transitions ran
+    :ivar cache_hit: True if the results were restored from the cache without running any transitions
+    :ivar in_memory: True if the run took place on a RAM-backed directory
+    :ivar bytes_copied: The number of bytes copied to make backups and intermediate snapshots
+    :ivar bytes_avoided: The number of bytes of backups and intermediate snapshots kept without copying
+    """
+
+    def __init__(self, input_path):
+        self.input_path = input_path
+        self.input_bytes = file_size(input_path)
+        self.started = time.time()
+        self.elapsed = 0.0
+        self.outcome = None
+        self.steps = []
+        self.cache_hit = False
+        self.in_memory = False
+        self.bytes_copied = 0
+        self.bytes_avoided = 0
+
+    def finish(self, outcome):
+        """
+        This function marks the run as over
+
+        :param outcome: One of the OUTCOME_* constants in this module
+        """
+        self.outcome = outcome
+        self.elapsed = time.time() - self.started
+
+    def slowest_step(self):
+        """
+        This function finds the transition which took the longest
+
+        :rtype: The :py:class:`StepReport` with the longest wall clock time, or None if no transitions were run
+        """
+        if not self.steps:
+            return None
+        return max(self.steps, key=lambda step: step.wall_seconds)
+
+    def to_dict(self):
+        """
+        This function describes the run in a form which can be written out as JSON
+
+        :rtype: A dictionary of JSON-serializable values
+        """
+        return {
+            'input_path': self.input_path,
+            'input_bytes': self.input_bytes,
+            'started': self.started,
+            'elapsed': self.elapsed,
+            'outcome': self.outcome,
+            'cache_hit': self.cache_hit,
+            'in_memory': self.in_memory,
+            'bytes_copied': self.bytes_copied,
+            'bytes_avoided': self.bytes_avoided,
+            'steps': [step.to_dict() for step in self.steps],
+        }
+
+    def save(self, path):
+        """
+        This function writes the report to a JSON file
+
+        :param path: The file to write
+        """
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2, sort_keys=True)
@@ -0,0 +1,439 @@
+import glob
+import hashlib
+import json
+import os
+
+from EnergyPlusVersion import EnergyPlusVersion
+from IdfObjects import iter_idf_objects, open_idf
+
+
+class TransitionRule(object):
+    """
+    This class is the base of the rules making up a :py:class:`RuleSet`, each of which changes the objects of one class.
+    Rules are written as JSON objects with a "rule" member naming the kind of rule, a "class" member naming the class
+    it applies to, and further members depending on the kind; see :py:data:`RULE_TYPES`.
+    Fields are numbered from 1 for the field after the class name, as in the IDD.
+
+    :param class_name: The class of object the rule applies to, matched regardless of case
+
+    :ivar class_name: Copy of the class name passed into the constructor
+    :cvar object_local: True for rules which change each object on its own, without looking at any other object, so
+        the objects of a file can be split between processes; a rule which needs other objects must set it to False
+    """
+
+    rule = None
+    object_local = True
+
+    def __init__(self, class_name):
+        self.class_name = class_name
+
+    def apply(self, idf_object):
+        """
+        This function applies the rule to one object of its class
+
+        :param idf_object: The :py:class:`IdfObject <IdfObjects.IdfObject>` to change
+        :rtype: The object to write out in its place, or None to leave it out of the new file
+        """
+        raise NotImplementedError
+
+    def to_dict(self):
+        """
+        This function describes the rule in the form it is read from JSON
+
+        :rtype: A dictionary of JSON-serializable values
+        """
+        return {'rule': self.rule, 'class': self.class_name}
+
+
+class RenameObject(TransitionRule):
+    """
+    This rule changes the class name of an object, such as {"rule": "rename_object", "class": "Coil:Heating:Gas",
+    "new_class": "Coil:Heating:Fuel"}
+    """
+
+    rule = 'rename_object'
+
+    def __init__(self, class_name, new_class):
+        TransitionRule.__init__(self, class_name)
+        self.new_class = new_class
+
+    def apply(self, idf_object):
+        idf_object.rename(self.new_class)
+        return idf_object
+
+    def to_dict(self):
+        result = TransitionRule.to_dict(self)
+        result['new_class'] = self.new_class
+        return result
+
+
+class DeleteObject(TransitionRule):
+    """
+    This rule leaves every object of a class out of the new file, such as {"rule": "delete_object", "class":
+    "Sizing:Parameters"}
+    """
+
+    rule = 'delete_object'
+
+    def apply(self, idf_object):
+        return None
+
+
+class InsertField(TransitionRule):
+    """
+    This rule inserts a field, such as {"rule": "insert_field", "class": "Zone", "field": 3, "value": "",
+    "note": "Floor Area"}.  Objects ending before the field, which leave it and everything after it at their defaults,
+    are left as they are.
+    """
+
+    rule = 'insert_field'
+
+    def __init__(self, class_name, field, value, note=''):
+        TransitionRule.__init__(self, class_name)
+        self.field = field
+        self.value = value
+        self.note = note
+
+    def apply(self, idf_object):
+        if self.field <= idf_object.num_fields + 1:
+            idf_object.insert_field(self.field, self.value, self.note)
+        return idf_object
+
+    def to_dict(self):
+        result = TransitionRule.to_dict(self)
+        result.update({'field': self.field, 'value': self.value, 'note': self.note})
+        return result
+
+
+class DeleteField(TransitionRule):
+    """
+    This rule deletes a field, such as {"rule": "delete_field", "class": "Zone", "field": 2}
+    """
+
+    rule = 'delete_field'
+
+    def __init__(self, class_name, field):
+        TransitionRule.__init__(self, class_name)
+        self.field = field
+
+    def apply(self, idf_object):
+        if self.field <= idf_object.num_fields:
+            idf_object.delete_field(self.field)
+        return idf_object
+
+    def to_dict(self):
+        result = TransitionRule.to_dict(self)
+        result['field'] = self.field
+        return result
+
+
+class RenameField(TransitionRule):
+    """
+    This rule changes the note naming a field, such as {"rule": "rename_field", "class": "Zone", "field": 2,
+    "note": "Direction of Relative North"}
+    """
+
+    rule = 'rename_field'
+
+    def __init__(self, class_name, field, note):
+        TransitionRule.__init__(self, class_name)
+        self.field = field
+        self.note = note
+
+    def apply(self, idf_object):
+        if self.field <= idf_object.num_fields:
+            idf_object.set_note(self.field, self.note)
+        return idf_object
+
+    def to_dict(self):
+        result = TransitionRule.to_dict(self)
+        result.update({'field': self.field, 'note': self.note})
+        return result
+
+
+class ReplaceValue(TransitionRule):
+    """
+    This rule replaces choices of a field which have been renamed, such as {"rule": "replace_value", "class":
+    "Zone", "field": 4, "values": {"Yes": "True"}}.  Values are matched regardless of case; others are left as they
+    are.
+    """
+
+    rule = 'replace_value'
+
+    def __init__(self, class_name, field, values):
+        TransitionRule.__init__(self, class_name)
+        self.field = field
+        self.values = values
+        self._upper_values = dict((old.upper(), new) for old, new in values.items())
+
+    def apply(self, idf_object):
+        value = idf_object.field(self.field)
+        if value is not None and value.upper() in self._upper_values:
+            idf_object.set_field(self.field, self._upper_values[value.upper()])
+        return idf_object
+
+    def to_dict(self):
+        result = TransitionRule.to_dict(self)
+        result.update({'field': self.field, 'values': self.values})
+        return result
+
+
+# The kinds of rule, by the name given in the "rule" member of their JSON
+RULE_TYPES = dict((rule_type.rule, rule_type) for rule_type in [
+    RenameObject, DeleteObject, InsertField, DeleteField, RenameField, ReplaceValue])
+
+
+def rule_from_dict(description):
+    """
+    This function builds a rule from its JSON form
+
+    :param description: A dictionary with a "rule" and a "class" member, and the further members of that kind of rule
+    :rtype: A :py:class:`TransitionRule` instance
+    """
+    description = dict(description)
+    try:
+        rule_type = RULE_TYPES[description.pop('rule')]
+        description['class_name'] = description.pop('class')
+        return rule_type(**description)
+    except (KeyError, TypeError) as e:
+        raise ValueError("Invalid transition rule %s: %s" % (json.dumps(description, sort_keys=True), e))
+
+
+class RuleSet(object):
+    """
+    This class brings input files up one version in this process, as the transition program for that version would,
+    by applying a list of rules declared as data.  Every object passes through unchanged unless a rule applies to its
+    class, apart from the Version object, which always has its version updated.  The rules for a class are applied in
+    the order given, all matching the class the object had before the transition.
+    Only the changes which can be made one object at a time can be declared; versions whose transition program does
+    more, such as splitting objects or looking one object up from another, are left to the program.
+
+    :param source_version: The :py:class:`EnergyPlusVersion <EnergyPlusVersion.EnergyPlusVersion>` files are brought up
+        from
+    :param target_version: The :py:class:`EnergyPlusVersion <EnergyPlusVersion.EnergyPlusVersion>` files are brought up
+        to
+    :param rules: A list of :py:class:`TransitionRule` instances
+
+    :ivar source_version: Copy of the source version passed into the constructor
+    :ivar target_version: Copy of the target version passed into the constructor
+    :ivar rules: Copy of the list of rules passed into the constructor
+    """
+
+    def __init__(self, source_version, target_version, rules=None):
+        self.source_version = source_version
+        self.target_version = target_version
+        self.rules = list(rules or [])
+        self._rules_by_class = {}
+        for rule in self.rules:
+            self._rules_by_class.setdefault(rule.class_name.upper(), []).append(rule)
+        self._digest = None
+
+    @classmethod
+    def from_dict(cls, description):
+        """
+        This function builds a rule set from its JSON form
+
+        :param description: A dictionary with "source" and "target" version strings, such as "8.5", and a list of
+            "rules"
+        :rtype: A :py:class:`RuleSet` instance
+        """
+        try:
+            source_version = EnergyPlusVersion.parse(description['source'])
+            target_version = EnergyPlusVersion.parse(description['target'])
+        except (KeyError, ValueError) as e:
+            raise ValueError("A transition rule set needs valid source and target versions: %s" % e)
+        return cls(source_version, target_version, [rule_from_dict(rule) for rule in description.get('rules', [])])
+
+    @classmethod
+    def load(cls, path):
+        """
+        This function reads a rule set from a JSON file
+
+        :param path: Path to the file
+        :rtype: A :py:class:`RuleSet` instance
+        """
+        with open(path) as f:
+            try:
+                description = json.load(f)
+            except ValueError as e:
+                raise ValueError("%s is not valid JSON: %s" % (path, e))
+        try:
+            return cls.from_dict(description)
+        except ValueError as e:
+            raise ValueError("%s: %s" % (path, e))
+
+    def to_dict(self):
+        """
+        This function describes the rule set in the form it is read from JSON
+
+        :rtype: A dictionary of JSON-serializable values
+        """
+        return {'source': str(self.source_version), 'target': str(self.target_version),
+                'rules': [rule.to_dict() for rule in self.rules]}
+
+    @property
+    def object_local(self):
+        """
+        True if every rule changes each object on its own, so the file can be split into shards transformed separately
+        by :py:func:`transform_file_sharded <ShardedTransform.transform_file_sharded>`
+        """
+        return all(rule.object_local for rule in self.rules)
+
+    @property
+    def digest(self):
+        """
+        A digest of the rules, which changes whenever they do, so results of different rules are never confused in the
+        :py:class:`TransitionCache <TransitionCache.TransitionCache>`
+        """
+        if self._digest is None:
+            canonical = json.dumps(self.to_dict(), sort_keys=True, separators=(',', ':'))
+            self._digest = hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+        return self._digest
+
+    def transform(self, idf_objects):
+        """
+        This function applies the rules to a stream of objects, one at a time
+
+        :param idf_objects: An iterable of :py:class:`IdfObject <IdfObjects.IdfObject>` instances at the source version
+        :rtype: A generator of the objects at the target version
+        """
+        rules_by_class = self._rules_by_class
+        for idf_object in idf_objects:
+            class_name = idf_object.class_name
+            if class_name is None:
+                yield idf_object
+                continue
+            upper = class_name.upper()
+            if upper == 'VERSION':
+                idf_object.set_field(1, str(self.target_version))
+            for rule in rules_by_class.get(upper, ()):
+                idf_object = rule.apply(idf_object)
+                if idf_object is None:
+                    break
+            if idf_object is not None:
+                yield idf_object
+
+    def transform_file(self, input_path, output_path):
+        """
+        This function brings a whole file up one version with :py:func:`transform_file`
+
+        :param input_path: Path to the file at the source version
+        :param output_path: Path to write the file at the target version to
+        """
+        transform_file([self], input_path, output_path)
+
+
+def check_chain(rule_sets):
+    """
+    This function checks that a series of rule sets can be applied one after another
+
+    :param rule_sets: The list of :py:class:`RuleSet` instances, in order
+    :raises ValueError: If a rule set does not start from the version the one before it ends at
+    """
+    for before, after in zip(rule_sets, rule_sets[1:]):
+        if after.source_version != before.target_version:
+            raise ValueError("Cannot chain the transition to %s with one from %s" % (
+                before.target_version, after.source_version))
+
+
+def transform_objects(rule_sets, idf_objects):
+    """
+    This function applies a series of rule sets to a stream of objects.  The rule sets are chained as generators, so
+    each object flows through every transition in turn before the next is read.
+
+    :param rule_sets: The list of :py:class:`RuleSet` instances to apply, in order
+    :param idf_objects: An iterable of :py:class:`IdfObject <IdfObjects.IdfObject>` instances at the source version of
+        the first rule set
+    :rtype: A generator of the objects at the target version of the last rule set
+    """
+    for rule_set in rule_sets:
+        idf_objects = rule_set.transform(idf_objects)
+    return idf_objects
+
+
+def transform_stream(rule_sets, input_stream, output_stream):
+    """
+    This function applies a series of rule sets to the objects read from one stream with :py:func:`transform_objects`,
+    writing each to another as soon as it has been through every transition
+
+    :param rule_sets: The list of :py:class:`RuleSet` instances to apply, in order
+    :param input_stream: A text file object to read from, as opened by :py:func:`open_idf <IdfObjects.open_idf>`
+    :param output_stream: A text file object to write to, likewise
+    """
+    idf_objects = transform_objects(rule_sets, iter_idf_objects(input_stream))
+    output_stream.writelines(idf_object.text for idf_object in idf_objects)
+
+
+def transform_file(rule_sets, input_path, output_path):
+    """
+    This function brings a whole file up through a series of transitions in a single pass with
+    :py:func:`transform_stream`, so the file is read and written only once however many transitions there are.
+    Memory use depends on the largest object rather than the size of the file.
+
+    :param rule_sets: The list of :py:class:`RuleSet` instances to apply, each taking the file up from the target
+        version of the one before
+    :param input_path: Path to the file at the source version of the first rule set
+    :param output_path: Path to write the file at the target version of the last rule set to
+    """
+    check_chain(rule_sets)
+    with open_idf(input_path) as input_file:
+        with open_idf(output_path, 'w') as output_file:
+            transform_stream(rule_sets, input_file, output_file)
+
+
+class RuleRegistry(object):
+    """
+    This class holds the rule sets available for running transitions in this process, and hands them to the
+    :py:class:`TransitionBinary <TransitionBinary.TransitionBinary>` instances of matching versions.
+    Transitions with a rule set are then run in this process, without starting the transition program; all others
+    still run the program, so a chain can freely mix the two.
+
+    :ivar rule_sets: A dictionary of :py:class:`RuleSet` instances by their (source version, target version)
+    """
+
+    def __init__(self):
+        self.rule_sets = {}
+
+    def add(self, rule_set):
+        """
+        This function adds a rule set, replacing any for the same versions
+
+        :param rule_set: A :py:class:`RuleSet` instance
+        """
+        self.rule_sets[(rule_set.source_version, rule_set.target_version)] = rule_set
+
+    def load_directory(self, directory):
+        """
+        This function adds a rule set from every JSON file in a directory
+
+        :param directory: Path to the directory
+        :rtype: The number of rule sets added
+        """
+        paths = sorted(glob.glob(os.path.join(directory, '*.json')))
+        for path in paths:
+            self.add(RuleSet.load(path))
+        return len(paths)
+
+    def rule_set_for(self, source_version, target_version):
+        """
+        This function finds the rule set for one transition
+
+        :param source_version: The :py:class:`EnergyPlusVersion <EnergyPlusVersion.EnergyPlusVersion>` transitioned from
+        :param target_version: The :py:class:`EnergyPlusVersion <EnergyPlusVersion.EnergyPlusVersion>` transitioned to
+        :rtype: A :py:class:`RuleSet` instance, or None if there is none
+        """
+        return self.rule_sets.get((source_version, target_version))
+
+    def attach(self, transitions):
+        """
+        This function sets the native_rules of each transition which has a rule set, so it runs in this process
+
+        :param transitions: An iterable of :py:class:`TransitionBinary <TransitionBinary.TransitionBinary>` instances
+        :rtype: The number of transitions which will run in this process
+        """
+        attached = 0
+        for tr in transitions:
+            tr.native_rules = self.rule_set_for(tr.source_version, tr.target_version)
+            if tr.native_rules is not None:
+                attached += 1
+        return attached
@@ -2,8 +2,17 @@ import os
 import shutil
 import subprocess
 import threading
+import time
 
+from IncrementalTransform import ObjectMemo, memo_key, transform_file_incremental
+from IntermediateArchive import IntermediateArchive
 from International import translate as _
+from ShardedTransform import transform_file_sharded
+from TransitionCache import file_digest
+from TransitionOutput import OutputMonitor
+from TransitionReport import (RunReport, StepReport, file_size, ENGINE_BINARY, OUTCOME_CANCELLED, OUTCOME_FAILED,
+                              OUTCOME_SUCCEEDED)
+from TransitionWorkspace import TransitionWorkspace, estimate_scratch_bytes, ram_scratch_parent, clone_file, CLONE_COPY
 
 
 class TransitionRunThread(threading.Thread):
@@ -16,61 +25,343 @@ class TransitionRunThread(threading.Thread):
     :param keep_old: A boolean flag for whether to keep an extra backup of the original file to be transitioned in the run folder
     :param msg_callback: A Python function to be called back by this thread when a message can be displayed
     :param done_callback: A Python function to be called back by this thread when the transition process is complete
+    :param isolated: A boolean flag for whether to run in a private scratch directory instead of the shared working
+        directory, so that several transitions can run at once; see
+        :py:class:`TransitionWorkspace <TransitionWorkspace.TransitionWorkspace>`
+    :param scratch_parent: The directory to create the private scratch directory in when isolated, defaulting to the
+        system temp directory
+    :param ram_directory: A RAM-backed directory, such as /dev/shm, to place the private scratch directory on when
+        isolated.  It is only used when it has room for the whole run, including any backups and cached intermediate
+        versions; otherwise the scratch directory goes in scratch_parent as usual.  In memory, intermediate versions
+        are only written to the cache once the run is over.
+    :param cache: An optional :py:class:`TransitionCache <TransitionCache.TransitionCache>` instance; when the same
+        input has already been run through the same chain, the results are restored from it instead of running the
+        transition programs, and otherwise the run resumes from the newest cached intermediate version of the input.
+        The version reached after every successful transition, and the final results, are added to it.
+    :param compression: When keep_old is set, an optional compression method from
+        :py:func:`available_compressions <IntermediateArchive.available_compressions>`; once the run is over the
+        intermediate versions are packed into an
+        :py:class:`IntermediateArchive <IntermediateArchive.IntermediateArchive>` in the run directory instead of being
+        left as full copies
+    :param step_callback: An optional Python function called with the
+        :py:class:`StepReport <TransitionReport.StepReport>` of each transition as soon as it has ended, for exporting
+        metrics; it is called from the thread running the transition
+    :param metrics: An optional :py:class:`TransitionMetrics <TransitionMetrics.TransitionMetrics>` instance to count
+        the run and each of its transitions in
+    :param shard_workers: The number of processes a large file may be split across when transitions are run in this
+        process by their rule sets; see
+        :py:func:`transform_file_sharded <ShardedTransform.transform_file_sharded>`.  The default of 1 never splits it.
+    :param memo_directory: An optional directory to keep the output of transitions run in this process in, along with
+        the digest of every object they came from, so that when this file is run again after being edited only its
+        changed objects are transformed; see
+        :py:func:`transform_file_incremental <IncrementalTransform.transform_file_incremental>`.  Files are not split
+        across processes when this is given.
 
-    :ivar std_out: The standard output from the transition process
-    :ivar std_err: The standard error output from the transition process
+    :ivar run_dir: The directory the transitions actually run in, which holds the transitioned file afterwards
+    :ivar std_out: The standard output from the transition process, up to the last lines kept by
+        :py:class:`OutputMonitor <TransitionOutput.OutputMonitor>`
+    :ivar std_err: The standard error output from the transition process, likewise
+    :ivar fraction_complete: The fraction of the running transition completed, where the program reports it
+    :ivar failed: True once a run has stopped because a transition (or the backup before it) failed
+    :ivar cache_hit: True if the most recent run was satisfied from the cache
+    :ivar in_memory: True if the most recent run took place on the RAM-backed directory
+    :ivar step_times: A list of (:py:class:`TransitionBinary <TransitionBinary.TransitionBinary>`, run time in seconds)
+        tuples for each transition program completed successfully in the most recent run
+    :ivar bytes_copied: The number of bytes physically copied to make backups and intermediate snapshots in the most
+        recent run
+    :ivar bytes_avoided: The number of bytes of backups and intermediate snapshots in the most recent run which were
+        made by reflinking instead of copying
+    :ivar report: The :py:class:`RunReport <TransitionReport.RunReport>` of the most recent run, with the time,
+        processor time, peak memory and file sizes of each transition, or None before the first run
     """
 
-    def __init__(self, transitions_to_run, working_directory, original_file_path, keep_old, msg_callback, done_callback):
+    def __init__(self, transitions_to_run, working_directory, original_file_path, keep_old, msg_callback, done_callback,
+                 isolated=False, scratch_parent=None, cache=None, ram_directory=None, compression=None,
+                 step_callback=None, metrics=None, shard_workers=1, memo_directory=None):
         self.p = None
         self.std_out = None
         self.std_err = None
+        self.fraction_complete = None
         self.transitions = transitions_to_run
+        self.transition_directory = working_directory
         self.run_dir = working_directory
+        self.isolated = isolated
+        self.scratch_parent = scratch_parent
+        self.ram_directory = ram_directory
+        self.in_memory = False
+        self.workspace = None
+        if isolated:
+            self.workspace = TransitionWorkspace(working_directory, scratch_parent)
         self.input_file = original_file_path
         self.keep_old = keep_old
+        self.compression = compression
         self.msg_callback = msg_callback
         self.done_callback = done_callback
         self.cancelled = False
+        self.failed = False
+        self.cache = cache
+        self.cache_key = None
+        self.cache_hit = False
+        self.intermediate_cache_keys = []
+        self.deferred_intermediates = []
+        self.bytes_copied = 0
+        self.bytes_avoided = 0
+        self.step_times = []
+        self.step_callback = step_callback
+        self.metrics = metrics
+        self.shard_workers = shard_workers
+        self.memo_directory = memo_directory
+        self.report = None
         threading.Thread.__init__(self)
 
-    def backup_file_before_transition(self, transition_instance):
+    def backup_file_name(self, transition_instance):
+        """
+        This function returns the name of the backup made before running a given transition when keep_old is set
+
+        :param transition_instance: The :py:class:`TransitionBinary <TransitionBinary.TransitionBinary>` about to run
+        :rtype: The file name, without directory, of the backup, for example in_8.5.idf
+        """
+        input_file_name_parts = os.path.splitext(os.path.basename(self.input_file))
+        return input_file_name_parts[0] + "_" + str(transition_instance.source_version) + input_file_name_parts[1]
+
+    def backup_file_before_transition(self, transition_instance, from_path=None):
         input_file_name = os.path.basename(self.input_file)
-        source_file_path = os.path.join(self.run_dir, input_file_name)
-        input_file_name_parts = os.path.splitext(input_file_name)
-        target_backup_file_name = input_file_name_parts[0] + "_" + str(transition_instance.source_version) + input_file_name_parts[1]
-        target_backup_file_path = os.path.join(self.run_dir, target_backup_file_name)
+        source_file_path = from_path or os.path.join(self.run_dir, input_file_name)
+        target_backup_file_path = os.path.join(self.run_dir, self.backup_file_name(transition_instance))
         if os.path.exists(target_backup_file_path):
             try:
                 os.remove(target_backup_file_path)
             except Exception:
                 return False
         try:
-            shutil.copyfile(source_file_path, target_backup_file_path)
+            self.snapshot_file(source_file_path, target_backup_file_path)
+        except Exception:
+            return False
+        return True
+
+    def old_file_path(self):
+        """
+        This function returns where a transition program leaves the file as it was before the transition, which is
+        named after the input file with 'old' added to its extension, for example in.idfold or in.imfold
+
+        :rtype: The absolute path in the run directory
+        """
+        return os.path.join(self.run_dir, os.path.basename(self.input_file)) + 'old'
+
+    def prepare_backup(self, transition_instance):
+        """
+        This function makes, when keep_old is set, the backup of the file as it is before a transition.  Any backup and
+        old file (see :py:meth:`old_file_path`) left over from before are removed first, so that an old file found
+        afterwards can only have been written by this transition.  The backup is a snapshot from
+        :py:func:`clone_file <TransitionWorkspace.clone_file>`: a reflink where the file system supports it, which
+        costs nothing, or else a plain copy, so there is always a backup whatever the program leaves behind.
+
+        :param transition_instance: The :py:class:`TransitionBinary <TransitionBinary.TransitionBinary>` about to run
+        :rtype: True if the transition may run, False if the backup could not be made
+        """
+        file_path = os.path.join(self.run_dir, os.path.basename(self.input_file))
+        target_backup_file_path = os.path.join(self.run_dir, self.backup_file_name(transition_instance))
+        try:
+            for path in [target_backup_file_path, self.old_file_path()]:
+                if os.path.exists(path):
+                    os.remove(path)
+            self.snapshot_file(file_path, target_backup_file_path)
         except Exception:
             return False
         return True
 
+    def keep_backup(self, transition_instance):
+        """
+        This function tidies up the backup, when keep_old is set, after a transition which has just succeeded.
+        The transition programs leave the file as it was behind as an old file (see :py:meth:`old_file_path`), which is
+        renamed over the snapshot from :py:meth:`prepare_backup` so that it is not left lying next to the backup.  The
+        backup is never a hard link to the file, which a program rewriting its input in place would change along with
+        it.
+
+        :param transition_instance: The :py:class:`TransitionBinary <TransitionBinary.TransitionBinary>` which ran
+        :rtype: True if the backup is in place, False if it has gone missing
+        """
+        old_file_path = self.old_file_path()
+        target_backup_file_path = os.path.join(self.run_dir, self.backup_file_name(transition_instance))
+        try:
+            if os.path.exists(old_file_path):
+                if os.path.exists(target_backup_file_path):
+                    os.remove(target_backup_file_path)  # rename will not replace an existing file on Windows
+                os.rename(old_file_path, target_backup_file_path)
+        except Exception:
+            return False
+        return os.path.exists(target_backup_file_path)
+
+    def snapshot_file(self, source, target):
+        """
+        This function preserves the current state of a file at a new path as cheaply as possible, using
+        :py:func:`clone_file <TransitionWorkspace.clone_file>`, and tallies the bytes copied or avoided
+
+        :param source: Absolute path to the existing file
+        :param target: Absolute path to the snapshot, which must not exist yet
+        """
+        size = os.path.getsize(source)
+        if clone_file(source, target) == CLONE_COPY:
+            self.bytes_copied += size
+        else:
+            self.bytes_avoided += size
+
     def run(self):
         """
         This function runs the instantiated thread based on the parameters passed into the constructor.
         The function intermittently calls the msg_callback class instance function variable to alert the calling thread of status updates.
         When the function is complete it calls the done_callback class instance function variable to alert the calling thread.
         """
+        for step in self.plan_steps(self.prepare()):
+            if not self.run_step(step):
+                break
+        self.finish()
+
+    def prepare(self):
+        """
+        This function resets the run state and places a copy of the original file in the run directory, creating the
+        private scratch directory first for an isolated run.  If a cache was given and already holds the results for
+        this input and chain, they are restored into the run directory instead and no transitions need to be run.
+        Failing that, the newest intermediate version of this input found in the cache is restored, along with any
+        earlier ones needed as backups when keep_old is set, and only the remaining transitions need to be run.
+        It is the first stage of :py:meth:`run`, exposed so a scheduler can drive the individual steps itself.
+
+        :rtype: The list of :py:class:`TransitionBinary <TransitionBinary.TransitionBinary>` instances still to be run
+        """
         self.cancelled = False
+        self.failed = False
+        self.cache_hit = False
+        if self.metrics is not None:
+            self.metrics.run_started(self)
+        self.intermediate_cache_keys = []
+        self.deferred_intermediates = []
+        self.bytes_copied = 0
+        self.bytes_avoided = 0
+        self.step_times = []
+        self.report = RunReport(self.input_file)
+        if self.isolated:
+            self.workspace.cleanup()
+            self.workspace.parent_directory = self.scratch_parent
+            self.in_memory = False
+            if self.ram_directory is not None:
+                ram_directory = ram_scratch_parent(self.estimate_scratch_bytes(), self.ram_directory)
+                if ram_directory is not None:
+                    self.workspace.parent_directory = ram_directory
+                    self.in_memory = True
+                else:
+                    self.msg_callback(_("Not enough free memory for this file; running on disk"))
+            self.run_dir = self.workspace.create()
+            for tr in self.transitions:
+                # the chain may use transition programs from other installations, which need their own resources
+                transition_directory = os.path.dirname(tr.full_path_to_binary)
+                if transition_directory != self.transition_directory:
+                    self.workspace.add_resources(transition_directory)
         shutil.copy(self.input_file, self.run_dir)
-        base_file_name = os.path.basename(self.input_file)
-        failed = False
-        cancelled = False
-        for tr in self.transitions:
-            if self.keep_old:
-                backup_success = self.backup_file_before_transition(tr)
-                if not backup_success:
-                    failed = True
-                    break
+        if self.cache is not None and self.transitions:
+            input_file_name = os.path.basename(self.input_file)
+            input_digest = file_digest(self.input_file)
+            self.cache_key = self.cache.key_for(self.input_file, self.transitions, input_digest)
+            self.intermediate_cache_keys = self.cache.intermediate_keys_for(input_digest, self.transitions)
+            if self.cache.lookup(self.cache_key, self.run_dir, input_file_name):
+                self.cache_hit = True
+                self.report.cache_hit = True
+                self.restore_cached_backups(len(self.transitions))
+                self.msg_callback(_("Restored transitioned file from cache"))
+                return []
+            for steps_done in range(len(self.transitions), 0, -1):
+                key = self.intermediate_cache_keys[steps_done - 1]
+                if self.cache.contains(key) and self.cache.lookup(key, self.run_dir, input_file_name):
+                    self.restore_cached_backups(steps_done)
+                    self.msg_callback(_("Resuming from cached version") + " " +
+                                      str(self.transitions[steps_done - 1].target_version))
+                    return self.transitions[steps_done:]
+        return self.transitions
+
+    def restore_cached_backups(self, steps_done):
+        """
+        This function fills in, when keep_old is set, the backups that would have been made before each of the
+        transitions skipped thanks to the cache, using the original file and the cached intermediate versions.
+        Any intermediate version since evicted from the cache is simply left out.
+
+        :param steps_done: The number of transitions at the start of the chain which were skipped
+        """
+        if not self.keep_old or steps_done == 0:
+            return
+        self.backup_file_before_transition(self.transitions[0], from_path=self.input_file)
+        for i in range(1, steps_done):
+            self.cache.lookup(self.intermediate_cache_keys[i - 1], self.run_dir,
+                              self.backup_file_name(self.transitions[i]), count=False)
+
+    def plan_steps(self, transitions):
+        """
+        This function groups the transitions still to be run into the steps they will be run in.  Each transition run
+        by its program is a step of its own, while consecutive transitions run in this process by their rule sets are
+        fused into one step, which brings the file up through all of them in a single pass.  Nothing is fused when
+        keep_old is set, since every version the file passes through must then be written out.
+
+        :param transitions: The list of :py:class:`TransitionBinary <TransitionBinary.TransitionBinary>` instances
+            returned by :py:meth:`prepare`
+        :rtype: A list of steps, each a list of one or more transitions, to be passed to :py:meth:`run_step` in order
+        """
+        steps = []
+        for tr in transitions:
+            if not self.keep_old and tr.native_rules is not None and steps and steps[-1][-1].native_rules is not None:
+                steps[-1].append(tr)
+            else:
+                steps.append([tr])
+        return steps
+
+    def run_transition(self, tr):
+        """
+        This function runs a single transition on the file in the run directory, backing it up first if requested.
+        Files must be brought up one version at a time, so this must be called for each transition in order after
+        :py:meth:`prepare`.
+
+        :param tr: The :py:class:`TransitionBinary <TransitionBinary.TransitionBinary>` instance to run
+        :rtype: True if the transition succeeded and the next one may run, False if the run failed or was cancelled
+        """
+        return self.run_step([tr])
+
+    def run_step(self, transitions):
+        """
+        This function runs one step from :py:meth:`plan_steps` on the file in the run directory, backing it up first if
+        requested: either a single transition, or several transitions run in this process in a single pass.  A fused
+        step is reported as a :py:class:`StepReport <TransitionReport.StepReport>` for each of its transitions, sharing
+        the time taken evenly between them.
+
+        :param transitions: The list of :py:class:`TransitionBinary <TransitionBinary.TransitionBinary>` instances to
+            run, in order
+        :rtype: True if the step succeeded and the next one may run, False if the run failed or was cancelled
+        """
+        if self.cancelled:
+            return False
+        first, last = transitions[0], transitions[-1]
+        file_path = os.path.join(self.run_dir, os.path.basename(self.input_file))
+        steps = [StepReport(tr, None) for tr in transitions]
+        steps[0].input_bytes = file_size(file_path)
+        if self.metrics is not None:
+            for tr in transitions:
+                self.metrics.transition_started(tr)
+        if self.keep_old:
+            backup_start = time.time()
+            backup_success = self.prepare_backup(first)
+            steps[0].backup_seconds = time.time() - backup_start
+            if not backup_success:
+                self.failed = True
+                for step in steps:
+                    self.record_step(step, OUTCOME_FAILED)
+                return False
+        hop = str(first.source_version) + " -> " + str(last.target_version)
+        running_message = _("Running Transition") + " " + hop
+        self.fraction_complete = None
+        start_time = time.time()
+        if first.native_rules is not None:
+            self.msg_callback(running_message)
+            return_code = self.run_native_transition([tr.native_rules for tr in transitions], file_path)
+        else:
             command_line_tokens = [
-                tr.full_path_to_binary,
-                base_file_name,
+                os.path.join(self.run_dir, first.binary_name) if self.isolated else first.full_path_to_binary,
+                os.path.basename(self.input_file),
             ]
             self.p = subprocess.Popen(
                 command_line_tokens,
@@ -78,27 +369,183 @@ class TransitionRunThread(threading.Thread):
                 cwd=self.run_dir,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE)
-            self.msg_callback(_("Running Transition") + " " + str(tr.source_version) + " -> " + str(tr.target_version))
-            self.std_out, self.std_err = self.p.communicate()
-            if self.cancelled:
-                self.msg_callback(_("Transition Cancelled"))
-                break
-            else:
-                if self.p.returncode == 0:
-                    self.msg_callback(
-                        _("Completed Transition") + " " + str(tr.source_version) + " -> " + str(tr.target_version))
+            self.msg_callback(running_message)
+            monitor = OutputMonitor(self.msg_callback, running_message)
+            return_code = monitor.follow(self.p)
+            steps[0].add_resource_usage(monitor.resource_usage)
+            self.std_out, self.std_err = monitor.output('stdout'), monitor.output('stderr')
+            self.fraction_complete = monitor.fraction_complete
+        elapsed = time.time() - start_time
+        for step in steps:
+            step.return_code = return_code
+            step.wall_seconds = elapsed / len(steps)
+        steps[-1].output_bytes = file_size(file_path)
+        if self.cancelled:
+            for step in steps:
+                self.record_step(step, OUTCOME_CANCELLED)
+            self.msg_callback(_("Transition Cancelled"))
+            return False
+        backed_up = True
+        if return_code == 0 and self.keep_old:
+            backup_start = time.time()
+            backed_up = self.keep_backup(first)
+            steps[0].backup_seconds += time.time() - backup_start
+        if return_code == 0 and backed_up:
+            for tr, step in zip(transitions, steps):
+                if step.engine == ENGINE_BINARY:
+                    self.step_times.append((tr, step.wall_seconds))
+                self.record_step(step, OUTCOME_SUCCEEDED)
+            self.msg_callback(_("Completed Transition") + " " + hop)
+            if self.intermediate_cache_keys:
+                key = self.intermediate_cache_keys[self.transitions.index(last)]
+                if self.in_memory:
+                    # keep a copy in memory for now so nothing is written to disk until the run is over
+                    deferred_name = '.' + key + os.path.splitext(self.input_file)[1]
+                    self.snapshot_file(os.path.join(self.run_dir, os.path.basename(self.input_file)),
+                                       os.path.join(self.run_dir, deferred_name))
+                    self.deferred_intermediates.append((key, deferred_name))
                 else:
-                    self.msg_callback(
-                        _("Failed Transition") + " " + str(tr.source_version) + " -> " + str(tr.target_version))
-                    failed = True
-                    break
+                    self.store_intermediate(key, os.path.basename(self.input_file))
+            return True
+        for step in steps:
+            self.record_step(step, OUTCOME_FAILED)
+        self.msg_callback(_("Failed Transition") + " " + hop)
+        self.failed = True
+        return False
+
+    def run_native_transition(self, rule_sets, file_path):
+        """
+        This function brings the file up through one or more transitions in this process with their
+        :py:class:`RuleSet <TransitionRules.RuleSet>` instances, in a single pass with
+        :py:func:`transform_file_sharded <ShardedTransform.transform_file_sharded>` spread across shard_workers
+        processes, or with :py:func:`transform_file_incremental <IncrementalTransform.transform_file_incremental>`
+        when there is a memo_directory and every rule changes one object at a time, leaving the files as the
+        transition program would:
+        the new version in place of the file, and the version before as an old file, such as in.idfold for in.idf.
+        It cannot be interrupted by :py:meth:`stop`, which only stops the run before the next step.
+
+        :param rule_sets: The list of :py:class:`RuleSet <TransitionRules.RuleSet>` instances to apply, in order
+        :param file_path: Absolute path to the file in the run directory
+        :rtype: 0 if the transitions succeeded, or 1 if they failed, as the exit code of the program would be
+        """
+        new_file_path = file_path + 'new'
+        old_file_path = file_path + 'old'
+        self.std_out = ''
+        self.std_err = ''
+        try:
+            if self.memo_directory is not None and all(rule_set.object_local for rule_set in rule_sets):
+                memo = ObjectMemo(self.memo_directory, memo_key(self.input_file, rule_sets))
+                reused, transformed = transform_file_incremental(rule_sets, file_path, new_file_path, memo)
+                self.msg_callback(_("Objects reused from the previous run") + " %d / %d" % (reused,
+                                                                                             reused + transformed))
+            else:
+                transform_file_sharded(rule_sets, file_path, new_file_path, self.shard_workers)
+            if os.path.exists(old_file_path):
+                os.remove(old_file_path)  # rename will not replace an existing file on Windows
+            os.rename(file_path, old_file_path)
+            os.rename(new_file_path, file_path)
+        except (IOError, OSError, ValueError) as e:
+            self.std_err = str(e)
+            return 1
+        return 0
+
+    def record_step(self, step, outcome):
+        """
+        This function adds the measurements of a transition which has ended to the run report, and passes them on to
+        the step_callback if there is one
+
+        :param step: The :py:class:`StepReport <TransitionReport.StepReport>` of the transition
+        :param outcome: One of the OUTCOME_* constants in :py:mod:`TransitionReport`
+        """
+        step.outcome = outcome
+        self.report.steps.append(step)
+        if self.metrics is not None:
+            self.metrics.transition_finished(step)
+        if self.step_callback is not None:
+            self.step_callback(step)
+
+    def finish(self):
+        """
+        This function reports the overall outcome of the run through the done_callback.
+        It is the last stage of :py:meth:`run`, to be called once the transitions have completed or one has stopped.
+        Successful results are added to the cache, if there is one, along with any intermediate versions held back
+        while running in memory.
+        """
+        for key, deferred_name in self.deferred_intermediates:
+            self.store_intermediate(key, deferred_name)
+            os.remove(os.path.join(self.run_dir, deferred_name))
+        self.deferred_intermediates = []
+        if self.cache is not None and self.cache_key is not None and not self.cache_hit and not self.cancelled \
+                and not self.failed:
+            try:
+                self.cache.store(self.cache_key, self.run_dir, os.path.basename(self.input_file))
+            except (IOError, OSError):
+                pass  # a full or read-only cache should never fail an otherwise good transition
+        if self.keep_old and self.compression is not None:
+            self.archive_intermediate_versions()
+        if self.report is not None:
+            self.report.in_memory = self.in_memory
+            self.report.bytes_copied = self.bytes_copied
+            self.report.bytes_avoided = self.bytes_avoided
+            self.report.finish(OUTCOME_CANCELLED if self.cancelled else OUTCOME_FAILED if self.failed
+                               else OUTCOME_SUCCEEDED)
+        if self.metrics is not None:
+            self.metrics.run_finished(self)
         if self.cancelled:
-            self.done_callback(_("Transition cancelled"))
-        elif failed:
+            self.done_callback(_("Transition Cancelled"))
+        elif self.failed:
             self.done_callback(_("Transition Failed! - Open run directory to read latest audit/error/etc"))
         else:
             self.done_callback(_("All transitions completed successfully - Open run directory for transitioned file"))
 
+    def archive_intermediate_versions(self):
+        """
+        This function compresses the intermediate versions kept in the run directory into an
+        :py:class:`IntermediateArchive <IntermediateArchive.IntermediateArchive>`, using the compression method given
+        to the constructor; any later version can then be rebuilt with
+        :py:meth:`IntermediateArchive.restore <IntermediateArchive.IntermediateArchive.restore>`
+        """
+        versions = []
+        for tr in self.transitions:
+            if os.path.exists(os.path.join(self.run_dir, self.backup_file_name(tr))):
+                versions.append((tr.source_version, self.backup_file_name(tr)))
+        if versions:
+            IntermediateArchive(self.run_dir, os.path.basename(self.input_file)).pack(versions, self.compression)
+
+    def kept_intermediate_files(self):
+        """
+        This function lists the files in the run directory holding the intermediate versions kept by keep_old
+
+        :rtype: A list of file names, either the uncompressed backups or the files making up the archive
+        """
+        archive = IntermediateArchive(self.run_dir, os.path.basename(self.input_file))
+        if self.compression is not None and archive.exists():
+            return archive.file_names()
+        return [self.backup_file_name(tr) for tr in self.transitions
+                if os.path.exists(os.path.join(self.run_dir, self.backup_file_name(tr)))]
+
+    def store_intermediate(self, key, file_name):
+        """
+        This function adds an intermediate version of the file to the cache, ignoring any failure to do so
+
+        :param key: The intermediate cache key for the version reached
+        :param file_name: The name of the file in the run directory holding that version
+        """
+        try:
+            self.cache.store(key, self.run_dir, file_name, artifacts=False)
+        except (IOError, OSError):
+            pass  # a full or read-only cache should never fail an otherwise good transition
+
+    def estimate_scratch_bytes(self):
+        """
+        This function estimates the most scratch space the run will need at once with
+        :py:func:`estimate_scratch_bytes <TransitionWorkspace.estimate_scratch_bytes>`
+
+        :rtype: The estimated number of bytes
+        """
+        return estimate_scratch_bytes(os.path.getsize(self.input_file), len(self.transitions), self.keep_old,
+                                      self.cache is not None)
+
     @staticmethod
     def get_ep_version(run_script):
         """
@@ -112,12 +559,22 @@ class TransitionRunThread(threading.Thread):
         std_out, std_err = p.communicate()
         return std_out.strip()
 
+    def cleanup(self):
+        """
+        This function removes the private scratch directory of an isolated run, along with everything in it.
+        Callers should copy out whatever they need from :py:attr:`run_dir` first.  Nothing happens for a run in the
+        shared working directory.
+        """
+        if self.isolated:
+            self.workspace.cleanup()
+            self.run_dir = self.transition_directory
+
     def stop(self):
         """
         This function allows attempting to stop the thread if it is running.
-        This function polls the existing subprocess to see if it is running and attempts to kill the process
+        No further transitions are started, and if a transition process is running it is killed.
         """
-        if self.p.poll() is None:
-            self.msg_callback(_("Attempting to cancel simulation ..."))
-            self.cancelled = True
+        self.msg_callback(_("Attempting to cancel simulation ..."))
+        self.cancelled = True
+        if self.p is not None and self.p.poll() is None:
             self.p.kill()
@@ -0,0 +1,228 @@
+import sys
+import threading
+import time
+from multiprocessing import cpu_count
+
+try:
+    import queue
+except ImportError:  # Python 2
+    import Queue as queue
+
+
+class ScheduledJob(object):
+    """
+    This class tracks the progress of one file's transition chain through a :py:class:`TransitionScheduler`
+
+    :param run_thread: A :py:class:`TransitionRunThread <TransitionRunThread.TransitionRunThread>` instance describing
+        the chain; it is driven step by step by the scheduler and should not be started as a thread itself
+    :param done_callback: An optional Python function called with this job once its chain has finished
+
+    :ivar steps: The steps which actually need running, known once the run has been prepared, as planned by
+        :py:meth:`TransitionRunThread.plan_steps <TransitionRunThread.TransitionRunThread.plan_steps>`; a cache hit, for
+        example, leaves nothing to run
+    :ivar next_step: The index of the next step in steps to be run
+    :ivar elapsed: The wall clock time in seconds from the first step starting to the chain finishing
+    :ivar error: Any unexpected exception raised while running the chain, or None
+    """
+
+    def __init__(self, run_thread, done_callback=None):
+        self.run_thread = run_thread
+        self.done_callback = done_callback
+        self.steps = None
+        self.next_step = 0
+        self.start_time = None
+        self.elapsed = 0.0
+        self.error = None
+
+    @property
+    def remaining_steps(self):
+        if self.steps is None:
+            return len(self.run_thread.transitions)
+        return len(self.steps) - self.next_step
+
+
+class TransitionScheduler(object):
+    """
+    This class runs the transition chains of many files at once on a bounded pool of workers.
+    Each (file, transition) step is a task which only becomes ready once the previous step for that file has
+    completed, but steps from different files are independent, so whichever worker is free pulls the next ready step
+    from the queue, and one file can be at 8.6 -> 8.7 while another is at 9.2 -> 9.3.
+    Almost every step is its own transition process, so the workers are threads that simply wait on those processes;
+    consecutive transitions run in this process by their rule sets make up a single step.
+
+    :param workers: The number of steps to run at once, defaulting to and never more than the number of processors
+    :param queue_factory: A callable returning the queue of ready steps, with the standard library queue interface.
+        Entries are (priority, sequence, job) tuples where the priority is the negated number of steps the file has
+        left, so the default FIFO queue runs steps in the order they become ready, while a PriorityQueue runs the
+        longest remaining chains first and a LifoQueue drives each file to completion before starting the next.
+
+    :ivar jobs: The list of :py:class:`ScheduledJob` instances submitted
+    :ivar elapsed: The wall clock time in seconds of the most recent :py:meth:`run`
+    """
+
+    def __init__(self, workers=None, queue_factory=queue.Queue):
+        self.workers = max(1, min(workers or cpu_count(), cpu_count()))
+        self.queue_factory = queue_factory
+        self.jobs = []
+        self.elapsed = 0.0
+        self.cancelled = False
+        self._queue = None
+        self._lock = threading.Lock()
+        self._feed_lock = threading.Lock()
+        self._feed = None
+        self._feed_error = None
+        self._stopping = False
+        self._outstanding = 0
+        self._sequence = 0
+
+    def submit(self, run_thread, done_callback=None):
+        """
+        This function adds a file's transition chain to be run by the next call to :py:meth:`run`
+
+        :param run_thread: A :py:class:`TransitionRunThread <TransitionRunThread.TransitionRunThread>` instance
+        :param done_callback: An optional Python function called with the :py:class:`ScheduledJob` once the chain is
+            finished; it is called from a worker thread
+        :rtype: The new :py:class:`ScheduledJob` instance
+        """
+        job = ScheduledJob(run_thread, done_callback)
+        self.jobs.append(job)
+        return job
+
+    def run(self, feed=None):
+        """
+        This function runs every submitted chain to completion, returning once they have all finished
+
+        :param feed: An optional iterator of further chains still to be planned, each a callable taking no arguments
+            which returns a (run_thread, done_callback) tuple like the arguments of :py:meth:`submit`, or None where
+            there turned out to be nothing to run.  Whenever no step is ready a worker takes the next callable from the
+            iterator, which should be quick, and then calls it, which may be slow (checking a file, say), while the
+            other workers go on running steps and drawing from the iterator, so planning is spread over the workers
+            and overlaps the steps already running instead of all coming first.  Anything the iterator raises ends it;
+            the first error from either is raised again once every chain drawn has finished.
+        """
+        pending = [job for job in self.jobs if job.start_time is None]
+        if not pending and feed is None:
+            return
+        start = time.time()
+        self._queue = self.queue_factory()
+        self._feed = feed
+        self._feed_error = None
+        self._stopping = False
+        self._outstanding = len(pending)
+        for job in pending:
+            self._put(job)
+        self._stop_if_done()
+        threads = [threading.Thread(target=self._worker) for _ in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.elapsed = time.time() - start
+        if self._feed_error is not None:
+            raise self._feed_error
+
+    def cancel(self):
+        """
+        This function stops the scheduler from starting any more steps and attempts to stop the steps in flight.
+        It may be called before :py:meth:`run`, in which case every chain is reported as cancelled without running.
+        """
+        self.cancelled = True
+        for job in self.jobs:
+            if job.run_thread.p is not None:
+                job.run_thread.stop()
+
+    def _put(self, job):
+        with self._lock:
+            self._sequence += 1
+            sequence = self._sequence
+        if job is None:
+            # tells a worker to exit; sorts after every real step in a priority queue
+            self._queue.put((sys.maxsize, sequence, None))
+        else:
+            self._queue.put((-job.remaining_steps, sequence, job))
+
+    def _next_job(self):
+        while self._feed is not None:
+            try:
+                return self._queue.get_nowait()[2]
+            except queue.Empty:
+                pass
+            with self._feed_lock:
+                if self._feed is None:
+                    break
+                try:
+                    plan = next(self._feed)
+                except Exception as e:
+                    if not isinstance(e, StopIteration):
+                        self._feed_error = self._feed_error or e
+                    self._feed = None
+                    plan = None
+                if plan is not None:
+                    # counted before the lock is let go, so the run cannot be seen as over while this one is planned
+                    with self._lock:
+                        self._outstanding += 1
+            if plan is not None:
+                try:
+                    item = plan()
+                except Exception as e:
+                    self._feed_error = self._feed_error or e
+                    item = None
+                if item is not None:
+                    return self.submit(*item)
+                with self._lock:
+                    self._outstanding -= 1
+            self._stop_if_done()
+        return self._queue.get()[2]
+
+    def _stop_if_done(self):
+        with self._lock:
+            stop = self._feed is None and self._outstanding == 0 and not self._stopping
+            if stop:
+                self._stopping = True
+        if stop:
+            for _ in range(self.workers):
+                self._put(None)
+
+    def _worker(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            try:
+                proceed = self._run_step(job) and job.remaining_steps > 0
+            except Exception as e:
+                job.error = e
+                proceed = False
+            if proceed:
+                self._put(job)
+            else:
+                self._finish(job)
+
+    def _run_step(self, job):
+        run_thread = job.run_thread
+        if job.steps is None:
+            job.start_time = time.time()
+            job.steps = []  # so that a failure to prepare leaves nothing to run
+            job.steps = run_thread.plan_steps(run_thread.prepare())
+        if self.cancelled:
+            run_thread.cancelled = True
+            return False
+        if job.remaining_steps == 0:
+            return False
+        step = job.steps[job.next_step]
+        job.next_step += 1
+        return run_thread.run_step(step)
+
+    def _finish(self, job):
+        try:
+            if job.error is not None:
+                job.run_thread.failed = True
+            job.run_thread.finish()
+            job.elapsed = time.time() - (job.start_time or time.time())
+            if job.done_callback:
+                job.done_callback(job)
+        except Exception as e:
+            job.error = e
+        with self._lock:
+            self._outstanding -= 1
+        self._stop_if_done()
@@ -0,0 +1,494 @@
+import fnmatch
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from multiprocessing import cpu_count
+
+try:
+    import queue
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import parse_qs, urlparse
+except ImportError:  # Python 2
+    import Queue as queue
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urlparse import parse_qs, urlparse
+
+from BatchTransition import BatchTransition, INPUT_FILE_PATTERNS
+from TransitionMetrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+
+# Uploads are read and results sent back in blocks of this size, so a large model is never held in memory whole
+STREAM_BLOCK_SIZE = 1024 * 1024
+
+# Uploads larger than this are refused outright
+DEFAULT_MAX_UPLOAD_BYTES = 1024 * 1024 * 1024
+
+# Once this many jobs are waiting for a worker, new uploads are refused until the queue drains
+DEFAULT_MAX_QUEUED_JOBS = 100
+
+# The states a job moves through
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_SUCCEEDED = 'succeeded'
+JOB_FAILED = 'failed'
+
+
+class QueueFullError(Exception):
+    """
+    This exception is raised when a job is submitted while the queue of waiting jobs is already full
+    """
+    pass
+
+
+class TransitionJob(object):
+    """
+    This class tracks one uploaded file through a :py:class:`TransitionService`
+
+    :param job_id: The unique identifier of the job
+    :param file_name: The name of the uploaded file, without any directory
+    :param job_directory: The directory holding the job's input and output subdirectories
+
+    :ivar state: One of the JOB_* constants in this module
+    :ivar message: A human friendly description of the outcome, once the job has finished
+    :ivar result: The :py:class:`BatchFileResult <BatchTransition.BatchFileResult>` for the file, once it has finished
+    :ivar submitted: The time the job was submitted, in seconds since the epoch
+    :ivar started: The time a worker started on the job, or None
+    :ivar finished: The time the job finished, or None
+    :ivar cancelled: True once the job has been cancelled
+    """
+
+    def __init__(self, job_id, file_name, job_directory):
+        self.job_id = job_id
+        self.file_name = file_name
+        self.job_directory = job_directory
+        self.input_directory = os.path.join(job_directory, 'input')
+        self.output_directory = os.path.join(job_directory, 'output')
+        self.state = JOB_QUEUED
+        self.message = ''
+        self.result = None
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.cancelled = False
+        self.batch = None
+
+    @property
+    def done(self):
+        return self.state in (JOB_SUCCEEDED, JOB_FAILED)
+
+    def output_files(self):
+        """
+        This function lists the files the job produced: the transitioned file along with its error and audit files
+
+        :rtype: A sorted list of file names within the job's output directory, empty until the job has finished
+        """
+        if not self.done or not os.path.isdir(self.output_directory):
+            return []
+        return sorted(os.listdir(self.output_directory))
+
+    def to_dict(self):
+        """
+        This function describes the job for the JSON responses of :py:class:`TransitionRequestHandler`
+
+        :rtype: A dictionary of JSON-serializable values
+        """
+        description = {
+            'id': self.job_id,
+            'file_name': self.file_name,
+            'state': self.state,
+            'message': self.message,
+            'submitted': self.submitted,
+            'started': self.started,
+            'finished': self.finished,
+            'files': self.output_files(),
+        }
+        if self.result is not None:
+            description['source_version'] = str(self.result.source_version) if self.result.source_version else None
+            description['target_version'] = str(self.result.target_version) if self.result.target_version else None
+            description['steps'] = self.result.steps
+            description['elapsed'] = self.result.elapsed
+            if self.result.report is not None:
+                description['report'] = self.result.report.to_dict()
+        return description
+
+
+class TransitionService(object):
+    """
+    This class accepts input files from many users and transitions them on a bounded pool of workers, so that one
+    machine can do the conversions for a whole team.  Each job is transitioned with a
+    :py:class:`BatchTransition <BatchTransition.BatchTransition>` of its own, in its own directory, so jobs are planned,
+    run and cached exactly as the ``batch`` command would.  Jobs wait in a first in, first out queue of bounded length,
+    and finished jobs are kept, with their results, until they are deleted.
+
+    :param ep_path: An :py:class:`EnergyPlusPath <EnergyPlusPath.EnergyPlusPath>` instance describing the installations
+    :param jobs_directory: The directory to keep each job's files in, defaulting to a new temporary directory which is
+        removed by :py:meth:`close`
+    :param workers: The number of files to transition at once, defaulting to the number of processors
+    :param max_queued: The number of jobs allowed to wait for a worker before new jobs are refused
+    :param cache: An optional :py:class:`TransitionCache <TransitionCache.TransitionCache>` shared by every job
+    :param scratch_parent: The directory to create each run's scratch directory in, defaulting to the system temp
+        directory
+    :param transition_metrics: An optional :py:class:`TransitionMetrics <TransitionMetrics.TransitionMetrics>` instance
+        to count every job and transition in, which is then served in the Prometheus format
+
+    :ivar jobs: A dictionary of every :py:class:`TransitionJob` not yet deleted, keyed by job identifier
+    """
+
+    def __init__(self, ep_path, jobs_directory=None, workers=None, max_queued=DEFAULT_MAX_QUEUED_JOBS, cache=None,
+                 scratch_parent=None, transition_metrics=None):
+        self.ep_path = ep_path
+        self.owns_jobs_directory = jobs_directory is None
+        self.jobs_directory = os.path.abspath(jobs_directory or tempfile.mkdtemp(prefix='idfversionupdater-jobs-'))
+        if not os.path.isdir(self.jobs_directory):
+            os.makedirs(self.jobs_directory)
+        self.workers = max(1, workers or cpu_count())
+        self.max_queued = max_queued
+        self.cache = cache
+        self.scratch_parent = scratch_parent
+        self.transition_metrics = transition_metrics
+        self.jobs = {}
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._queued = 0
+        self._running = 0
+        self._succeeded = 0
+        self._failed = 0
+        self._busy_seconds = 0.0
+        self._started = time.time()
+        self._threads = []
+        for _ in range(self.workers):
+            thread = threading.Thread(target=self._worker)
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, file_name, stream, length):
+        """
+        This function saves an uploaded file and queues it to be transitioned
+
+        :param file_name: The name of the file, which must be an idf or imf file; any directory part is ignored
+        :param stream: A file-like object to read the contents of the file from
+        :param length: The number of bytes to read from the stream
+        :rtype: The new :py:class:`TransitionJob`
+        """
+        file_name = os.path.basename(file_name.replace('\\', '/'))
+        if not any(fnmatch.fnmatch(file_name.lower(), pattern) for pattern in INPUT_FILE_PATTERNS):
+            raise ValueError("Only idf and imf files can be transitioned: %r" % file_name)
+        with self._lock:
+            if self._queued >= self.max_queued:
+                raise QueueFullError("There are already %d jobs waiting" % self._queued)
+            self._queued += 1
+        job_id = uuid.uuid4().hex
+        job = TransitionJob(job_id, file_name, os.path.join(self.jobs_directory, job_id))
+        try:
+            os.makedirs(job.input_directory)
+            with open(os.path.join(job.input_directory, file_name), 'wb') as f:
+                remaining = length
+                while remaining > 0:
+                    block = stream.read(min(STREAM_BLOCK_SIZE, remaining))
+                    if not block:
+                        raise IOError("The upload ended after %d of %d bytes" % (length - remaining, length))
+                    f.write(block)
+                    remaining -= len(block)
+        except Exception:
+            with self._lock:
+                self._queued -= 1
+            shutil.rmtree(job.job_directory, ignore_errors=True)
+            raise
+        with self._lock:
+            self.jobs[job_id] = job
+        self._queue.put(job)
+        return job
+
+    def job(self, job_id):
+        """
+        This function looks up a job by its identifier
+
+        :param job_id: The identifier returned when the job was submitted
+        :rtype: The :py:class:`TransitionJob`, or None if there is no such job
+        """
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def list_jobs(self):
+        """
+        This function lists every job not yet deleted
+
+        :rtype: A list of :py:class:`TransitionJob` instances, oldest first
+        """
+        with self._lock:
+            return sorted(self.jobs.values(), key=lambda job: job.submitted)
+
+    def cancel(self, job_id):
+        """
+        This function cancels a job which has not finished; a queued job is never run, and a running one is stopped
+
+        :param job_id: The identifier of the job
+        :rtype: True if the job was cancelled, False if there is no such job or it has already finished
+        """
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None or job.done:
+                return False
+            job.cancelled = True
+            batch = job.batch
+        if batch is not None:
+            batch.cancel()
+        return True
+
+    def delete(self, job_id):
+        """
+        This function forgets a finished job and removes its files
+
+        :param job_id: The identifier of the job
+        :rtype: True if the job was deleted, False if it is still queued or running
+        """
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None or not job.done:
+                return False
+            del self.jobs[job_id]
+        shutil.rmtree(job.job_directory, ignore_errors=True)
+        return True
+
+    def metrics(self):
+        """
+        This function reports how busy the service is
+
+        :rtype: A dictionary with the number of jobs queued, running, succeeded and failed since the service started,
+            the number of workers and queue length limit, the seconds since starting, and the fraction of the workers'
+            time spent transitioning
+        """
+        with self._lock:
+            uptime = time.time() - self._started
+            return {
+                'queued': self._queued,
+                'running': self._running,
+                'succeeded': self._succeeded,
+                'failed': self._failed,
+                'workers': self.workers,
+                'max_queued': self.max_queued,
+                'uptime_seconds': uptime,
+                'utilization': self._busy_seconds / (uptime * self.workers) if uptime > 0 else 0.0,
+            }
+
+    def prometheus_metrics(self):
+        """
+        This function writes out the transition metrics, along with how busy the service is, in the Prometheus text
+        exposition format
+
+        :rtype: The text, or None if the service was not given any transition metrics
+        """
+        if self.transition_metrics is None:
+            return None
+        metrics = self.metrics()
+        return self.transition_metrics.render([
+            ('jobs_queued', 'Jobs waiting for a worker', metrics['queued']),
+            ('jobs_running', 'Jobs being transitioned now', metrics['running']),
+            ('workers', 'Jobs which can be transitioned at once', metrics['workers']),
+            ('worker_utilization', 'Fraction of the workers\' time spent transitioning', metrics['utilization']),
+        ])
+
+    def close(self):
+        """
+        This function stops the workers, cancelling every job which has not finished.
+        The jobs directory is removed if the service created it.
+        """
+        for job in self.list_jobs():
+            self.cancel(job.job_id)
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        if self.owns_jobs_directory:
+            shutil.rmtree(self.jobs_directory, ignore_errors=True)
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            batch = BatchTransition(job.input_directory, job.output_directory, self.ep_path, workers=1,
+                                    scratch_parent=self.scratch_parent, cache=self.cache,
+                                    metrics=self.transition_metrics)
+            with self._lock:
+                self._queued -= 1
+                self._running += 1
+                job.batch = batch
+                if job.cancelled:
+                    batch.cancel()
+            job.started = time.time()
+            job.state = JOB_RUNNING
+            try:
+                job.result = batch.run()[0]
+                job.message = "Cancelled" if job.cancelled else job.result.message
+                succeeded = job.result.success and not job.cancelled
+            except Exception as e:
+                job.message = str(e)
+                succeeded = False
+            job.finished = time.time()
+            with self._lock:
+                self._running -= 1
+                self._busy_seconds += job.finished - job.started
+                if succeeded:
+                    self._succeeded += 1
+                else:
+                    self._failed += 1
+            job.state = JOB_SUCCEEDED if succeeded else JOB_FAILED
+
+
+class TransitionRequestHandler(BaseHTTPRequestHandler):
+    """
+    This class answers the HTTP requests made to a :py:class:`TransitionHTTPServer`.  Every response other than a
+    result file is JSON.
+
+    * ``POST /jobs?name=model.idf`` with the file as the request body queues a job, answering 202 with the job
+    * ``GET /jobs`` lists every job
+    * ``GET /jobs/<id>`` describes one job, including its state and, once finished, its output files
+    * ``GET /jobs/<id>/files/<name>`` sends one of the output files of a finished job
+    * ``POST /jobs/<id>/cancel`` cancels a job which has not finished
+    * ``DELETE /jobs/<id>`` removes a finished job and its files
+    * ``GET /metrics`` reports the queue depth and how many jobs have run
+    * ``GET /metrics/prometheus`` reports the same along with counts and histograms of the transitions run, in the
+      Prometheus text format, if the service keeps them
+    """
+
+    server_version = 'IDFVersionUpdater'
+
+    def do_GET(self):
+        parts = self._path_parts()
+        service = self.server.service
+        if parts == ['metrics']:
+            self._send_json(200, service.metrics())
+        elif parts == ['metrics', 'prometheus']:
+            text = service.prometheus_metrics()
+            if text is None:
+                self._send_error(404, "Transition metrics are not being kept")
+            else:
+                self._send_text(text)
+        elif parts == ['jobs']:
+            self._send_json(200, [job.to_dict() for job in service.list_jobs()])
+        elif len(parts) == 2 and parts[0] == 'jobs':
+            job = service.job(parts[1])
+            if job is None:
+                self._send_error(404, "No such job")
+            else:
+                self._send_json(200, job.to_dict())
+        elif len(parts) == 4 and parts[0] == 'jobs' and parts[2] == 'files':
+            job = service.job(parts[1])
+            if job is None or parts[3] not in job.output_files():
+                self._send_error(404, "No such file")
+            else:
+                self._send_file(os.path.join(job.output_directory, parts[3]))
+        else:
+            self._send_error(404, "Not found")
+
+    def do_POST(self):
+        parts = self._path_parts()
+        if len(parts) == 3 and parts[0] == 'jobs' and parts[2] == 'cancel':
+            if self.server.service.job(parts[1]) is None:
+                self._send_error(404, "No such job")
+            elif not self.server.service.cancel(parts[1]):
+                self._send_error(409, "The job has already finished")
+            else:
+                self._send_json(200, self.server.service.job(parts[1]).to_dict())
+            return
+        if parts != ['jobs']:
+            self._send_error(404, "Not found")
+            return
+        names = parse_qs(urlparse(self.path).query).get('name')
+        if not names:
+            self._send_error(400, "The file name must be given as ?name=")
+            return
+        length = self.headers.get('Content-Length')
+        if length is None:
+            self._send_error(411, "A Content-Length is required")
+            return
+        if not length.strip().isdigit() or int(length) == 0:
+            self._send_error(400, "The Content-Length must be a positive whole number of bytes")
+            return
+        length = int(length)
+        if length > self.server.max_upload_bytes:
+            self._send_error(413, "Uploads are limited to %d bytes" % self.server.max_upload_bytes)
+            return
+        try:
+            job = self.server.service.submit(names[0], self.rfile, length)
+        except QueueFullError as e:
+            self._send_error(503, str(e))
+        except ValueError as e:
+            self._send_error(400, str(e))
+        else:
+            self._send_json(202, job.to_dict())
+
+    def do_DELETE(self):
+        parts = self._path_parts()
+        if len(parts) != 2 or parts[0] != 'jobs':
+            self._send_error(404, "Not found")
+        elif self.server.service.job(parts[1]) is None:
+            self._send_error(404, "No such job")
+        elif not self.server.service.delete(parts[1]):
+            self._send_error(409, "The job has not finished")
+        else:
+            self._send_json(200, {'deleted': parts[1]})
+
+    def log_message(self, format, *args):
+        if self.server.log_requests:
+            BaseHTTPRequestHandler.log_message(self, format, *args)
+
+    def _path_parts(self):
+        return [part for part in urlparse(self.path).path.split('/') if part]
+
+    def _send_json(self, status, value):
+        body = json.dumps(value, indent=2, sort_keys=True).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_text(self, text):
+        body = text.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', METRICS_CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status, message):
+        self._send_json(status, {'error': message})
+
+    def _send_file(self, path):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(os.path.getsize(path)))
+        self.send_header('Content-Disposition', 'attachment; filename="%s"' % os.path.basename(path))
+        self.end_headers()
+        with open(path, 'rb') as f:
+            shutil.copyfileobj(f, self.wfile, STREAM_BLOCK_SIZE)
+
+
+class TransitionHTTPServer(ThreadingMixIn, HTTPServer):
+    """
+    This class is the HTTP front end of a :py:class:`TransitionService`, answering each request on its own thread so
+    that uploads and downloads never wait on one another
+
+    :param address: A (host, port) tuple to listen on; a port of 0 picks any free port
+    :param service: The :py:class:`TransitionService` to pass jobs to
+    :param max_upload_bytes: The size of the largest file accepted
+    :param log_requests: A boolean flag for whether to log each request to standard error
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, service, max_upload_bytes=DEFAULT_MAX_UPLOAD_BYTES, log_requests=True):
+        HTTPServer.__init__(self, address, TransitionRequestHandler)
+        self.service = service
+        self.max_upload_bytes = max_upload_bytes
+        self.log_requests = log_requests
@@ -0,0 +1,200 @@
+import fnmatch
+import os
+import shutil
+import tempfile
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# These are the files a transition program needs alongside it: the programs themselves, the IDD files for each version,
+# the report variable rename tables, and any shared libraries shipped next to the programs
+RESOURCE_FILE_PATTERNS = ['Transition-V*', '*.idd', 'Report Variables*.csv', '*.dll', '*.dylib', '*.so', '*.so.*']
+
+# This is the RAM-backed file system available on most Linux machines
+DEFAULT_RAM_DIRECTORY = '/dev/shm'
+
+# While a transition program runs there is the input, the new file being written and the .idfold copy of the input,
+# and models tend to grow a little from version to version, so size the scratch space with some headroom
+SCRATCH_COPIES_PER_RUN = 3.5
+
+# The ways clone_file can make a file available at a new path, from cheapest to most expensive
+CLONE_REFLINK = 'reflink'
+CLONE_COPY = 'copy'
+
+# The Linux ioctl asking a copy-on-write file system (btrfs, xfs, ...) to share the extents of one file with another
+FICLONE = 0x40049409
+
+
+def free_bytes(directory):
+    """
+    This function returns the space available to the current user on the file system holding a directory
+
+    :param directory: Absolute path to an existing directory
+    :rtype: The number of free bytes, or None if it cannot be determined on this platform
+    """
+    if not hasattr(os, 'statvfs'):
+        return None
+    stat = os.statvfs(directory)
+    return stat.f_bavail * stat.f_frsize
+
+
+def reflink_file(source, target):
+    """
+    This function asks a copy-on-write file system (btrfs, xfs, ...) for a snapshot of a file at a new path which
+    shares its data with the source until either file is changed, so nothing is copied and changing one leaves the
+    other as it was
+
+    :param source: Absolute path to the existing file
+    :param target: Absolute path to the snapshot, which must not exist yet
+    :rtype: True if the snapshot was made, False if the file system or platform does not support reflinks, in which
+        case nothing is left at the target
+    """
+    if fcntl is None:
+        return False
+    try:
+        with open(source, 'rb') as source_file:
+            with open(target, 'wb') as target_file:
+                fcntl.ioctl(target_file.fileno(), FICLONE, source_file.fileno())
+        return True
+    except (IOError, OSError):
+        if os.path.exists(target):
+            os.remove(target)
+        return False
+
+
+def clone_file(source, target):
+    """
+    This function makes a snapshot of a file at a new path while copying as little data as possible: a reflink where
+    the file system supports it, and otherwise a plain copy.  A hard link is never used, since a program rewriting
+    the source in place would change the snapshot along with it.
+
+    :param source: Absolute path to the existing file
+    :param target: Absolute path to the snapshot, which must not exist yet
+    :rtype: One of CLONE_REFLINK or CLONE_COPY, saying how the snapshot was made
+    """
+    if reflink_file(source, target):
+        return CLONE_REFLINK
+    shutil.copyfile(source, target)
+    return CLONE_COPY
+
+
+def estimate_scratch_bytes(input_bytes, num_transitions, keep_old=False, cached=False):
+    """
+    This function estimates the most scratch space a run will need at once, which is a few copies of the input for the
+    transition program itself, plus one more copy per transition for each of the backups kept by keep_old and the
+    intermediate versions held in memory for the cache
+
+    :param input_bytes: The size of the input file
+    :param num_transitions: The number of transitions in the run
+    :param keep_old: A boolean flag for whether a backup is kept of the file before each transition
+    :param cached: A boolean flag for whether the intermediate versions are added to a cache
+    :rtype: The estimated number of bytes
+    """
+    copies = SCRATCH_COPIES_PER_RUN
+    if keep_old:
+        copies += num_transitions
+    if cached:
+        copies += num_transitions
+    return int(input_bytes * copies)
+
+
+def ram_scratch_parent(required_bytes, ram_directory=DEFAULT_RAM_DIRECTORY):
+    """
+    This function decides whether a job's scratch directory can be placed on a RAM-backed directory
+
+    :param required_bytes: The most space the job is expected to need at any one time
+    :param ram_directory: The RAM-backed directory to use, such as /dev/shm or a user-mounted tmpfs
+    :rtype: The RAM directory if it exists, is writable, and has room for the job, otherwise None
+    """
+    if ram_directory is None or not os.path.isdir(ram_directory) or not os.access(ram_directory, os.W_OK):
+        return None
+    available = free_bytes(ram_directory)
+    if available is None or available < required_bytes:
+        return None
+    return ram_directory
+
+
+class TransitionWorkspace(object):
+    """
+    This class manages a private scratch directory for a single transition job.
+    The transition programs write their outputs (.idfnew, .idfold, .VCpErr, audit files) next to the input file, so
+    jobs sharing one run directory overwrite each other.  Each workspace instead gets its own temporary directory, with
+    the transition resources linked (or, where links are not possible, copied) into it from the installation.
+
+    :param transition_directory: The installation's transition directory holding the programs and their resources
+    :param parent_directory: The directory to create the scratch directory in, defaulting to the system temp directory
+
+    :ivar path: The absolute path of the scratch directory once :py:meth:`create` has been called, otherwise None
+    """
+
+    def __init__(self, transition_directory, parent_directory=None):
+        self.transition_directory = transition_directory
+        self.parent_directory = parent_directory
+        self.path = None
+
+    def __enter__(self):
+        self.create()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.cleanup()
+
+    def create(self):
+        """
+        This function creates the scratch directory and links every transition resource into it
+
+        :rtype: The absolute path to the new scratch directory
+        """
+        self.path = tempfile.mkdtemp(prefix='idfversionupdater-', dir=self.parent_directory)
+        self.add_resources(self.transition_directory)
+        return self.path
+
+    def add_resources(self, transition_directory):
+        """
+        This function links the transition resources of another installation into the scratch directory, for chains
+        which use transition programs from more than one installation.  Resources already in the scratch directory are
+        kept, so those of the workspace's own installation take precedence.
+
+        :param transition_directory: Another installation's transition directory
+        """
+        for file_name in os.listdir(transition_directory):
+            if not any(fnmatch.fnmatch(file_name, pattern) for pattern in RESOURCE_FILE_PATTERNS):
+                continue
+            source = os.path.join(transition_directory, file_name)
+            target = os.path.join(self.path, file_name)
+            if os.path.isfile(source) and not os.path.lexists(target):
+                self.link_or_copy(source, target)
+
+    def cleanup(self):
+        """
+        This function removes the scratch directory and everything in it; the installation itself is never touched
+        since only links to it live in the scratch directory
+        """
+        if self.path is not None and os.path.isdir(self.path):
+            shutil.rmtree(self.path, ignore_errors=True)
+        self.path = None
+
+    @staticmethod
+    def link_or_copy(source, target):
+        """
+        This function makes a file available at a new path as cheaply as possible, trying a symbolic link, then a hard
+        link, and finally falling back to a copy which preserves the file mode
+
+        :param source: Absolute path to the existing file
+        :param target: Absolute path where the file should appear
+        """
+        if hasattr(os, 'symlink'):
+            try:
+                os.symlink(source, target)
+                return
+            except OSError:
+                pass  # unprivileged users on Windows cannot create symbolic links
+        if hasattr(os, 'link'):
+            try:
+                os.link(source, target)
+                return
+            except OSError:
+                pass  # for example, the scratch directory is on a different device
+        shutil.copy2(source, target)
@@ -0,0 +1,100 @@
+import io
+
+# The Version object is nearly always within the first few kilobytes of an input file, so a modest chunk is plenty
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+# No IDD class name comes anywhere near this long, so an object head that grows past this without a comma is not Version
+MAX_CLASS_NAME_LENGTH = 256
+
+# The UTF-8 byte order mark some editors start files with, as read as Latin-1; it is not part of the first class name
+UTF8_BYTE_ORDER_MARK = u'\xef\xbb\xbf'
+
+
+def parse_version_string(version_string):
+    """
+    This function converts the version field of an IDF Version object into a full version tuple.
+    Missing minor or patch components are filled with zeros, so '8.5' and '8.5.0' are equivalent.
+
+    :param version_string: The raw version field text, for example '8.5.0' or ' 8.5 '
+    :rtype: A tuple of integers in the form (major, minor, patch)
+    :raises ValueError: If any of the version components are not integers
+    """
+    tokens = version_string.strip().split('.')
+    while len(tokens) < 3:
+        tokens.append('0')
+    return int(tokens[0]), int(tokens[1]), int(tokens[2])
+
+
+def sniff_idf_version(path_to_idf, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    This function returns the version of a given input file by streaming it in fixed-size chunks.
+    Comments and objects are allowed to span chunk boundaries.  Only the head of the object currently being scanned is
+    retained, and it is discarded as soon as the class name shows it is not the Version object, so memory use does not
+    depend on the size of the file.  Reading stops as soon as the Version object is complete.  A UTF-8 byte order mark
+    at the start of the file is skipped.
+
+    :param path_to_idf: Absolute path to a EnergyPlus input file
+    :param chunk_size: The number of characters to read from the file at a time
+    :rtype: A tuple of integers in the form (major, minor, patch), or None if no Version object was found
+    :raises ValueError: If the Version object is found but the version field is not a valid version number
+    """
+    head = ''
+    skipping = False
+    in_comment = False
+    with io.open(path_to_idf, 'r', encoding='latin-1') as fo:
+        start = fo.read(len(UTF8_BYTE_ORDER_MARK))
+        if start == UTF8_BYTE_ORDER_MARK:
+            start = ''
+        while True:
+            chunk = start + fo.read(chunk_size)
+            start = ''
+            if not chunk:
+                return None
+            pos = 0
+            end = len(chunk)
+            next_bang = chunk.find('!')
+            next_semi = chunk.find(';')
+            while pos < end:
+                if in_comment:
+                    newline = chunk.find('\n', pos)
+                    if newline == -1:
+                        break
+                    in_comment = False
+                    pos = newline + 1
+                    continue
+                if next_bang != -1 and next_bang < pos:
+                    next_bang = chunk.find('!', pos)
+                if next_semi != -1 and next_semi < pos:
+                    next_semi = chunk.find(';', pos)
+                if next_semi != -1 and (next_bang == -1 or next_semi < next_bang):
+                    segment_end = next_semi
+                elif next_bang != -1:
+                    segment_end = next_bang
+                else:
+                    segment_end = end
+                if not skipping:
+                    head += chunk[pos:segment_end]
+                    if segment_end == next_semi:
+                        version = _version_from_object(head)
+                        if version is not None:
+                            return version
+                    else:
+                        head = head.lstrip()
+                        comma = head.find(',')
+                        if comma != -1 and head[:comma].strip().upper() != 'VERSION':
+                            skipping = True
+                        elif comma == -1 and len(head) > MAX_CLASS_NAME_LENGTH:
+                            skipping = True
+                if segment_end == next_semi:
+                    head = ''
+                    skipping = False
+                elif segment_end == next_bang:
+                    in_comment = True
+                pos = segment_end + 1
+
+
+def _version_from_object(object_text):
+    tokens = object_text.split(',')
+    if tokens[0].strip().upper() != 'VERSION' or len(tokens) < 2:
+        return None
+    return parse_version_string(tokens[1])
@@ -1,12 +1,18 @@
 import os
 import subprocess
+import threading
 
 import wx
 
 from EnergyPlusPath import EnergyPlusPath
+from EnergyPlusVersion import EnergyPlusVersion
+from InstallationIndex import InstallationIndex
+from ObjectIndex import indexed_version
+from PreflightCheck import preflight_check
 from TransitionRunThread import TransitionRunThread
 from International import translate as _, Languages, set_language
 from Settings import Keys, load_settings, save_settings
+from VersionSniffer import sniff_idf_version
 
 __program_name__ = "IDFVersionUpdater (v2.0)"
 
@@ -65,9 +71,16 @@ class VersionUpdaterWindow(wx.Frame):
         # build up the GUI itself
         self.build_gui()
 
-        # update the list of E+ versions
-        self.ep_run_folder = EnergyPlusPath()
-        title = TransitionRunThread.get_ep_version(os.path.join(self.ep_run_folder.installation_path, 'EnergyPlus'))
+        # update the list of E+ versions, reusing what was found last time unless the installations have changed
+        self.installation_index = InstallationIndex()
+        self.ep_run_folder = EnergyPlusPath(self.installation_index)
+        title = self.installation_index.cached_ep_version(self.ep_run_folder.get_ep_binary())
+        if title is None:
+            # asking EnergyPlus for its version means starting a process, so show the folder's version until it answers
+            title = str(self.ep_run_folder.version_number).replace('-', '.')
+            version_thread = threading.Thread(target=self.find_ep_version)
+            version_thread.daemon = True
+            version_thread.start()
         self.SetTitle(__program_name__ + " -- " + title)
         self.status_bar.SetStatusText(_("Program Initialized"))
 
@@ -295,28 +308,58 @@ class VersionUpdaterWindow(wx.Frame):
 
     def on_update_idf(self, event):
         """
-        This function handles the request to run Transition itself, building up the list of transitions,
-        creating a new thread instance, prepping the gui, and running it
+        This function handles the request to run Transition itself.  The file is checked and the list of transitions
+        built up on a separate thread, since that reads the file, and the transitions are then started by
+        :py:meth:`on_preflight_done` back on the GUI thread
         :param event: The event information generated by the caller, which in this case is a wx Button
         """
-        if self.idf_version not in [tr.source_version for tr in self.ep_run_folder.transitions_available]:
+        self.set_buttons_for_running(enabled=False)
+        self.btn_cancel.Disable()  # there is nothing to cancel until the transitions start
+        self.status_bar.SetStatusText(_("Checking input file ..."))
+        preflight_thread = threading.Thread(target=self.run_preflight_check,
+                                            args=(self.settings[Keys.last_idf],
+                                                  self.chk_create_inter_versions.GetValue()))
+        preflight_thread.daemon = True
+        preflight_thread.start()
+
+    def run_preflight_check(self, path_to_idf, keep_old):
+        # check the file, and build up the list of transition steps to perform, before anything is run
+        try:
+            preflight = preflight_check(path_to_idf, self.ep_run_folder,
+                                        run_directory=self.ep_run_folder.transition_directory, keep_old=keep_old)
+        except (IOError, OSError) as e:
+            # the file may have been moved, deleted or made unreadable since it was chosen
+            wx.CallAfter(self.on_preflight_error, str(e))
+            return
+        wx.CallAfter(self.on_preflight_done, preflight, path_to_idf, keep_old)
+
+    def on_preflight_error(self, message):
+        if not self:
+            return  # the window was closed, or restarted for a new language, while the file was checked
+        self.on_msg(_("Input file cannot be transitioned") + ": " + message)
+        self.set_buttons_for_running(enabled=True)
+
+    def on_preflight_done(self, preflight, path_to_idf, keep_old):
+        if not self:
+            return  # the window was closed, or restarted for a new language, while the file was checked
+        if preflight.version is not None and preflight.chain is None:
             self.on_msg(_("Cannot find a matching transition tool for this idf version"))
-        # we need to build up the list of transition steps to perform
-        transitions_to_run = []
-        for tr in self.ep_run_folder.transitions_available:
-            if tr.source_version < self.idf_version:
-                continue  # skip this older version
-            transitions_to_run.append(tr)
+            self.set_buttons_for_running(enabled=True)
+            return
+        if not preflight.ok:
+            self.on_msg(_("Input file cannot be transitioned") + ": " + "; ".join(preflight.problems))
+            self.set_buttons_for_running(enabled=True)
+            return
         self.running_transition_thread = TransitionRunThread(
-            transitions_to_run,
+            preflight.chain,
             self.ep_run_folder.transition_directory,
-            self.settings[Keys.last_idf],
-            self.chk_create_inter_versions.GetValue(),
+            path_to_idf,
+            keep_old,
             self.callback_on_msg,
             self.callback_on_done
         )
         self.running_transition_thread.start()
-        self.set_buttons_for_running(enabled=False)
+        self.btn_cancel.Enable()
 
     def on_cancel(self, event):
         self.btn_cancel.Disable()
@@ -338,11 +381,24 @@ class VersionUpdaterWindow(wx.Frame):
     def on_msg(self, message):
         self.status_bar.SetStatusText(message)
 
+    def find_ep_version(self):
+        title = self.installation_index.ep_version(self.ep_run_folder.get_ep_binary())
+        wx.CallAfter(self.on_ep_version, title)
+
+    def on_ep_version(self, title):
+        if self:  # the window may have been closed, or restarted for a new language, while EnergyPlus was asked
+            self.SetTitle(__program_name__ + " -- " + title)
+
     def callback_on_done(self, message):
         wx.CallAfter(self.on_done, message)
 
     def on_done(self, message):
+        report = self.running_transition_thread.report
+        slowest = report.slowest_step() if report is not None else None
+        if slowest is not None and len(report.steps) > 1:
+            message += " - " + _("Slowest transition") + ": " + slowest.describe()
         self.status_bar.SetStatusText(message)
+        self.ep_run_folder.record_step_times(self.running_transition_thread.step_times)
         self.set_buttons_for_running(enabled=True)
 
     # Utilities
@@ -351,37 +407,18 @@ class VersionUpdaterWindow(wx.Frame):
     def get_idf_version(path_to_idf):
         """
         This function returns the current version of a given input file.
-        The function uses a simplified parsing approach so it only works for valid syntax files, and provides no specialized error handling
+        If the file has a current :py:class:`ObjectIndex <ObjectIndex.ObjectIndex>` sidecar, only its header and the
+        Version object are read, by :py:func:`indexed_version <ObjectIndex.indexed_version>`; otherwise the file is
+        streamed by :py:func:`sniff_idf_version <VersionSniffer.sniff_idf_version>`, which stops reading as soon as the
+        Version object is found.  Either way this is cheap enough to call on every edit of the file path
 
         :param path_to_idf: Absolute path to a EnergyPlus input file
-        :rtype: A floating point version number for the input file, for example 8.5 for an 8.5.0 input file
+        :rtype: An :py:class:`EnergyPlusVersion <EnergyPlusVersion.EnergyPlusVersion>` for the release of the input
+            file, for example 8.5 for an 8.5.0 input file, or None if there is no Version object
         """
-        # phase 1: read in lines of file
-        with open(path_to_idf, "r") as fo:
-            lines = fo.readlines()
-        # phases 2: remove comments and blank lines
-        lines_a = []
-        for line in lines:
-            line_text = line.strip()
-            this_line = ""
-            if len(line_text) > 0:
-                exclamation = line_text.find("!")
-                if exclamation == -1:
-                    this_line = line_text
-                elif exclamation == 0:
-                    this_line = ""
-                elif exclamation > 0:
-                    this_line = line_text[:exclamation]
-                if not this_line == "":
-                    lines_a.append(this_line)
-        # phase 3: join entire array and re-split by semicolon
-        idf_data_joined = ''.join(lines_a)
-        idf_object_strings = idf_data_joined.split(";")
-        # phase 4: break each object into an array of object name and field values
-        for this_object in idf_object_strings:
-            tokens = this_object.split(',')
-            if tokens[0].upper() == "VERSION":
-                version_string = tokens[1]
-                version_string_tokens = version_string.split('.')  # might be 2 or 3...
-                version_number = float("%s.%s" % (version_string_tokens[0], version_string_tokens[1]))
-                return version_number
+        version = indexed_version(path_to_idf)
+        if version is None:
+            version = sniff_idf_version(path_to_idf)
+        if version is None:
+            return None
+        return EnergyPlusVersion(version[0], version[1])
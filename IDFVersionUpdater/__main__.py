@@ -0,0 +1,9 @@
+import os
+import sys
+
+# the package modules import each other by bare module name, so make them importable the same way here
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+
+from CommandLine import main
+
+sys.exit(main())
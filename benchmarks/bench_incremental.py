@@ -0,0 +1,72 @@
+"""
+Benchmark for re-running transitions on an edited file object by object (see IDFVersionUpdater/IncrementalTransform.py).
+
+A synthetic file (see synthetic_idf.py) is brought up through a chain of rule sets changing every Zone object, the
+worst case for the rules, first in a single full pass and then incrementally: once with no earlier run to reuse, once
+more unchanged, and once after one Zone object in the middle of the file has been edited.
+
+Usage: python benchmarks/bench_incremental.py [size_mb]
+"""
+from __future__ import print_function
+
+import filecmp
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'IDFVersionUpdater'))
+
+from EnergyPlusVersion import EnergyPlusVersion
+from IncrementalTransform import ObjectMemo, memo_key, transform_file_incremental
+from synthetic_idf import write_synthetic_idf
+from TransitionRules import RuleSet, rule_from_dict, transform_file
+
+VERSIONS = ['8.%d' % minor for minor in range(4, 10)] + ['9.%d' % minor for minor in range(0, 5)]
+
+EVERY_ZONE_RULES = [{'rule': 'rename_field', 'class': 'Zone', 'field': 1, 'note': 'Zone Name'}]
+
+
+def timed(function):
+    start = time.time()
+    result = function()
+    return result, time.time() - start
+
+
+def edit_one_zone(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    middle = data.index(b'Zone,\n', len(data) // 2)
+    with open(path, 'wb') as f:
+        f.write(data[:middle] + data[middle:].replace(b'Zone,\n  Zone', b'Zone,\n  Edited Zone', 1))
+
+
+def main(size_mb):
+    temp_dir = tempfile.mkdtemp()
+    try:
+        rule_sets = [RuleSet(EnergyPlusVersion.parse(source), EnergyPlusVersion.parse(target),
+                             [rule_from_dict(rule) for rule in EVERY_ZONE_RULES])
+                     for source, target in zip(VERSIONS, VERSIONS[1:])]
+        input_path = os.path.join(temp_dir, 'model.idf')
+        write_synthetic_idf(input_path, size_mb * 1024 * 1024, version=VERSIONS[0])
+        memo = ObjectMemo(os.path.join(temp_dir, 'memo'), memo_key(input_path, rule_sets))
+        print("%d MB file, %d transitions" % (size_mb, len(rule_sets)))
+        full_path = os.path.join(temp_dir, 'full.idf')
+        _, seconds = timed(lambda: transform_file(rule_sets, input_path, full_path))
+        print("%-40s %8.2f s" % ("full pass", seconds))
+        output_path = os.path.join(temp_dir, 'incremental.idf')
+        for name in ["incremental, first run", "incremental, unchanged", "incremental, one Zone edited"]:
+            if name.endswith('edited'):
+                edit_one_zone(input_path)
+                transform_file(rule_sets, input_path, full_path)
+            (reused, transformed), seconds = timed(
+                lambda: transform_file_incremental(rule_sets, input_path, output_path, memo))
+            assert filecmp.cmp(output_path, full_path, shallow=False)
+            print("%-40s %8.2f s  (%d objects reused, %d transformed)" % (name, seconds, reused, transformed))
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100)
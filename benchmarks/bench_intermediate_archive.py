@@ -0,0 +1,80 @@
+"""
+Benchmark for keeping intermediate versions as deltas (see IDFVersionUpdater/IntermediateArchive.py).
+
+A synthetic file (see synthetic_idf.py) stands in for the version before a transition, and a copy with the Version
+object and one Zone object in the middle changed stands in for the version after it.  The object-level delta between
+them is built and applied, and the whole archive is packed and the later version restored from it.
+
+Usage: python benchmarks/bench_intermediate_archive.py [size_mb]
+"""
+from __future__ import print_function
+
+import filecmp
+import gzip
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'IDFVersionUpdater'))
+
+from IntermediateArchive import IntermediateArchive, COMPRESSION_DELTA, apply_object_delta, object_delta
+from synthetic_idf import write_synthetic_idf
+
+
+def timed(function):
+    start = time.time()
+    result = function()
+    return result, time.time() - start
+
+
+def write_next_version(old_path, new_path):
+    with open(old_path, 'rb') as f:
+        data = f.read()
+    middle = data.index(b'Zone,\n', len(data) // 2)
+    data = data[:middle] + data[middle:].replace(b'Zone,\n  Zone', b'Zone,\n  Edited Zone', 1)
+    with open(new_path, 'wb') as f:
+        f.write(data.replace(b'Version,8.5;', b'Version,8.6;', 1))
+
+
+def main(size_mb):
+    temp_dir = tempfile.mkdtemp()
+    try:
+        old_path = os.path.join(temp_dir, 'model_8.5.idf')
+        new_path = os.path.join(temp_dir, 'model_8.6.idf')
+        write_synthetic_idf(old_path, size_mb * 1024 * 1024, version='8.5')
+        write_next_version(old_path, new_path)
+        print("%d MB file" % size_mb)
+        delta_path = os.path.join(temp_dir, 'delta.gz')
+        rebuilt_path = os.path.join(temp_dir, 'rebuilt.idf')
+
+        def build_delta():
+            with gzip.open(delta_path, 'wb') as f:
+                object_delta(old_path, new_path, f)
+
+        def apply_delta():
+            with gzip.open(delta_path, 'rb') as delta_file:
+                with open(old_path, 'rb') as old_file:
+                    with open(rebuilt_path, 'wb') as f:
+                        apply_object_delta(old_file, delta_file, f)
+
+        _, seconds = timed(build_delta)
+        print("%-40s %8.2f s  (%d bytes)" % ("build delta", seconds, os.path.getsize(delta_path)))
+        _, seconds = timed(apply_delta)
+        assert filecmp.cmp(rebuilt_path, new_path, shallow=False)
+        print("%-40s %8.2f s" % ("apply delta", seconds))
+        # packing removes both versions, so the rebuilt copy of the later one is what the restore is checked against
+        archive = IntermediateArchive(temp_dir, 'model.idf')
+        _, seconds = timed(lambda: archive.pack([('8.5', 'model_8.5.idf'), ('8.6', 'model_8.6.idf')],
+                                                COMPRESSION_DELTA))
+        print("%-40s %8.2f s" % ("pack both versions", seconds))
+        restored_path, seconds = timed(lambda: archive.restore('8.6'))
+        assert filecmp.cmp(restored_path, rebuilt_path, shallow=False)
+        print("%-40s %8.2f s" % ("restore the later version", seconds))
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100)
@@ -0,0 +1,82 @@
+"""
+Benchmark comparing transitions run by their programs against the same transitions run in this process by rule sets
+(see IDFVersionUpdater/TransitionRules.py).
+
+A chain of stub transition programs (see test/fake_energyplus.py) is run over a synthetic file (see synthetic_idf.py),
+then the same chain is run with a rule set attached to every transition: first with rules for a class the file does
+not use, so every object passes through untouched, and then with a rule changing every Zone object, the worst case.
+Consecutive transitions with rule sets are fused into a single pass over the file; each case is also run with one
+pass per transition, to show what the fusing saves, and spread over a process per processor (see
+IDFVersionUpdater/ShardedTransform.py), which only pays off on files of at least 16 MB and a machine with spare cores.
+The stub programs only make one regular expression substitution over the whole file, so they are far cheaper than the
+real programs, which parse every object against the IDD; the time saved per transition is larger in practice.
+
+Usage: python benchmarks/bench_native_engine.py [size_mb] [scratch_dir]
+"""
+from __future__ import print_function
+
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'IDFVersionUpdater'))
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'test'))
+
+from fake_energyplus import make_stub_transitions
+from synthetic_idf import write_synthetic_idf
+from TransitionRules import RuleSet, rule_from_dict
+from TransitionRunThread import TransitionRunThread
+
+VERSIONS = ['8.%d' % minor for minor in range(4, 10)] + ['9.%d' % minor for minor in range(0, 5)]
+
+PASS_THROUGH_RULES = [{'rule': 'rename_object', 'class': 'Lead Input', 'new_class': 'Lead:Input'}]
+
+EVERY_ZONE_RULES = [{'rule': 'rename_field', 'class': 'Zone', 'field': 1, 'note': 'Zone Name'}]
+
+
+def ignore(message):
+    pass
+
+
+def timed_run(transitions, transition_dir, input_path, rules, fused=True, shard_workers=1):
+    for tr in transitions:
+        tr.native_rules = None if rules is None else RuleSet(
+            tr.source_version, tr.target_version, [rule_from_dict(rule) for rule in rules])
+    run = TransitionRunThread(transitions, transition_dir, input_path, False, ignore, ignore, isolated=True,
+                              scratch_parent=transition_dir, shard_workers=shard_workers)
+    if not fused:
+        run.plan_steps = lambda remaining: [[tr] for tr in remaining]
+    start = time.time()
+    run.run()
+    elapsed = time.time() - start
+    assert not run.failed
+    run.cleanup()
+    return elapsed
+
+
+def main(size_mb, scratch_dir):
+    temp_dir = tempfile.mkdtemp(dir=scratch_dir)
+    try:
+        transitions = make_stub_transitions(temp_dir, VERSIONS)
+        input_path = os.path.join(temp_dir, 'model.idf')
+        write_synthetic_idf(input_path, size_mb * 1024 * 1024, version=VERSIONS[0])
+        print("%d MB file, %d transitions" % (size_mb, len(transitions)))
+        programs = timed_run(transitions, temp_dir, input_path, None)
+        print("%-40s %8.2f s" % ("programs", programs))
+        for name, rules in [("objects untouched", PASS_THROUGH_RULES), ("every Zone changed", EVERY_ZONE_RULES)]:
+            for fused in [False, True]:
+                native = timed_run(transitions, temp_dir, input_path, rules, fused)
+                print("%-40s %8.2f s (%.2fx)" % ("native, %s, %s" % (name, "one pass" if fused else "pass per hop"),
+                                                 native, programs / native))
+            workers = multiprocessing.cpu_count()
+            sharded = timed_run(transitions, temp_dir, input_path, rules, shard_workers=workers)
+            print("%-40s %8.2f s (%.2fx)" % ("native, %s, %d processes" % (name, workers), sharded, programs / sharded))
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50, sys.argv[2] if len(sys.argv) > 2 else None)
@@ -0,0 +1,62 @@
+"""
+Benchmark for the object offset index (see IDFVersionUpdater/ObjectIndex.py).
+
+A synthetic file (see synthetic_idf.py) with its Version object at the bottom, the worst case for the version sniffer,
+is indexed, and the time to build, save and load the index is reported along with its size.  Finding the version and
+counting the Zone objects are then timed through the loaded index, against streaming the file with the version sniffer
+and splitting the whole file into objects.
+
+Usage: python benchmarks/bench_object_index.py [size_mb]
+"""
+from __future__ import print_function
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'IDFVersionUpdater'))
+
+from IdfObjects import iter_idf_objects, open_idf
+from ObjectIndex import ObjectIndex, sidecar_path
+from synthetic_idf import write_synthetic_idf
+from VersionSniffer import sniff_idf_version
+
+
+def timed(function):
+    start = time.time()
+    result = function()
+    return result, time.time() - start
+
+
+def count_zones(path):
+    with open_idf(path) as f:
+        return sum(1 for idf_object in iter_idf_objects(f) if idf_object.class_name == 'Zone')
+
+
+def main(size_mb):
+    temp_dir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(temp_dir, 'model.idf')
+        write_synthetic_idf(path, size_mb * 1024 * 1024, version_position='bottom')
+        index, build_seconds = timed(lambda: ObjectIndex.build(path))
+        _, save_seconds = timed(index.save)
+        index, load_seconds = timed(lambda: ObjectIndex.load(path))
+        print("%d MB file, %d objects, %.1f MB index" % (size_mb, len(index),
+                                                       os.path.getsize(sidecar_path(path)) / (1024.0 * 1024)))
+        print("%-40s %8.3f s" % ("build index", build_seconds))
+        print("%-40s %8.3f s" % ("save index", save_seconds))
+        print("%-40s %8.3f s" % ("load index", load_seconds))
+        for name, function in [("version, sniffed", lambda: sniff_idf_version(path)),
+                               ("version, from index", index.version),
+                               ("Zone count, all objects split", lambda: count_zones(path)),
+                               ("Zone count, from index", lambda: index.count('Zone'))]:
+            result, seconds = timed(function)
+            print("%-40s %8.3f s  %s" % (name, seconds, result))
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100)
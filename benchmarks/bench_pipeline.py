@@ -0,0 +1,263 @@
+"""
+Benchmark suite for the transition pipeline, saving its results as JSON so that runs on different commits can be
+compared.
+
+A synthetic input file (see synthetic_idf.py) is written for every combination of size, comment density and position
+of the Version object, and these stages are measured:
+
+* sniff: sniff_idf_version on each file
+* preflight: preflight_check on each file, which reads the whole file
+* run: a full TransitionRunThread run of each file up a chain of stub transition programs (see test/fake_energyplus.py),
+  which read and rewrite the whole file like the real ones
+* discovery: EnergyPlusPath finding a tree of fake installations of the stub programs, searching from scratch
+* discovery_indexed: the same, answered from a warm InstallationIndex as on a later launch
+
+Every measurement is made in a fresh Python process, so that the peak resident set size reported is that stage's own;
+the peak of the largest stub transition program it started is reported separately, though that is never below the
+size of the measuring process when the program was started, as the operating system counts it from before the exec.
+Bytes read and written are taken from /proc/self/io, so are only reported on Linux; they include the reads and writes
+of the stub programs.
+
+Usage: python benchmarks/bench_pipeline.py [--sizes-mb 1 10 100] [--comment-density 0 0.5]
+           [--positions top middle bottom] [--stages sniff preflight run discovery discovery_indexed]
+           [--output results.json] [--compare earlier_results.json]
+"""
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'IDFVersionUpdater'))
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'test'))
+
+from fake_energyplus import make_fake_installations
+from synthetic_idf import VERSION_POSITIONS, write_synthetic_idf
+
+VERSIONS = ['8.5', '8.6', '8.7', '8.8', '8.9', '9.0']
+
+FILE_STAGES = ['sniff', 'preflight', 'run']
+INSTALLATION_STAGES = ['discovery', 'discovery_indexed']
+
+
+def ignore(message):
+    pass
+
+
+def read_process_io():
+    """
+    Returns the bytes this process (and its finished children) have read and written, or None where not available
+    """
+    try:
+        with open('/proc/self/io') as f:
+            counters = dict(line.split(': ') for line in f.read().splitlines())
+    except (IOError, OSError):
+        return None
+    return int(counters['rchar']), int(counters['wchar'])
+
+
+def peak_rss_bytes(who):
+    if resource is None:
+        return None
+    peak = resource.getrusage(who).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024  # bytes on Mac, kilobytes elsewhere
+
+
+def energyplus_path(install_root, index=None):
+    from EnergyPlusPath import EnergyPlusPath
+    return EnergyPlusPath(index, install_root=install_root)
+
+
+def stage_sniff(case):
+    from VersionSniffer import sniff_idf_version
+    return lambda: sniff_idf_version(case['path'])
+
+
+def stage_preflight(case):
+    from PreflightCheck import preflight_check
+    ep_path = energyplus_path(case['install_root'])
+
+    def check():
+        assert preflight_check(case['path'], ep_path, run_directory=case['scratch_directory']).ok, \
+            "The synthetic file failed the pre-flight check"
+    return check
+
+
+def stage_run(case):
+    from EnergyPlusVersion import EnergyPlusVersion
+    from TransitionRunThread import TransitionRunThread
+    ep_path = energyplus_path(case['install_root'])
+    chain = ep_path.get_transition_chain(EnergyPlusVersion.parse(VERSIONS[0]))
+    run = TransitionRunThread(chain, ep_path.transition_directory, case['path'], False, ignore, ignore,
+                              isolated=True, scratch_parent=case['scratch_directory'])
+
+    def transition():
+        run.run()
+        run.cleanup()
+        assert not run.failed, "The stub transitions failed"
+    return transition
+
+
+def stage_discovery(case):
+    return lambda: energyplus_path(case['install_root'])
+
+
+def stage_discovery_indexed(case):
+    from InstallationIndex import InstallationIndex
+    energyplus_path(case['install_root'], InstallationIndex(case['index_path']))  # warm the index up
+    return lambda: energyplus_path(case['install_root'], InstallationIndex(case['index_path']))
+
+
+STAGES = {
+    'sniff': stage_sniff,
+    'preflight': stage_preflight,
+    'run': stage_run,
+    'discovery': stage_discovery,
+    'discovery_indexed': stage_discovery_indexed,
+}
+
+
+def measure(case):
+    """
+    Runs one stage of one case in this process and returns its measurements; called in a fresh process by run_case
+    """
+    work = STAGES[case['stage']](case)
+    io_before = read_process_io()
+    start = time.time()
+    work()
+    wall_seconds = time.time() - start
+    io_after = read_process_io()
+    measurement = {
+        'wall_seconds': wall_seconds,
+        'peak_rss_bytes': peak_rss_bytes(resource.RUSAGE_SELF) if resource else None,
+        'children_peak_rss_bytes': peak_rss_bytes(resource.RUSAGE_CHILDREN) if resource else None,
+        'read_bytes': None,
+        'write_bytes': None,
+    }
+    if io_before is not None and io_after is not None:
+        measurement['read_bytes'] = io_after[0] - io_before[0]
+        measurement['write_bytes'] = io_after[1] - io_before[1]
+    return measurement
+
+
+def run_case(case):
+    output = subprocess.check_output([sys.executable, os.path.realpath(__file__), '--measure', json.dumps(case)])
+    result = dict((key, case[key]) for key in ['stage', 'size_mb', 'size_bytes', 'comment_density', 'position']
+                  if key in case)
+    result.update(json.loads(output.decode('utf-8')))
+    return result
+
+
+def git_commit():
+    try:
+        output = subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.realpath(__file__)),
+                                         stderr=subprocess.STDOUT)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.decode('utf-8').strip()
+
+
+def case_key(result):
+    return result['stage'], result.get('size_mb'), result.get('comment_density'), result.get('position')
+
+
+def format_bytes(value):
+    return '-' if value is None else '%.1f' % (value / (1024.0 * 1024.0))
+
+
+def print_result(result, earlier=None):
+    line = "%-18s %8s %7s %7s %10.3f %10s %10s %10s %10s" % (
+        result['stage'], result.get('size_mb', ''), result.get('comment_density', ''), result.get('position', ''),
+        result['wall_seconds'], format_bytes(result['peak_rss_bytes']), format_bytes(result['children_peak_rss_bytes']),
+        format_bytes(result['read_bytes']), format_bytes(result['write_bytes']))
+    if earlier is not None and earlier['wall_seconds'] > 0:
+        line += " %7.2fx" % (result['wall_seconds'] / earlier['wall_seconds'])
+    print(line)
+    sys.stdout.flush()
+
+
+def main(args):
+    earlier = {}
+    if args.compare:
+        with open(args.compare) as f:
+            earlier = dict((case_key(r), r) for r in json.load(f)['results'])
+    temp_dir = tempfile.mkdtemp(dir=args.work_dir)
+    report = {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'started': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': [],
+    }
+    try:
+        installations = os.path.join(temp_dir, 'installations')
+        make_fake_installations(installations, VERSIONS, args.installations)
+        scratch_directory = os.path.join(temp_dir, 'scratch')
+        os.makedirs(scratch_directory)
+        print("%-18s %8s %7s %7s %10s %10s %10s %10s %10s" % (
+            "stage", "size MB", "comment", "version", "wall (s)", "RSS MB", "child MB", "read MB", "write MB"))
+        for stage in [s for s in INSTALLATION_STAGES if s in args.stages]:
+            result = run_case({'stage': stage, 'install_root': installations,
+                               'index_path': os.path.join(temp_dir, stage + '.json')})
+            report['results'].append(result)
+            print_result(result, earlier.get(case_key(result)))
+        for size_mb in args.sizes_mb:
+            for density in args.comment_density:
+                for position in args.positions:
+                    path = os.path.join(temp_dir, 'model.idf')
+                    size_bytes = write_synthetic_idf(path, int(size_mb * 1024 * 1024), VERSIONS[0], position, density)
+                    for stage in [s for s in FILE_STAGES if s in args.stages]:
+                        result = run_case({'stage': stage, 'size_mb': size_mb, 'size_bytes': size_bytes,
+                                           'comment_density': density, 'position': position, 'path': path,
+                                           'install_root': installations,
+                                           'scratch_directory': scratch_directory})
+                        report['results'].append(result)
+                        print_result(result, earlier.get(case_key(result)))
+    finally:
+        shutil.rmtree(temp_dir)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print("Results written to %s" % args.output)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Benchmark the transition pipeline on synthetic input files')
+    parser.add_argument('--sizes-mb', type=float, nargs='+', default=[1, 10, 100],
+                        help='Sizes of synthetic file to benchmark, in megabytes (default: 1 10 100)')
+    parser.add_argument('--comment-density', type=float, nargs='+', default=[0.0, 0.5],
+                        help='Fractions of comment lines in the synthetic files (default: 0 0.5)')
+    parser.add_argument('--positions', nargs='+', choices=VERSION_POSITIONS, default=VERSION_POSITIONS,
+                        help='Where to put the Version object in the synthetic files (default: all)')
+    parser.add_argument('--stages', nargs='+', choices=sorted(STAGES), default=FILE_STAGES + INSTALLATION_STAGES,
+                        help='Stages to measure (default: all)')
+    parser.add_argument('--installations', type=int, default=3,
+                        help='Number of fake installations to discover (default: 3, at most %d)' % (len(VERSIONS) - 1))
+    parser.add_argument('--work-dir', default=None,
+                        help='Directory to write the synthetic files in (default: system temp directory)')
+    parser.add_argument('--output', default='benchmark-results.json', help='File to write the results to as JSON')
+    parser.add_argument('--compare', default=None, metavar='JSON',
+                        help='Results of an earlier run to show the change in wall time against')
+    parser.add_argument('--measure', default=None, help=argparse.SUPPRESS)
+    return parser
+
+
+if __name__ == "__main__":
+    parser = build_parser()
+    arguments = parser.parse_args()
+    if not 1 <= arguments.installations < len(VERSIONS):
+        parser.error("--installations must be between 1 and %d" % (len(VERSIONS) - 1))
+    if arguments.measure is not None:
+        print(json.dumps(measure(json.loads(arguments.measure))))
+    else:
+        main(arguments)
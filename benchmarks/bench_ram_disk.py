@@ -0,0 +1,64 @@
+"""
+Benchmark comparing transition runs with the scratch directory on disk against a RAM-backed directory.
+
+A chain of stub transition programs (see test/fake_energyplus.py) is run over a synthetic file with intermediate
+versions kept, once with the scratch directory in the disk directory and once in the RAM directory.  If the system temp
+directory is itself a tmpfs, pass a directory on a real disk.
+
+Usage: python benchmarks/bench_ram_disk.py [size_mb] [disk_dir] [ram_dir]
+"""
+from __future__ import print_function
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'IDFVersionUpdater'))
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'test'))
+
+from fake_energyplus import make_stub_transitions
+from TransitionRunThread import TransitionRunThread
+from TransitionWorkspace import DEFAULT_RAM_DIRECTORY
+
+VERSIONS = ['8.%d' % minor for minor in range(4, 10)] + ['9.%d' % minor for minor in range(0, 5)]
+
+
+def ignore(message):
+    pass
+
+
+def timed_run(transitions, transition_dir, input_path, scratch_parent, ram_directory):
+    run = TransitionRunThread(transitions, transition_dir, input_path, True, ignore, ignore, isolated=True,
+                              scratch_parent=scratch_parent, ram_directory=ram_directory)
+    start = time.time()
+    run.run()
+    elapsed = time.time() - start
+    assert not run.failed and run.in_memory == (ram_directory is not None)
+    run.cleanup()
+    return elapsed
+
+
+def main(size_mb, disk_dir, ram_dir):
+    temp_dir = tempfile.mkdtemp(dir=disk_dir)
+    try:
+        transitions = make_stub_transitions(temp_dir, VERSIONS)
+        input_path = os.path.join(temp_dir, 'model.idf')
+        with open(input_path, 'w') as f:
+            f.write('Version,%s;\n' % VERSIONS[0])
+            line = 'Zone,Zone One,0,0,0,0;   ! a zone\n'
+            f.write(line * (size_mb * 1024 * 1024 // len(line)))
+        print("%d MB file, %d transitions, intermediate versions kept" % (size_mb, len(transitions)))
+        disk = timed_run(transitions, temp_dir, input_path, disk_dir, None)
+        print("%-6s %-30s %8.2f s" % ("disk", disk_dir or tempfile.gettempdir(), disk))
+        ram = timed_run(transitions, temp_dir, input_path, disk_dir, ram_dir)
+        print("%-6s %-30s %8.2f s (%.1fx)" % ("memory", ram_dir, ram, disk / ram))
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50,
+         sys.argv[2] if len(sys.argv) > 2 else None,
+         sys.argv[3] if len(sys.argv) > 3 else DEFAULT_RAM_DIRECTORY)
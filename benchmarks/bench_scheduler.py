@@ -0,0 +1,74 @@
+"""
+Benchmark comparing the transition scheduler against running the same files one after another.
+
+A directory of stub transition programs is built (see test/fake_energyplus.py), each of which sleeps for a fixed time to
+stand in for the real work, and a set of files starting at different versions is transitioned to the latest version,
+first sequentially through TransitionRunThread.run and then through TransitionScheduler.
+
+Usage: python benchmarks/bench_scheduler.py [num_files] [step_delay_seconds] [workers]
+"""
+from __future__ import print_function
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'IDFVersionUpdater'))
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'test'))
+
+from fake_energyplus import make_stub_transitions
+from TransitionRunThread import TransitionRunThread
+from TransitionScheduler import TransitionScheduler
+
+VERSIONS = ['8.%d' % minor for minor in range(4, 10)] + ['9.%d' % minor for minor in range(0, 5)]
+
+
+def ignore(message):
+    pass
+
+
+def make_runs(temp_dir, transitions, num_files):
+    runs = []
+    for i in range(num_files):
+        start_index = i % (len(VERSIONS) - 1)
+        path = os.path.join(temp_dir, 'model_%d.idf' % i)
+        with open(path, 'w') as f:
+            f.write('Version,%s;\n' % VERSIONS[start_index] + 'Zone,Zone One,0,0,0,0;\n' * 1000)
+        runs.append(TransitionRunThread(transitions[start_index:], temp_dir, path, False, ignore, ignore,
+                                        isolated=True))
+    return runs
+
+
+def main(num_files, delay, workers):
+    temp_dir = tempfile.mkdtemp()
+    try:
+        transitions = make_stub_transitions(temp_dir, VERSIONS, delay)
+        steps = sum(len(run.transitions) for run in make_runs(temp_dir, transitions, num_files))
+        print("%d files, %d transition steps, %.2f s per step" % (num_files, steps, delay))
+
+        start = time.time()
+        for run in make_runs(temp_dir, transitions, num_files):
+            run.run()
+            run.cleanup()
+        sequential = time.time() - start
+        print("%-28s %8.2f s" % ("sequential TransitionRunThread", sequential))
+
+        scheduler = TransitionScheduler(workers)
+        runs = make_runs(temp_dir, transitions, num_files)
+        for run in runs:
+            scheduler.submit(run)
+        scheduler.run()
+        for run in runs:
+            run.cleanup()
+        print("%-28s %8.2f s (%d workers, %.1fx)" % ("TransitionScheduler", scheduler.elapsed, scheduler.workers,
+                                                     sequential / scheduler.elapsed))
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20,
+         float(sys.argv[2]) if len(sys.argv) > 2 else 0.05,
+         int(sys.argv[3]) if len(sys.argv) > 3 else None)
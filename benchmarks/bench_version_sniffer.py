@@ -0,0 +1,53 @@
+"""
+Benchmark for the streaming version sniffer.
+
+Generates synthetic input files of increasing size and reports the wall time and peak Python heap allocation of
+:py:func:`sniff_idf_version <VersionSniffer.sniff_idf_version>` for each, with the Version object placed either at the
+top of the file (the usual case, where reading stops early) or at the bottom (the worst case, where the whole file is
+streamed).  Peak memory should stay flat as the file grows in both cases.
+
+Usage: python benchmarks/bench_version_sniffer.py [size_mb ...]
+"""
+from __future__ import print_function
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'IDFVersionUpdater'))
+
+from synthetic_idf import write_synthetic_idf
+from VersionSniffer import sniff_idf_version
+
+
+def measure(path):
+    # time an untraced call, since tracing allocations slows the scan down considerably
+    start = time.time()
+    version = sniff_idf_version(path)
+    elapsed = time.time() - start
+    tracemalloc.start()
+    sniff_idf_version(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert version == (9, 4, 0)
+    return elapsed, peak
+
+
+def main(sizes_mb):
+    print("%10s %8s %12s %14s" % ("size (MB)", "version", "time (s)", "peak heap (kB)"))
+    for size_mb in sizes_mb:
+        for version_at_top in [True, False]:
+            fd, path = tempfile.mkstemp(suffix='.idf')
+            os.close(fd)
+            try:
+                write_synthetic_idf(path, size_mb * 1024 * 1024, version_position='top' if version_at_top else 'bottom')
+                elapsed, peak = measure(path)
+            finally:
+                os.remove(path)
+            print("%10d %8s %12.4f %14.1f" % (size_mb, 'top' if version_at_top else 'bottom', elapsed, peak / 1024.0))
+
+
+if __name__ == "__main__":
+    main([int(x) for x in sys.argv[1:]] or [1, 10, 100])
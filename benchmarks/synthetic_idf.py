@@ -0,0 +1,63 @@
+"""
+Helpers for writing synthetic input files of any size, so the pipeline can be benchmarked on large models without
+shipping any.  The file is a run of Zone objects, optionally interleaved with comment lines, with the Version object
+placed at the top (where it almost always is), in the middle, or at the bottom (the worst case for the sniffer).
+"""
+VERSION_POSITIONS = ['top', 'middle', 'bottom']
+
+ZONE_OBJECT = "Zone,\n  Zone %d,                  !- Name\n" \
+              "  0,                       !- Direction of Relative North\n" \
+              "  0, 0, 0;                 !- X,Y,Z Origin\n\n"
+
+COMMENT_LINE = "! Zone %d was added for the synthetic benchmark model, this line is only a comment\n"
+
+# Objects are generated and written this many at a time, so any size of file can be written in little memory
+OBJECTS_PER_BLOCK = 1000
+
+
+def write_synthetic_idf(path, size_bytes, version='9.4.0', version_position='top', comment_density=0.0):
+    """
+    Writes a synthetic input file of about the requested size.
+
+    :param path: The file to write
+    :param size_bytes: The approximate size of the file; it stops at the end of the block which passes this size
+    :param version: The version to write in the Version object
+    :param version_position: One of VERSION_POSITIONS
+    :param comment_density: The fraction, between 0 and 1, of the lines in the file which are whole-line comments
+    :rtype: The number of bytes written
+    """
+    if version_position not in VERSION_POSITIONS:
+        raise ValueError("Unknown version position %r" % version_position)
+    version_object = "Version,%s;\n\n" % version
+    zone_lines = ZONE_OBJECT.count('\n')
+    # for a density d, each object of n lines gets c comment lines where c / (n + c) = d
+    comments_per_object = zone_lines * comment_density / (1.0 - comment_density) if comment_density < 1.0 else 0.0
+    written = 0
+    version_written = False
+    i = 0
+    owed_comments = 0.0
+    with open(path, 'w') as f:
+        if version_position == 'top':
+            f.write(version_object)
+            written += len(version_object)
+            version_written = True
+        while written < size_bytes:
+            parts = []
+            for n in range(i, i + OBJECTS_PER_BLOCK):
+                owed_comments += comments_per_object
+                while owed_comments >= 1.0:
+                    parts.append(COMMENT_LINE % n)
+                    owed_comments -= 1.0
+                parts.append(ZONE_OBJECT % n)
+            block = ''.join(parts)
+            f.write(block)
+            written += len(block)
+            i += OBJECTS_PER_BLOCK
+            if version_position == 'middle' and not version_written and written >= size_bytes // 2:
+                f.write(version_object)
+                written += len(version_object)
+                version_written = True
+        if not version_written:
+            f.write(version_object)
+            written += len(version_object)
+    return written
@@ -1,3 +1,28 @@
+import sys
+
+from test_BatchTransition import *
 from test_EnergyPlusPath import *
+from test_EnergyPlusVersion import *
+from test_IdfObjects import *
+from test_IncrementalTransform import *
+from test_InstallationIndex import *
+from test_IntermediateArchive import *
+from test_ObjectIndex import *
+from test_PreflightCheck import *
+from test_ShardedTransform import *
 from test_TransitionBinary import *
+from test_TransitionCache import *
+from test_TransitionGraph import *
+from test_TransitionMetrics import *
+from test_TransitionOutput import *
+from test_TransitionReport import *
+from test_TransitionRules import *
+from test_TransitionScheduler import *
+from test_TransitionServer import *
+from test_TransitionWorkspace import *
+from test_VersionSniffer import *
 from test_VersionUpdaterWindow import *
+
+# the asyncio engine needs Python 3.7 or newer
+if sys.version_info >= (3, 7):
+    from test_AsyncTransitionEngine import *
@@ -0,0 +1,135 @@
+"""
+Fake EnergyPlus installations for the tests and benchmarks, so that discovery, transitions, caching and cancellation
+can be exercised on a machine without EnergyPlus.  The installations are laid out like the real ones
+(EnergyPlus-8-7-0/PreProcess/IDFVersionUpdater/Transition-V8-6-0-to-V8-7-0 and so on) and are found by pointing
+:py:class:`EnergyPlusPath <EnergyPlusPath.EnergyPlusPath>` at them with its install_root parameter.
+
+The stub programs are Python scripts, so they only run where a script can be executed directly (not on Windows).
+Each stub transition program reads the whole input file and, like the real ones, writes the new version to a new file,
+then moves the original aside (in.idf to in.idfold, in.imf to in.imfold) and the new file into its place, unless they
+are made to rewrite the input in place after writing a copy of it to the old file, as some programs do.  Their
+behaviour can be set for every stub (a delay, a failure, or some amount of progress output), and also for a single
+file by writing a marker in it:
+
+* FAIL: the program exits with an error without transitioning the file
+* SLOW: the program sleeps for 30 seconds before transitioning the file, to give time to cancel it
+* AUDIT: the program also writes an audit file next to the input file
+* NOOLD: the program leaves no old file behind
+"""
+import os
+import stat
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'IDFVersionUpdater'))
+
+from EnergyPlusPath import EnergyPlusPath
+from TransitionBinary import TransitionBinary
+
+STUB_TRANSITION = """#!%(python)s
+import os, re, sys, time
+name = sys.argv[1]
+stem = os.path.splitext(name)[0]
+with open(name) as f:
+    text = f.read()
+if %(fail)r or 'FAIL' in text:
+    sys.exit(1)
+time.sleep(%(delay)f)
+if 'SLOW' in text:
+    time.sleep(30)
+for i in range(%(output_lines)d):
+    sys.stdout.write('Processing object %%d of %(output_lines)d\\n' %% (i + 1))
+if 'AUDIT' in text:
+    with open(stem + '.audit', 'w') as f:
+        f.write('audited')
+new_text = re.sub(r'(?i)(Version\\s*,\\s*)[0-9.]+', r'\\g<1>%(target)s', text, 1)
+if %(in_place)r:
+    if 'NOOLD' not in text:
+        with open(name + 'old', 'w') as f:
+            f.write(text)
+    with open(name, 'w') as f:
+        f.write(new_text)
+    sys.exit(0)
+with open(name + 'new', 'w') as f:
+    f.write(new_text)
+if os.path.exists(name + 'old'):
+    os.remove(name + 'old')
+os.rename(name, name + 'old')
+os.rename(name + 'new', name)
+if 'NOOLD' in text:
+    os.remove(name + 'old')
+"""
+
+STUB_ENERGYPLUS = """#!%(python)s
+import sys
+if '-v' in sys.argv[1:]:
+    print('EnergyPlus, Version %(version)s-0000000000')
+"""
+
+
+def version_folder_suffix(version):
+    """
+    Returns the suffix of an installation folder for a version such as '8.7', which is '8-7-0'
+    """
+    parts = version.split('.')
+    return '-'.join(parts + ['0'] * (3 - len(parts)))
+
+
+def write_executable(path, contents):
+    with open(path, 'w') as f:
+        f.write(contents)
+    os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC | stat.S_IXGRP | stat.S_IXOTH)
+
+
+def make_stub_transitions(directory, versions, delay=0.0, fail=False, output_lines=0, in_place=False):
+    """
+    Writes a stub transition program into directory for each consecutive pair of versions, for example
+    ['8.5', '8.6', '8.7'] gives Transition-V8-5-0-to-V8-6-0 and Transition-V8-6-0-to-V8-7-0.
+
+    :param delay: The number of seconds each program sleeps for, standing in for the real work
+    :param fail: A boolean flag for whether every program exits with an error
+    :param output_lines: The number of progress lines each program writes to standard output
+    :param in_place: A boolean flag for whether each program rewrites its input file in place instead of replacing it
+    :rtype: The list of TransitionBinary instances, in chain order
+    """
+    transitions = []
+    for source, target in zip(versions[:-1], versions[1:]):
+        path = os.path.join(directory, 'Transition-V%s-to-V%s' % (version_folder_suffix(source),
+                                                                 version_folder_suffix(target)))
+        write_executable(path, STUB_TRANSITION % {'python': sys.executable, 'target': target, 'delay': delay,
+                                                  'fail': fail, 'output_lines': output_lines,
+                                                  'in_place': in_place})
+        transitions.append(TransitionBinary(path))
+    return transitions
+
+
+def make_fake_installations(root, versions, num_installations=1, **behaviour):
+    """
+    Builds fake installations under root for each of the last num_installations versions.  Like a real installation,
+    each holds a stub transition program for every step from the first version up to its own, along with a stub
+    EnergyPlus program answering ``-v`` with its version.
+
+    :param behaviour: Any of the keyword arguments of make_stub_transitions, applied to every stub transition program
+    :rtype: The list of installation folders, from the oldest version to the newest
+    """
+    installations = []
+    for index in range(len(versions) - num_installations, len(versions)):
+        installation = os.path.join(root, 'EnergyPlus-' + version_folder_suffix(versions[index]))
+        transition_directory = os.path.join(installation, 'PreProcess', 'IDFVersionUpdater')
+        os.makedirs(transition_directory)
+        make_stub_transitions(transition_directory, versions[:index + 1], **behaviour)
+        write_executable(os.path.join(installation, 'EnergyPlus'),
+                         STUB_ENERGYPLUS % {'python': sys.executable,
+                                            'version': version_folder_suffix(versions[index]).replace('-', '.')})
+        installations.append(installation)
+    return installations
+
+
+def make_energyplus_path(root, versions, num_installations=1, index=None, **behaviour):
+    """
+    Builds fake installations with make_fake_installations and finds them with EnergyPlusPath
+
+    :param index: An optional InstallationIndex for the EnergyPlusPath to use
+    :rtype: An EnergyPlusPath instance for the fake installations, whose latest version is the last of versions
+    """
+    make_fake_installations(root, versions, num_installations, **behaviour)
+    return EnergyPlusPath(index, install_root=root)
@@ -0,0 +1,89 @@
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'IDFVersionUpdater'))
+
+from AsyncTransitionEngine import AsyncTransitionEngine, EVENT_FINISHED, EVENT_STARTED, EVENT_STEP_FINISHED
+from EnergyPlusVersion import EnergyPlusVersion
+from fake_energyplus import make_energyplus_path
+
+
+class TestAsyncTransitionEngine(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.scratch_dir = os.path.join(self.temp_dir, 'scratch')
+        os.makedirs(self.scratch_dir)
+        self.ep_path = make_energyplus_path(os.path.join(self.temp_dir, 'installations'), ['8.5', '8.6', '8.7'])
+        self.engine = AsyncTransitionEngine(self.ep_path, max_concurrent=2, scratch_parent=self.scratch_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write(self, name, contents):
+        path = os.path.join(self.temp_dir, name)
+        with open(path, 'w') as f:
+            f.write(contents)
+        return path
+
+    def test_concurrent_transitions_and_events(self):
+        paths = [self.write('%s.idf' % name, 'Version,8.5;\nZone,%s;' % name) for name in 'abcd']
+        failing_path = self.write('bad.idf', 'Version,8.5;\nZone,FAIL;')
+
+        async def run_all():
+            events = []
+
+            async def collect():
+                async for event in self.engine.events():
+                    events.append(event)
+
+            collector = asyncio.ensure_future(collect())
+            await asyncio.sleep(0)
+            results = await asyncio.gather(*[self.engine.transition(path) for path in paths + [failing_path]])
+            self.engine.close()
+            await collector
+            return results, events
+
+        results, events = asyncio.run(run_all())
+        for path, result in zip(paths, results[:4]):
+            self.assertTrue(result.success)
+            self.assertEqual(result.target_version, EnergyPlusVersion(8, 7))
+            self.assertEqual(len(result.steps), 2)
+            with open(result.output_path) as f:
+                self.assertEqual(f.read(), 'Version,8.7;\nZone,%s;' % os.path.basename(path)[0])
+        self.assertFalse(results[4].success)
+        self.assertIsNone(results[4].output_path)
+        self.assertEqual([e.kind for e in events].count(EVENT_STARTED), 5)
+        self.assertEqual([e.kind for e in events].count(EVENT_STEP_FINISHED), 9)
+        self.assertEqual([e.kind for e in events].count(EVENT_FINISHED), 5)
+        self.assertEqual(os.listdir(self.scratch_dir), [])
+
+    def test_target_version(self):
+        path = self.write('a.idf', 'Version,8.5;')
+        result = asyncio.run(self.engine.transition(path, '8.6', os.path.join(self.temp_dir, 'out.idf')))
+        self.assertTrue(result.success)
+        with open(os.path.join(self.temp_dir, 'out.idf')) as f:
+            self.assertEqual(f.read(), 'Version,8.6;')
+        self.assertFalse(asyncio.run(self.engine.transition(path, '9.0')).success)
+
+    def test_cancel_kills_chain(self):
+        path = self.write('slow.idf', 'Version,8.5;\nZone,SLOW;')
+
+        async def cancel_soon():
+            task = asyncio.ensure_future(self.engine.transition(path))
+            await asyncio.sleep(0.5)
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                return True
+            return False
+
+        start = time.time()
+        self.assertTrue(asyncio.run(cancel_soon()))
+        self.assertLess(time.time() - start, 10)
+        self.assertEqual(os.listdir(self.scratch_dir), [])
@@ -0,0 +1,139 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'IDFVersionUpdater'))
+
+from BatchTransition import BatchTransition
+from IntermediateArchive import IntermediateArchive
+from EnergyPlusVersion import EnergyPlusVersion
+from fake_energyplus import make_energyplus_path
+
+
+class TestBatchTransition(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.input_dir = os.path.join(self.temp_dir, 'models')
+        self.output_dir = os.path.join(self.temp_dir, 'out')
+        os.makedirs(os.path.join(self.input_dir, 'nested'))
+        self.ep_path = make_energyplus_path(os.path.join(self.temp_dir, 'installations'), ['8.5', '8.6', '8.7'])
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write_input(self, relative_path, contents):
+        with open(os.path.join(self.input_dir, relative_path), 'w') as f:
+            f.write(contents)
+
+    def test_discover_input_files(self):
+        self.write_input('a.idf', 'Version,8.5;')
+        self.write_input(os.path.join('nested', 'b.IMF'), 'Version,8.5;')
+        self.write_input(os.path.join('nested', 'notes.txt'), '')
+        found = BatchTransition.discover_input_files(self.input_dir)
+        self.assertEqual([os.path.relpath(x, self.input_dir) for x in found],
+                         ['a.idf', os.path.join('nested', 'b.IMF')])
+
+    def test_batch_results(self):
+        self.write_input('a.idf', 'Version,8.5;\nZone,A;')
+        self.write_input(os.path.join('nested', 'a.idf'), 'Version,8.6.0;')
+        self.write_input(os.path.join('nested', 'current.idf'), 'Version,8.7;')
+        self.write_input(os.path.join('nested', 'broken.idf'), 'Version,8.5;\nZone,FAIL;')
+        self.write_input(os.path.join('nested', 'ancient.idf'), 'Version,7.2;')
+        batch = BatchTransition(self.input_dir, self.output_dir, self.ep_path, workers=3)
+        results = dict((r.relative_path, r) for r in batch.run())
+        self.assertEqual(len(results), 5)
+        self.assertTrue(results['a.idf'].success)
+        self.assertEqual(results['a.idf'].steps, 2)
+        self.assertEqual(results['a.idf'].target_version, EnergyPlusVersion(8, 7))
+        with open(os.path.join(self.output_dir, 'a.idf')) as f:
+            self.assertEqual(f.read(), 'Version,8.7;\nZone,A;')
+        self.assertTrue(results[os.path.join('nested', 'a.idf')].success)
+        self.assertEqual(results[os.path.join('nested', 'a.idf')].steps, 1)
+        self.assertTrue(results[os.path.join('nested', 'current.idf')].success)
+        self.assertEqual(results[os.path.join('nested', 'current.idf')].steps, 0)
+        self.assertFalse(results[os.path.join('nested', 'broken.idf')].success)
+        self.assertFalse(results[os.path.join('nested', 'ancient.idf')].success)
+        self.assertGreater(batch.files_per_minute(), 0)
+
+    def test_malformed_file_is_not_run(self):
+        self.write_input('a.idf', 'Version,8.5;\nZone,A')
+        steps = []
+        batch = BatchTransition(self.input_dir, self.output_dir, self.ep_path, workers=1, step_callback=steps.append)
+        result = batch.run()[0]
+        self.assertFalse(result.success)
+        self.assertEqual(result.message, "Line 2: the last object does not end with a semicolon")
+        self.assertIsNone(result.report)
+        self.assertEqual(steps, [])
+        self.assertFalse(os.path.exists(self.output_dir))
+
+    def test_audit_files_copied(self):
+        self.write_input('a.idf', 'Version,8.5;\nZone,AUDIT;')
+        batch = BatchTransition(self.input_dir, self.output_dir, self.ep_path, workers=1)
+        self.assertTrue(batch.run()[0].success)
+        self.assertEqual(sorted(os.listdir(self.output_dir)), ['a.audit', 'a.idf'])
+
+    def test_save_report(self):
+        self.write_input('a.idf', 'Version,8.5;')
+        self.write_input('current.idf', 'Version,8.7;')
+        steps = []
+        batch = BatchTransition(self.input_dir, self.output_dir, self.ep_path, workers=2, step_callback=steps.append)
+        batch.run()
+        report_path = os.path.join(self.temp_dir, 'report.json')
+        batch.save_report(report_path)
+        with open(report_path) as f:
+            files = dict((r['relative_path'], r) for r in json.load(f)['files'])
+        self.assertIsNone(files['current.idf']['report'])
+        self.assertEqual(files['a.idf']['report']['outcome'], 'succeeded')
+        self.assertEqual([(s['source_version'], s['target_version']) for s in files['a.idf']['report']['steps']],
+                         [('8.5', '8.6'), ('8.6', '8.7')])
+        self.assertEqual(len(steps), 2)
+
+    def test_keep_intermediate_versions(self):
+        self.write_input('a.idf', 'Version,8.5;')
+        batch = BatchTransition(self.input_dir, self.output_dir, self.ep_path, workers=1, keep_old=True)
+        results = batch.run()
+        self.assertTrue(results[0].success)
+        self.assertEqual(sorted(os.listdir(self.output_dir)), ['a.idf', 'a_8.5.idf', 'a_8.6.idf'])
+        with open(os.path.join(self.output_dir, 'a_8.6.idf')) as f:
+            self.assertEqual(f.read(), 'Version,8.6;')
+        self.assertEqual(results[0].bytes_copied + results[0].bytes_avoided, 2 * len('Version,8.5;'))
+
+    def test_keep_intermediate_versions_of_program_rewriting_in_place(self):
+        self.write_input('a.idf', 'Version,8.5;')
+        ep_path = make_energyplus_path(os.path.join(self.temp_dir, 'in_place'), ['8.5', '8.6', '8.7', '8.8'],
+                                       in_place=True)
+        batch = BatchTransition(self.input_dir, self.output_dir, ep_path, workers=1, keep_old=True)
+        results = batch.run()
+        self.assertTrue(results[0].success)
+        self.assertEqual(sorted(os.listdir(self.output_dir)), ['a.idf', 'a_8.5.idf', 'a_8.6.idf', 'a_8.7.idf'])
+        for version in ['8.5', '8.6', '8.7']:
+            with open(os.path.join(self.output_dir, 'a_%s.idf' % version)) as f:
+                self.assertEqual(f.read(), 'Version,%s;' % version)
+
+    def test_keep_intermediate_versions_without_old_file(self):
+        self.write_input('b.imf', 'Version,8.5;\nZone,NOOLD;')
+        self.write_input('c.imf', 'Version,8.5;')
+        for in_place in [False, True]:
+            ep_path = make_energyplus_path(os.path.join(self.temp_dir, 'in_place_%s' % in_place), ['8.5', '8.6', '8.7'],
+                                           in_place=in_place)
+            batch = BatchTransition(self.input_dir, self.output_dir, ep_path, workers=1, keep_old=True)
+            results = batch.run()
+            self.assertTrue(all(result.success for result in results))
+            for name in ['b', 'c']:
+                for version in ['8.5', '8.6']:
+                    with open(os.path.join(self.output_dir, '%s_%s.imf' % (name, version))) as f:
+                        self.assertTrue(f.read().startswith('Version,%s;' % version))
+
+    def test_compressed_intermediate_versions(self):
+        self.write_input('a.idf', 'Version,8.5;')
+        batch = BatchTransition(self.input_dir, self.output_dir, self.ep_path, workers=1, keep_old=True,
+                                compression='delta')
+        self.assertTrue(batch.run()[0].success)
+        self.assertEqual(sorted(os.listdir(self.output_dir)),
+                         ['a.idf', 'a.versions.json', 'a_8.5.idf.gz', 'a_8.6.idf.delta.gz'])
+        restored_path = IntermediateArchive(self.output_dir, 'a.idf').restore('8.6')
+        with open(restored_path) as f:
+            self.assertEqual(f.read(), 'Version,8.6;')
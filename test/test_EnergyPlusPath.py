@@ -1,65 +1,88 @@
 import os
+import shutil
 import sys
+import tempfile
 import unittest
 
 sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'IDFVersionUpdater'))
 
+from EnergyPlusPath import EnergyPlusPath
+from EnergyPlusVersion import EnergyPlusVersion
+from InstallationIndex import InstallationIndex
+from fake_energyplus import make_energyplus_path, make_fake_installations
 
-# EnergyPlusPath is entirely based on an existing installation, so it doesn't make it easy to unit test on a standalone
-# machine without Installing E+ itself
-
-# from EnergyPlusPath import EnergyPlusPath
-
-# class TestEnergyPlusPath(unittest.TestCase):
-#     def test_proper_path_no_trailing_slash(self):
-#         eight_one = EnergyPlusPath('/Applications/EnergyPlus-8-1-0')
-#         self.assertEqual(eight_one, '8-1-0')
-#
-#     def test_proper_path_with_trailing_slash(self):
-#         eight_one = EnergyPlusPath.get_version_number_from_path('/Applications/EnergyPlus-8-1-0/')
-#         self.assertEqual(eight_one, '8-1-0')
-#
-#     def test_bad_path_with_enough_tokens(self):
-#         eight_one = EnergyPlusPath.get_version_number_from_path('/usr/local/EnergyPlus-8-1-0')
-#         self.assertIsNone(eight_one)
-#
-#     def test_bad_path_not_enough_tokens(self):
-#         with self.assertRaises(IndexError):
-#             EnergyPlusPath.get_version_number_from_path('/EnergyPlus-8-1-0')
-#
-#
-# class TestGetPathFromVersionNumber(unittest.TestCase):
-#     """The function tested here is quite dumb, just a concatenation wrapper, so it accepts anything"""
-#     def test_valid_version_number(self):
-#         path = EnergyPlusPath.get_path_from_version_number('8-5-0')
-#         self.assertEqual(path, '/Applications/EnergyPlus-8-5-0')
-#
-#     def test_none_version_number(self):
-#         path = EnergyPlusPath.get_path_from_version_number(None)
-#         self.assertEqual(path, '/Applications/EnergyPlus-None')
-#
-#     def test_other_version_number(self):
-#         path = EnergyPlusPath.get_path_from_version_number('SOMETHINGELSE')
-#         self.assertEqual(path, '/Applications/EnergyPlus-SOMETHINGELSE')
-#
-#
-# class TestGetLatestEPlusVersion(unittest.TestCase):
-#     pass  # we'd have to install E+ on the test machine...
-#
-#
-# class TestGetTransitionRunDir(unittest.TestCase):
-#     def test_valid_install_dir(self):
-#         path = EnergyPlusPath.get_transition_run_dir('/Applications/EnergyPlus-8-5-0')
-#         self.assertEqual(path, '/Applications/EnergyPlus-8-5-0/PreProcess/IDFVersionUpdater')
-#
-#     def test_slashed_install_dir(self):
-#         path = EnergyPlusPath.get_transition_run_dir('/Applications/EnergyPlus-8-5-0/')
-#         self.assertEqual(path, '/Applications/EnergyPlus-8-5-0/PreProcess/IDFVersionUpdater')
-#
-#     def test_other_install_dir(self):
-#         path = EnergyPlusPath.get_transition_run_dir('/path/to/ep')
-#         self.assertEqual(path, '/path/to/ep/PreProcess/IDFVersionUpdater')
-
-
-class TestGetTransitionsAvailable(unittest.TestCase):
-    pass  # we'd have to install E+ on the test machine...
+VERSIONS = ['8.5', '8.6', '8.7', '8.8', '8.9']
+
+
+class TestGetInstallationSortKey(unittest.TestCase):
+    def test_sorts_by_version_number(self):
+        folders = ['/usr/local/EnergyPlus-9-6-0', '/usr/local/EnergyPlus-10-0-0', '/usr/local/EnergyPlus-8-9-0']
+        self.assertEqual(sorted(folders, key=EnergyPlusPath.get_installation_sort_key),
+                         ['/usr/local/EnergyPlus-8-9-0', '/usr/local/EnergyPlus-9-6-0', '/usr/local/EnergyPlus-10-0-0'])
+
+    def test_windows_folders(self):
+        self.assertEqual(EnergyPlusPath.get_installation_sort_key('C:/EnergyPlusV22-1-0')[0], (22, 1, 0))
+
+
+class TestGetInstallPattern(unittest.TestCase):
+    def test_install_root(self):
+        self.assertEqual(EnergyPlusPath.get_install_pattern('/opt/energyplus'),
+                         os.path.join('/opt/energyplus', 'EnergyPlus*'))
+
+    def test_relative_install_root(self):
+        self.assertEqual(EnergyPlusPath.get_install_pattern('energyplus'),
+                         os.path.join(os.getcwd(), 'energyplus', 'EnergyPlus*'))
+
+    def test_default_location(self):
+        self.assertIn('EnergyPlus', EnergyPlusPath.get_install_pattern())
+
+
+class TestEnergyPlusPath(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.install_root = os.path.join(self.temp_dir, 'installations')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_latest_installation(self):
+        ep_path = make_energyplus_path(self.install_root, VERSIONS, num_installations=3)
+        self.assertEqual([os.path.basename(p) for p in ep_path.installation_paths],
+                         ['EnergyPlus-8-7-0', 'EnergyPlus-8-8-0', 'EnergyPlus-8-9-0'])
+        self.assertEqual(ep_path.installation_path, os.path.join(self.install_root, 'EnergyPlus-8-9-0'))
+        self.assertEqual(ep_path.version_number, '8-9-0')
+        self.assertEqual(ep_path.latest_version, EnergyPlusVersion(8, 9))
+        self.assertEqual(ep_path.transition_directory,
+                         os.path.join(self.install_root, 'EnergyPlus-8-9-0', 'PreProcess', 'IDFVersionUpdater'))
+        self.assertEqual(ep_path.get_ep_binary(), os.path.join(self.install_root, 'EnergyPlus-8-9-0', 'EnergyPlus'))
+
+    def test_transitions_available(self):
+        ep_path = make_energyplus_path(self.install_root, VERSIONS, num_installations=2)
+        self.assertEqual(sorted(tr.binary_name for tr in ep_path.transitions_available),
+                         ['Transition-V8-5-0-to-V8-6-0', 'Transition-V8-6-0-to-V8-7-0', 'Transition-V8-7-0-to-V8-8-0',
+                          'Transition-V8-8-0-to-V8-9-0'])
+        self.assertEqual(len(ep_path.all_transitions), 3 + 4)
+
+    def test_transition_chain(self):
+        ep_path = make_energyplus_path(self.install_root, VERSIONS, num_installations=2)
+        chain = ep_path.get_transition_chain(EnergyPlusVersion(8, 6))
+        self.assertEqual([(str(tr.source_version), str(tr.target_version)) for tr in chain],
+                         [('8.6', '8.7'), ('8.7', '8.8'), ('8.8', '8.9')])
+        # steps shipped by several installations are taken from the newest one
+        self.assertTrue(all(os.path.dirname(tr.full_path_to_binary) == ep_path.transition_directory for tr in chain))
+        self.assertEqual(ep_path.get_transition_chain(EnergyPlusVersion(8, 9)), [])
+        self.assertEqual(ep_path.get_transition_chain(EnergyPlusVersion(7, 2)), [])
+
+    def test_no_installation(self):
+        os.makedirs(self.install_root)
+        self.assertRaises(IndexError, EnergyPlusPath, install_root=self.install_root)
+
+    def test_indexed_discovery(self):
+        index = InstallationIndex(os.path.join(self.temp_dir, 'index.json'))
+        make_fake_installations(self.install_root, VERSIONS, num_installations=2)
+        first = EnergyPlusPath(index, install_root=self.install_root)
+        second = EnergyPlusPath(InstallationIndex(index.index_path), install_root=self.install_root)
+        self.assertEqual(second.installation_paths, first.installation_paths)
+        self.assertEqual(sorted(tr.full_path_to_binary for tr in second.all_transitions),
+                         sorted(tr.full_path_to_binary for tr in first.all_transitions))
+        self.assertEqual(index.ep_version(first.get_ep_binary()), 'EnergyPlus, Version 8.9.0-0000000000')
@@ -0,0 +1,32 @@
+import os
+import pickle
+import sys
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'IDFVersionUpdater'))
+
+from EnergyPlusVersion import EnergyPlusVersion
+
+
+class TestEnergyPlusVersion(unittest.TestCase):
+    def test_parse(self):
+        self.assertEqual(EnergyPlusVersion.parse('8.5').as_tuple(), (8, 5, 0))
+        self.assertEqual(EnergyPlusVersion.parse('9-10-0').as_tuple(), (9, 10, 0))
+        self.assertEqual(EnergyPlusVersion.parse('/usr/local/EnergyPlus-22-1-0').as_tuple(), (22, 1, 0))
+        self.assertEqual(EnergyPlusVersion.parse('9.0.1').as_tuple(), (9, 0, 1))
+        with self.assertRaises(ValueError):
+            EnergyPlusVersion.parse('EnergyPlus')
+
+    def test_ordering(self):
+        versions = [EnergyPlusVersion.parse(x) for x in ['22.1', '9.10', '9.9', '10.0', '9.0.1', '9.0']]
+        self.assertEqual([str(x) for x in sorted(versions)], ['9.0', '9.0.1', '9.9', '9.10', '10.0', '22.1'])
+        self.assertEqual(max(versions), EnergyPlusVersion(22, 1, 0))
+
+    def test_hashable_and_immutable(self):
+        index = {EnergyPlusVersion(8, 5): 'a'}
+        self.assertEqual(index[EnergyPlusVersion.parse('8-5-0')], 'a')
+        self.assertNotEqual(EnergyPlusVersion(8, 5), 8.5)
+        self.assertEqual(EnergyPlusVersion(9, 0, 1).release(), EnergyPlusVersion(9, 0))
+        with self.assertRaises(AttributeError):
+            EnergyPlusVersion(8, 5).minor = 6
+        self.assertEqual(pickle.loads(pickle.dumps(EnergyPlusVersion(9, 0, 1))), EnergyPlusVersion(9, 0, 1))
@@ -0,0 +1,75 @@
+import io
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'IDFVersionUpdater'))
+
+from IdfObjects import IdfObject, iter_idf_objects
+
+MODEL_IDF = u"""! A model; with a semicolon in a comment\r
+\r
+Version,8.5;\r
+Building,\r
+  Office,        !- Name, with a comma\r
+  0,             !- North Axis {deg}\r
+  City;          !- Terrain\r
+Zone,A;Zone,B;  ! two on a line\r
+Lead Input;\r
+! trailing comment\r
+"""
+
+
+class TestIdfObjects(unittest.TestCase):
+    def split(self, text, block_size):
+        return list(iter_idf_objects(io.StringIO(u'%s' % text, newline=''), block_size))
+
+    def test_round_trip(self):
+        # concatenating the objects must give back the file, wherever the blocks happen to be cut
+        for block_size in [1, 7, 1024]:
+            idf_objects = self.split(MODEL_IDF, block_size)
+            self.assertEqual(''.join(idf_object.text for idf_object in idf_objects), MODEL_IDF)
+            self.assertEqual([idf_object.class_name for idf_object in idf_objects],
+                             ['Version', 'Building', 'Zone', 'Zone', 'Lead Input', None])
+            self.assertFalse(idf_objects[-1].terminated)
+
+    def test_fields(self):
+        building = self.split(MODEL_IDF, 1024)[1]
+        self.assertEqual(building.num_fields, 3)
+        self.assertEqual([building.field(number) for number in [1, 2, 3, 4]], ['Office', '0', 'City', None])
+
+    def test_unchanged_object_is_kept_exactly(self):
+        text = 'Zone ,  A ,,B;  ! odd layout\n'
+        idf_object = IdfObject(text)
+        self.assertEqual(idf_object.field(2), '')
+        self.assertEqual(idf_object.text, text)
+
+    def test_changed_object_is_laid_out_again(self):
+        building = self.split(MODEL_IDF, 1024)[1]
+        building.rename('Building:Detailed')
+        building.insert_field(2, '5', 'Floors')
+        building.delete_field(4)
+        building.set_field(1, 'Shop')
+        building.set_note(3, 'North Axis')
+        self.assertEqual(building.class_name, 'Building:Detailed')
+        self.assertEqual(building.text, (
+            'Building:Detailed,\r\n'
+            '    Shop,                    !- Name, with a comma\r\n'
+            '    5,                       !- Floors\r\n'
+            '    0;                       !- North Axis\r\n'))
+
+    def test_comment_lines_before_object_are_kept(self):
+        version = self.split('! header\nVersion,8.5;\n', 1024)[0]
+        version.set_field(1, '8.6')
+        self.assertEqual(version.text, '! header\nVersion,8.6;\n')
+
+    def test_byte_order_mark_is_kept(self):
+        version = self.split(u'\xef\xbb\xbfVersion,8.5;\n', 1024)[0]
+        self.assertEqual(version.class_name, 'Version')
+        version.set_field(1, '8.6')
+        self.assertEqual(version.text, u'\xef\xbb\xbfVersion,8.6;\n')
+
+    def test_object_followed_on_same_line(self):
+        first = self.split('Zone,A;Zone,B;\n', 1024)[0]
+        first.set_field(1, 'C')
+        self.assertEqual(first.text, 'Zone,C;')
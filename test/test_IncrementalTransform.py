@@ -0,0 +1,110 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'IDFVersionUpdater'))
+
+from EnergyPlusVersion import EnergyPlusVersion
+from IncrementalTransform import ObjectMemo, memo_key, transform_file_incremental
+from TransitionRules import DeleteObject, RuleSet, rule_from_dict, transform_file
+from TransitionRunThread import TransitionRunThread
+from fake_energyplus import make_energyplus_path
+
+MODEL_IDF = (b"! A model; with a semicolon in a comment\r\n"
+             b"Version,8.5;\r\n"
+             b"Zone,A;Zone,B;  ! two on a line\r\n"
+             b"Zone,\r\n"
+             b"  C,   !- Name\r\n"
+             b"  0;   !- Direction of Relative North\r\n"
+             b"Output:Reports,VariableDictionary;\r\n"
+             b"Lead Input;\r\n"
+             b"! trailing comment\r\n")
+
+
+class ContextRule(DeleteObject):
+    """
+    A rule standing in for one which needs to see other objects
+    """
+
+    object_local = False
+
+
+class TestIncrementalTransform(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.memo_directory = os.path.join(self.temp_dir, 'memo')
+        self.rule_sets = [
+            RuleSet(EnergyPlusVersion(8, 5), EnergyPlusVersion(8, 6), [
+                rule_from_dict({'rule': 'rename_field', 'class': 'Zone', 'field': 1, 'note': 'Zone Name'}),
+                rule_from_dict({'rule': 'delete_object', 'class': 'Output:Reports'}),
+            ]),
+            RuleSet(EnergyPlusVersion(8, 6), EnergyPlusVersion(8, 7), [
+                rule_from_dict({'rule': 'rename_object', 'class': 'Lead Input', 'new_class': 'Lead:Input'}),
+            ]),
+        ]
+        self.memo = ObjectMemo(self.memo_directory, memo_key('model.idf', self.rule_sets))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write(self, name, contents):
+        path = os.path.join(self.temp_dir, name)
+        with open(path, 'wb') as f:
+            f.write(contents)
+        return path
+
+    def read(self, path):
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def run_both(self, contents):
+        # returns the counts from the incremental run, after checking it gave the output of a full run
+        input_path = self.write('model.idf', contents)
+        expected_path = os.path.join(self.temp_dir, 'expected.idf')
+        transform_file(self.rule_sets, input_path, expected_path)
+        output_path = os.path.join(self.temp_dir, 'out.idf')
+        counts = transform_file_incremental(self.rule_sets, input_path, output_path, self.memo)
+        self.assertEqual(self.read(output_path), self.read(expected_path))
+        return counts
+
+    def test_only_changed_objects_are_transformed(self):
+        self.assertEqual(self.run_both(MODEL_IDF), (0, 7))
+        self.assertEqual(self.run_both(MODEL_IDF), (7, 0))
+        edited = MODEL_IDF.replace(b'Zone,B;', b'Zone,B2;').replace(b'Lead Input;', b'Zone,D;\r\nLead Input;')
+        self.assertEqual(self.run_both(edited), (6, 2))
+        self.assertEqual(self.run_both(edited.replace(b'Zone,A;', b'')), (7, 0))
+        self.assertEqual(self.run_both(b''), (0, 0))
+
+    def test_stale_memo_is_not_used(self):
+        self.run_both(MODEL_IDF)
+        with open(self.memo.output_path, 'ab') as f:
+            f.write(b'Zone,E;\r\n')
+        self.assertEqual(self.run_both(MODEL_IDF), (0, 7))
+        other_rules = [RuleSet(EnergyPlusVersion(8, 5), EnergyPlusVersion(8, 6))] + self.rule_sets[1:]
+        self.assertNotEqual(memo_key('model.idf', other_rules), memo_key('model.idf', self.rule_sets))
+        self.assertNotEqual(memo_key('other.idf', self.rule_sets), memo_key('model.idf', self.rule_sets))
+
+    def test_rules_needing_other_objects_are_refused(self):
+        self.rule_sets[0].rules.append(ContextRule('Output:Reports'))
+        input_path = self.write('model.idf', MODEL_IDF)
+        self.assertRaises(ValueError, transform_file_incremental, self.rule_sets, input_path,
+                          os.path.join(self.temp_dir, 'out.idf'), self.memo)
+
+    def test_run_thread_reuses_objects(self):
+        ep_path = make_energyplus_path(os.path.join(self.temp_dir, 'installations'), ['8.5', '8.6', '8.7'])
+        chain = ep_path.get_transition_chain(EnergyPlusVersion(8, 5))
+        for tr, rule_set in zip(chain, self.rule_sets):
+            tr.native_rules = rule_set
+        input_path = self.write('model.idf', MODEL_IDF)
+        for expected in ['0 / 7', '7 / 7']:
+            messages = []
+            thread = TransitionRunThread(chain, ep_path.transition_directory, input_path, False, messages.append,
+                                         messages.append, isolated=True, memo_directory=self.memo_directory)
+            thread.run()
+            self.assertFalse(thread.failed)
+            self.assertIn('Objects reused from the previous run ' + expected, messages)
+            with open(os.path.join(thread.run_dir, 'model.idf'), 'rb') as f:
+                self.assertIn(b'Lead:Input;', f.read())
+            thread.cleanup()
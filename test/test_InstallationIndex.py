@@ -0,0 +1,83 @@
+import os
+import shutil
+import stat
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'IDFVersionUpdater'))
+
+import InstallationIndex as installation_index_module
+from InstallationIndex import InstallationIndex
+
+# a stand-in for the EnergyPlus program which counts how many times it has been asked for its version
+STUB_ENERGYPLUS = """#!%s
+import sys
+open(%r, 'a').write('x')
+print('EnergyPlus, Version 8.7.0')
+"""
+
+
+class TestInstallationIndex(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.root = os.path.join(self.temp_dir, 'Applications')
+        self.transition_dir = os.path.join(self.root, 'EnergyPlus-8-7-0', 'PreProcess', 'IDFVersionUpdater')
+        os.makedirs(self.transition_dir)
+        open(os.path.join(self.transition_dir, 'Transition-V8-6-0-to-V8-7-0'), 'w').close()
+        self.index_path = os.path.join(self.temp_dir, 'settings', 'installations.json')
+        self.glob_calls = 0
+        self.real_glob = installation_index_module.glob.glob
+        installation_index_module.glob.glob = self.counting_glob
+
+    def tearDown(self):
+        installation_index_module.glob.glob = self.real_glob
+        shutil.rmtree(self.temp_dir)
+
+    def counting_glob(self, pattern):
+        self.glob_calls += 1
+        return self.real_glob(pattern)
+
+    def touch_later(self, path):
+        # make sure the change is visible even on file systems with coarse modification times
+        mtime = os.stat(path).st_mtime + 10
+        os.utime(path, (mtime, mtime))
+
+    def test_install_folders_reused_until_changed(self):
+        pattern = os.path.join(self.root, 'EnergyPlus*')
+        self.assertEqual(InstallationIndex(self.index_path).install_folders(pattern),
+                         [os.path.join(self.root, 'EnergyPlus-8-7-0')])
+        self.assertEqual(InstallationIndex(self.index_path).install_folders(pattern),
+                         [os.path.join(self.root, 'EnergyPlus-8-7-0')])
+        self.assertEqual(self.glob_calls, 1)
+        os.makedirs(os.path.join(self.root, 'EnergyPlus-9-0-0'))
+        self.touch_later(self.root)
+        self.assertEqual(len(InstallationIndex(self.index_path).install_folders(pattern)), 2)
+        self.assertEqual(self.glob_calls, 2)
+
+    def test_transition_binaries_reused_until_changed(self):
+        self.assertEqual(len(InstallationIndex(self.index_path).transition_binaries(self.transition_dir)), 1)
+        self.assertEqual(len(InstallationIndex(self.index_path).transition_binaries(self.transition_dir)), 1)
+        self.assertEqual(self.glob_calls, 1)
+        open(os.path.join(self.transition_dir, 'Transition-V8-5-0-to-V8-6-0'), 'w').close()
+        self.touch_later(self.transition_dir)
+        self.assertEqual(len(InstallationIndex(self.index_path).transition_binaries(self.transition_dir)), 2)
+
+    def test_ep_version_runs_once(self):
+        count_path = os.path.join(self.temp_dir, 'count')
+        binary = os.path.join(self.root, 'EnergyPlus-8-7-0', 'EnergyPlus')
+        with open(binary, 'w') as f:
+            f.write(STUB_ENERGYPLUS % (sys.executable, count_path))
+        os.chmod(binary, os.stat(binary).st_mode | stat.S_IEXEC)
+        self.assertIsNone(InstallationIndex(self.index_path).cached_ep_version(binary))
+        self.assertEqual(InstallationIndex(self.index_path).ep_version(binary), 'EnergyPlus, Version 8.7.0')
+        self.assertEqual(InstallationIndex(self.index_path).cached_ep_version(binary), 'EnergyPlus, Version 8.7.0')
+        self.assertEqual(InstallationIndex(self.index_path).ep_version(binary), 'EnergyPlus, Version 8.7.0')
+        with open(count_path) as f:
+            self.assertEqual(f.read(), 'x')
+        self.touch_later(binary)
+        self.assertIsNone(InstallationIndex(self.index_path).cached_ep_version(binary))
+
+    def test_unwritable_index_still_answers(self):
+        index = InstallationIndex(os.path.join(self.transition_dir, 'Transition-V8-6-0-to-V8-7-0', 'index.json'))
+        self.assertEqual(len(index.transition_binaries(self.transition_dir)), 1)
@@ -0,0 +1,128 @@
+import gzip
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'IDFVersionUpdater'))
+
+from IntermediateArchive import IntermediateArchive, COMPRESSION_DELTA, COMPRESSION_GZIP
+from IntermediateArchive import object_delta, apply_object_delta
+
+VERSIONS = [
+    ('8.5', b'Version,8.5;\nZone,A;\nZone,B;\n'),
+    ('8.6', b'Version,8.6;\nZone,A;\nZone,B;\nZone,C;\n'),
+    ('8.7', b'Version,8.7;\nZone,B;\nZone,C;\nBuilding,X'),
+]
+
+
+# About the size of a large real model: 40000 objects, and a great many identical lines among them, on which a
+# line-level diff takes minutes; the time taken is measured by benchmarks/bench_intermediate_archive.py
+ZONE_OBJECT = (b"Zone,\n  Zone %d,                  !- Name\n"
+               b"  0,                       !- Direction of Relative North\n"
+               b"  0, 0, 0;                 !- X,Y,Z Origin\n\n")
+LARGE_MODEL_OBJECTS = 40000
+
+
+class TestObjectDelta(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def round_trip(self, old_contents, new_contents):
+        old_path = os.path.join(self.temp_dir, 'old')
+        new_path = os.path.join(self.temp_dir, 'new')
+        for path, contents in [(old_path, old_contents), (new_path, new_contents)]:
+            with open(path, 'wb') as f:
+                f.write(contents)
+        delta_path = os.path.join(self.temp_dir, 'delta.gz')
+        with gzip.open(delta_path, 'wb') as f:
+            object_delta(old_path, new_path, f)
+        output_path = os.path.join(self.temp_dir, 'out')
+        with gzip.open(delta_path, 'rb') as delta_file:
+            with open(old_path, 'rb') as old_file:
+                with open(output_path, 'wb') as f:
+                    apply_object_delta(old_file, delta_file, f)
+        with open(output_path, 'rb') as f:
+            self.assertEqual(f.read(), new_contents)
+        with gzip.open(delta_path, 'rb') as f:
+            return f.read()
+
+    def test_round_trip(self):
+        delta = self.round_trip(b'Version,8.5;\nZone,A;\nZone,B;\nZone,C;\n! the end',
+                                b'Version,8.6;\nZone,A;\nZone,B;\nZone,D;\nZone,C;\n')
+        # the unchanged objects are reused in runs, and only the new ones are written out
+        self.assertEqual(delta, b'+13\nVersion,8.6;\n=13 16\n+8\nZone,D;\n=29 8\n')
+        self.assertEqual(self.round_trip(b'', b'Zone,A;'), b'+7\nZone,A;')
+        self.assertEqual(self.round_trip(b'Zone,A;', b''), b'')
+
+    def test_large_model(self):
+        old_contents = b'Version,8.5;\n\n' + b''.join(ZONE_OBJECT % i for i in range(LARGE_MODEL_OBJECTS))
+        new_contents = old_contents.replace(b'Version,8.5;', b'Version,8.6;').replace(b'Zone 7,', b'Zone 7A,')
+        delta = self.round_trip(old_contents, new_contents)
+        # only the two objects which changed are written out; everything else is reused from the earlier version
+        instructions = []
+        position = 0
+        while position < len(delta):
+            end = delta.index(b'\n', position) + 1
+            instruction = delta[position:end]
+            position = end
+            if instruction.startswith(b'+'):
+                length = int(instruction[1:])
+                instructions.append(delta[position:position + length])
+                position += length
+            else:
+                instructions.append(b'=')
+        self.assertEqual(len(instructions), 4)
+        self.assertEqual(instructions[0].strip(), b'Version,8.6;')
+        self.assertEqual(instructions[1], b'=')
+        self.assertEqual(instructions[2].strip(), (ZONE_OBJECT % 7).replace(b'Zone 7,', b'Zone 7A,').strip())
+        self.assertEqual(instructions[3], b'=')
+
+
+class TestIntermediateArchive(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        for version, contents in VERSIONS:
+            with open(os.path.join(self.temp_dir, 'in_%s.idf' % version), 'wb') as f:
+                f.write(contents)
+        self.archive = IntermediateArchive(self.temp_dir, 'in.idf')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def pack(self, compression):
+        return self.archive.pack([(version, 'in_%s.idf' % version) for version, _ in VERSIONS], compression)
+
+    def check_restores(self):
+        for version, contents in VERSIONS:
+            restored_path = self.archive.restore(version)
+            self.assertEqual(restored_path, os.path.join(self.temp_dir, 'in_%s.idf' % version))
+            with open(restored_path, 'rb') as f:
+                self.assertEqual(f.read(), contents)
+
+    def test_gzip(self):
+        self.assertFalse(self.archive.exists())
+        file_names = self.pack(COMPRESSION_GZIP)
+        self.assertEqual(sorted(os.listdir(self.temp_dir)), sorted(file_names))
+        self.assertIn('in_8.6.idf.gz', file_names)
+        self.assertEqual(self.archive.versions(), ['8.5', '8.6', '8.7'])
+        self.check_restores()
+
+    def test_delta(self):
+        file_names = self.pack(COMPRESSION_DELTA)
+        self.assertEqual(sorted(file_names),
+                         ['in.versions.json', 'in_8.5.idf.gz', 'in_8.6.idf.delta.gz', 'in_8.7.idf.delta.gz'])
+        self.check_restores()
+
+    def test_restore_errors(self):
+        self.pack(COMPRESSION_DELTA)
+        self.assertRaises(KeyError, self.archive.restore, '9.0')
+        self.assertEqual(self.archive.restore('8-7-0'), os.path.join(self.temp_dir, 'in_8.7.idf'))
+        with gzip.open(os.path.join(self.temp_dir, 'in_8.6.idf.delta.gz'), 'wb') as f:
+            f.write(b'=0 1\n')
+        self.assertRaises(ValueError, self.archive.restore, '8.6')
+        self.assertRaises(ValueError, self.archive.pack, [], 'rar')
@@ -0,0 +1,99 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'IDFVersionUpdater'))
+
+from IdfObjects import iter_idf_objects, open_idf
+from ObjectIndex import ObjectIndex, indexed_version, open_object_index, sidecar_path
+
+MODEL_IDF = (b"! A model; with a semicolon in a comment\r\n"
+             b"Version,8.5;\r\n"
+             b"Zone,A;zone,B;  ! two on a line; and a semicolon\r\n"
+             b"Output:Variable,*,Zone Mean Air Temperature,Hourly;\r\n"
+             b"Zone,\r\n"
+             b"  C,   !- Name; with a semicolon\r\n"
+             b"  0;   !- Direction of Relative North\r\n"
+             b"OUTPUT:VARIABLE,*,Site Outdoor Air Drybulb Temperature,Hourly;\r\n"
+             b"! trailing comment\r\n")
+
+
+class TestObjectIndex(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.idf_path = self.write(MODEL_IDF)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write(self, contents):
+        path = os.path.join(self.temp_dir, 'model.idf')
+        with open(path, 'wb') as f:
+            f.write(contents)
+        return path
+
+    def test_index_matches_tokenizer(self):
+        index = ObjectIndex.build(self.idf_path)
+        with open_idf(self.idf_path) as f:
+            idf_objects = [idf_object for idf_object in iter_idf_objects(f) if idf_object.terminated]
+        self.assertEqual(len(index), len(idf_objects))
+        offset = 0
+        for position, idf_object in enumerate(idf_objects):
+            self.assertEqual(index.span(position), (offset, len(idf_object.text)))
+            self.assertEqual(index.class_names[index.classes[position]].upper(), idf_object.class_name.upper())
+            offset += len(idf_object.text)
+
+    def test_queries(self):
+        index = ObjectIndex.build(self.idf_path)
+        self.assertEqual(index.version(), (8, 5, 0))
+        self.assertEqual(index.class_counts(), {'Version': 1, 'Zone': 3, 'Output:Variable': 2})
+        self.assertEqual(index.count('ZONE'), 3)
+        self.assertEqual(index.count('Building'), 0)
+        self.assertEqual(list(index.positions('zone')), [1, 2, 4])
+        self.assertEqual([idf_object.field(2) for idf_object in index.objects('output:variable')],
+                         ['Zone Mean Air Temperature', 'Site Outdoor Air Drybulb Temperature'])
+        self.assertEqual(index.first('Zone').field(1), 'A')
+        self.assertIsNone(index.first('Building'))
+
+    def test_files_without_objects(self):
+        self.assertIsNone(ObjectIndex.build(self.write(b'Zone,A;\n')).version())
+        index = ObjectIndex.build(self.write(b''))
+        self.assertEqual(len(index), 0)
+        self.assertIsNone(index.version())
+
+    def test_sidecar_round_trip(self):
+        self.assertIsNone(ObjectIndex.load(self.idf_path))
+        built = open_object_index(self.idf_path)
+        self.assertTrue(os.path.exists(sidecar_path(self.idf_path)))
+        loaded = ObjectIndex.load(self.idf_path)
+        self.assertEqual(list(loaded.offsets), list(built.offsets))
+        self.assertEqual(list(loaded.lengths), list(built.lengths))
+        self.assertEqual(loaded.class_counts(), built.class_counts())
+        self.assertEqual(loaded.version(), (8, 5, 0))
+        self.assertTrue(loaded.is_current())
+
+    def test_version_from_sidecar_header(self):
+        self.assertIsNone(indexed_version(self.idf_path))
+        open_object_index(self.idf_path)
+        self.assertEqual(indexed_version(self.idf_path), (8, 5, 0))
+        # only the header line is read, so the arrays after it are not needed
+        with open(sidecar_path(self.idf_path), 'r+b') as f:
+            f.truncate(len(f.readline()))
+        self.assertIsNone(ObjectIndex.load(self.idf_path))
+        self.assertEqual(indexed_version(self.idf_path), (8, 5, 0))
+        self.write(MODEL_IDF.replace(b'8.5', b'8.6') + b'Zone,D;\r\n')
+        self.assertIsNone(indexed_version(self.idf_path))
+
+    def test_stale_or_broken_sidecar_is_not_used(self):
+        open_object_index(self.idf_path)
+        self.write(MODEL_IDF.replace(b'8.5', b'8.6') + b'Zone,D;\r\n')
+        self.assertIsNone(ObjectIndex.load(self.idf_path))
+        self.assertEqual(open_object_index(self.idf_path).count('Zone'), 4)
+        with open(sidecar_path(self.idf_path), 'r+b') as f:
+            f.truncate(os.path.getsize(sidecar_path(self.idf_path)) - 1)
+        self.assertIsNone(ObjectIndex.load(self.idf_path))
+        index = open_object_index(self.idf_path, save=False)
+        self.assertEqual(index.version(), (8, 6, 0))
+        self.assertIsNone(ObjectIndex.load(self.idf_path))
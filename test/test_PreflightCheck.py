@@ -0,0 +1,105 @@
+import codecs
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'IDFVersionUpdater'))
+
+import PreflightCheck
+from EnergyPlusVersion import EnergyPlusVersion
+from PreflightCheck import preflight_check
+from fake_energyplus import make_energyplus_path
+
+GOOD_IDF = """! A model; with a semicolon in a comment
+Building,
+  Office,        !- Name, with a comma
+  0;             !- North Axis
+
+Zone,Core;
+
+Version,
+  8.5;           !- Version Identifier
+"""
+
+
+class TestPreflightCheck(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.ep_path = make_energyplus_path(os.path.join(self.temp_dir, 'installations'), ['8.5', '8.6', '8.7'])
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def check(self, contents, **kwargs):
+        path = os.path.join(self.temp_dir, 'model.idf')
+        with open(path, 'wb') as f:
+            f.write(contents.encode('latin-1') if not isinstance(contents, bytes) else contents)
+        result = preflight_check(path, self.ep_path, **kwargs)
+        # the outcome must not depend on where the blocks happen to be cut
+        for block_size in [1, 7]:
+            small_blocks = preflight_check(path, self.ep_path, block_size=block_size, **kwargs)
+            self.assertEqual(small_blocks.problems, result.problems)
+            self.assertEqual(small_blocks.version, result.version)
+        return result
+
+    def test_good_file(self):
+        result = self.check(GOOD_IDF)
+        self.assertTrue(result.ok)
+        self.assertEqual(result.version, EnergyPlusVersion(8, 5))
+        self.assertEqual([str(tr.target_version) for tr in result.chain], ['8.6', '8.7'])
+        self.assertGreater(result.required_bytes, result.size_bytes)
+
+    def test_utf8_file(self):
+        result = self.check(codecs.BOM_UTF8 + u'Version,8.5;\nZone,Caf\xe9;\n'.encode('utf-8'))
+        self.assertTrue(result.ok)
+        self.assertEqual(result.version, EnergyPlusVersion(8, 5))
+
+    def test_already_at_target(self):
+        result = self.check('Version,8.7;\n')
+        self.assertTrue(result.ok)
+        self.assertEqual(result.chain, [])
+        self.assertIsNone(result.required_bytes)
+
+    def test_missing_semicolon(self):
+        self.assertEqual(self.check('Version,8.5;\n\nZone,\n  Core  ! no end\n\n').problems,
+                         ["Line 3: the last object does not end with a semicolon"])
+
+    def test_empty_object(self):
+        self.assertEqual(self.check('Version,8.5;\nZone,Core;\n  ;\n').problems,
+                         ["Line 3: a semicolon ends an empty object"])
+
+    def test_version_object(self):
+        self.assertEqual(self.check('Zone,Core;\n').problems, ["Could not find a Version object"])
+        self.assertEqual(self.check('Version,8.5;\nZone,A;\nVERSION, 8.6;\n').problems,
+                         ["Found 2 Version objects, on lines 1, 3; there must be only one"])
+        self.assertEqual(self.check('Zone,A;\nVersion,eight;\n').problems,
+                         ["Line 2: the version 'eight' in the Version object is not a valid version number"])
+
+    def test_no_chain(self):
+        result = self.check('Version,7.2;\n')
+        self.assertEqual(result.version, EnergyPlusVersion(7, 2))
+        self.assertIsNone(result.chain)
+        self.assertEqual(result.problems, ["Cannot find a matching transition tool for this idf version"])
+        self.assertEqual(self.check('Version,9.0;\n').problems, ["Version 9.0 is newer than the target version 8.7"])
+        self.assertEqual(self.check('Version,8.5;\n', target_version=EnergyPlusVersion(8, 6)).chain[-1].target_version,
+                         EnergyPlusVersion(8, 6))
+
+    def test_encoding(self):
+        self.assertEqual(self.check(u'Version,8.5;\n'.encode('utf-16')).problems,
+                         ["The file is UTF-16 encoded; the transition programs can only read single-byte or UTF-8 "
+                          "text"])
+        self.assertEqual(self.check(b'Version,8.5;\n\x00\x01\x02').problems,
+                         ["The file contains NUL characters, so it is not a text input file"])
+
+    def test_free_space(self):
+        free_bytes = PreflightCheck.free_bytes
+        PreflightCheck.free_bytes = lambda directory: 100
+        try:
+            result = self.check(GOOD_IDF, run_directory=os.path.join(self.temp_dir, 'not', 'made', 'yet'),
+                                keep_old=True)
+        finally:
+            PreflightCheck.free_bytes = free_bytes
+        self.assertEqual(len(result.problems), 1)
+        self.assertTrue(result.problems[0].startswith("Not enough free disk space in %s" % self.temp_dir))
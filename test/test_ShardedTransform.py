@@ -0,0 +1,96 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'IDFVersionUpdater'))
+
+from EnergyPlusVersion import EnergyPlusVersion
+from IdfObjects import iter_idf_objects, next_object_boundary, open_idf
+from ShardedTransform import shard_boundaries, transform_file_sharded
+from TransitionRules import DeleteObject, RuleSet, transform_file, rule_from_dict
+
+MODEL_IDF = (b"! A model; with a semicolon in a comment\r\n"
+             b"Version,8.5;\r\n"
+             b"Zone,A;Zone,B;  ! two on a line; and a semicolon\r\n"
+             b"Zone,\r\n"
+             b"  C,   !- Name; with a semicolon\r\n"
+             b"  0;   !- Direction of Relative North\r\n"
+             b"\r\n"
+             b"Lead Input;")
+
+
+class ContextRule(DeleteObject):
+    """
+    A rule standing in for one which needs to see other objects
+    """
+
+    object_local = False
+
+
+class TestShardedTransform(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.rule_sets = [
+            RuleSet(EnergyPlusVersion(8, 5), EnergyPlusVersion(8, 6),
+                    [rule_from_dict({'rule': 'rename_field', 'class': 'Zone', 'field': 1, 'note': 'Zone Name'})]),
+            RuleSet(EnergyPlusVersion(8, 6), EnergyPlusVersion(8, 7),
+                    [rule_from_dict({'rule': 'rename_object', 'class': 'Lead Input', 'new_class': 'Lead:Input'})]),
+        ]
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write_model(self, copies):
+        path = os.path.join(self.temp_dir, 'model.idf')
+        with open(path, 'wb') as f:
+            f.write(MODEL_IDF.replace(b'Lead Input;', b'') * (copies - 1) + MODEL_IDF)
+        return path
+
+    def read(self, path):
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def test_boundaries_are_object_boundaries(self):
+        path = self.write_model(1)
+        with open_idf(path) as f:
+            ends = [0]
+            for idf_object in iter_idf_objects(f):
+                ends.append(ends[-1] + len(idf_object.text))
+        line_starts = set(i + 1 for i, byte in enumerate(bytearray(MODEL_IDF)) if byte == ord('\n'))
+        for offset in range(len(MODEL_IDF) + 1):
+            boundary = next_object_boundary(MODEL_IDF, offset)
+            self.assertGreaterEqual(boundary, offset)
+            self.assertIn(boundary, ends)
+            self.assertTrue(boundary in line_starts or boundary == len(MODEL_IDF))
+        self.assertEqual(next_object_boundary(MODEL_IDF, 0), MODEL_IDF.index(b'Zone,A'))
+
+    def test_shards_cover_file(self):
+        path = self.write_model(50)
+        shards = shard_boundaries(path, 7)
+        self.assertEqual(len(shards), 7)
+        self.assertEqual(shards[0][0], 0)
+        self.assertEqual(shards[-1][1], os.path.getsize(path))
+        for (start, end), (next_start, next_end) in zip(shards, shards[1:]):
+            self.assertEqual(end, next_start)
+        self.assertEqual(shard_boundaries(path, 1), [(0, os.path.getsize(path))])
+
+    def test_sharded_output_matches_single_pass(self):
+        path = self.write_model(50)
+        expected_path = os.path.join(self.temp_dir, 'expected.idf')
+        transform_file(self.rule_sets, path, expected_path)
+        output_path = os.path.join(self.temp_dir, 'sharded.idf')
+        self.assertEqual(transform_file_sharded(self.rule_sets, path, output_path, workers=3, min_shard_bytes=100), 3)
+        self.assertEqual(self.read(output_path), self.read(expected_path))
+        self.assertEqual(sorted(os.listdir(self.temp_dir)), ['expected.idf', 'model.idf', 'sharded.idf'])
+        self.assertIn(b'Version,8.7;', self.read(output_path))
+        self.assertIn(b'Lead:Input;', self.read(output_path))
+
+    def test_small_files_and_context_rules_are_not_sharded(self):
+        path = self.write_model(50)
+        output_path = os.path.join(self.temp_dir, 'out.idf')
+        self.assertEqual(transform_file_sharded(self.rule_sets, path, output_path, workers=3), 1)
+        self.rule_sets[0].rules.append(ContextRule('Output:Reports'))
+        self.assertEqual(transform_file_sharded(self.rule_sets, path, output_path, workers=3, min_shard_bytes=100), 1)
+        self.assertIn(b'Version,8.7;', self.read(output_path))
@@ -5,6 +5,7 @@ import unittest
 # add the source directory to the path so the unit test framework can find it
 sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'IDFVersionUpdater'))
 
+from EnergyPlusVersion import EnergyPlusVersion
 from TransitionBinary import TransitionBinary
 
 
@@ -14,16 +15,23 @@ class TestTransitionBinary(unittest.TestCase):
         valid_object = TransitionBinary(valid_path)
         self.assertEqual(valid_object.full_path_to_binary, valid_path)
         self.assertEqual(valid_object.binary_name, "Transition-V8-5-0-to-V8-6-0")
-        self.assertEqual(valid_object.source_version, 8.5)
-        self.assertEqual(valid_object.target_version, 8.6)
+        self.assertEqual(valid_object.source_version, EnergyPlusVersion(8, 5))
+        self.assertEqual(valid_object.target_version, EnergyPlusVersion(8, 6))
 
     def test_transition_object_just_file_name(self):
         just_file_name = "Transition-V8-5-0-to-V8-6-0"
         just_file_name_object = TransitionBinary(just_file_name)
         self.assertEqual(just_file_name_object.full_path_to_binary, just_file_name)
         self.assertEqual(just_file_name_object.binary_name, "Transition-V8-5-0-to-V8-6-0")
-        self.assertEqual(just_file_name_object.source_version, 8.5)
-        self.assertEqual(just_file_name_object.target_version, 8.6)
+        self.assertEqual(just_file_name_object.source_version, EnergyPlusVersion(8, 5))
+        self.assertEqual(just_file_name_object.target_version, EnergyPlusVersion(8, 6))
+
+    def test_two_digit_versions(self):
+        windows_object = TransitionBinary("C:/EnergyPlusV22-1-0/PreProcess/Transition-V9-6-0-to-V22-1-0.exe")
+        self.assertEqual(windows_object.source_version, EnergyPlusVersion(9, 6))
+        self.assertEqual(windows_object.target_version, EnergyPlusVersion(22, 1))
+        minor_object = TransitionBinary("Transition-V9-9-0-to-V9-10-0")
+        self.assertLess(minor_object.source_version, minor_object.target_version)
 
     def test_bad_transition_object(self):
         invalid_path = "/Applications/EnergyPlus-8-5-0/PreProcess/IDFVersionUpdater/BadBinaryName"
@@ -0,0 +1,177 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'IDFVersionUpdater'))
+
+from EnergyPlusVersion import EnergyPlusVersion
+from TransitionCache import TransitionCache
+from TransitionRunThread import TransitionRunThread
+from fake_energyplus import make_energyplus_path
+
+
+class TestTransitionCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.ep_path = make_energyplus_path(os.path.join(self.temp_dir, 'installations'), ['8.5', '8.6', '8.7'])
+        self.run_dir = self.ep_path.transition_directory
+        self.cache = TransitionCache(os.path.join(self.temp_dir, 'cache'))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write(self, name, contents):
+        path = os.path.join(self.temp_dir, name)
+        with open(path, 'w') as f:
+            f.write(contents)
+        return path
+
+    def make_result(self, name, contents):
+        run_dir = tempfile.mkdtemp(dir=self.temp_dir)
+        with open(os.path.join(run_dir, name), 'w') as f:
+            f.write(contents)
+        with open(os.path.join(run_dir, os.path.splitext(name)[0] + '.VCpErr'), 'w') as f:
+            f.write('errors for ' + contents)
+        with open(os.path.join(run_dir, os.path.splitext(name)[0] + '.idfold'), 'w') as f:
+            f.write('old')
+        return run_dir
+
+    def test_key_depends_on_input_and_chain(self):
+        a = self.write('a.idf', 'Version,8.5;')
+        b = self.write('b.idf', 'Version,8.5;')
+        c = self.write('c.idf', 'Version,8.5; ')
+        chain = self.ep_path.transitions_available
+        self.assertEqual(TransitionCache.key_for(a, chain), TransitionCache.key_for(b, chain))
+        self.assertNotEqual(TransitionCache.key_for(a, chain), TransitionCache.key_for(c, chain))
+        self.assertNotEqual(TransitionCache.key_for(a, chain), TransitionCache.key_for(a, chain[:1]))
+
+    def test_store_and_lookup_renames_artifacts(self):
+        self.cache.store('key', self.make_result('a.idf', 'new'), 'a.idf')
+        restore_dir = tempfile.mkdtemp(dir=self.temp_dir)
+        self.assertTrue(self.cache.lookup('key', restore_dir, 'other.idf'))
+        self.assertEqual(sorted(os.listdir(restore_dir)), ['other.VCpErr', 'other.idf'])
+        with open(os.path.join(restore_dir, 'other.idf')) as f:
+            self.assertEqual(f.read(), 'new')
+        self.assertFalse(self.cache.lookup('missing', restore_dir, 'other.idf'))
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_least_recently_used_entries_are_evicted(self):
+        self.cache.max_size_bytes = 2000
+        self.cache.store('first', self.make_result('a.idf', 'x' * 400), 'a.idf')
+        time.sleep(0.01)
+        self.cache.store('second', self.make_result('a.idf', 'y' * 400), 'a.idf')
+        time.sleep(0.01)
+        self.assertTrue(self.cache.lookup('first', self.run_dir, 'a.idf'))
+        self.cache.store('third', self.make_result('a.idf', 'z' * 400), 'a.idf')
+        self.assertTrue(self.cache.lookup('first', self.run_dir, 'a.idf'))
+        self.assertFalse(self.cache.lookup('second', self.run_dir, 'a.idf'))
+        self.assertEqual(self.cache.stats()['entries'], 2)
+        self.assertEqual(self.cache.prune(0), 2)
+        self.assertEqual(self.cache.stats()['size_bytes'], 0)
+
+    def test_entries_missing_from_index_are_pruned(self):
+        self.cache.store('first', self.make_result('a.idf', 'x' * 400), 'a.idf')
+        self.cache.store('second', self.make_result('a.idf', 'y' * 400), 'a.idf')
+        # as if another process had written the index back without this entry
+        with open(self.cache.index_path) as f:
+            index = json.load(f)
+        del index['entries']['first']
+        with open(self.cache.index_path, 'w') as f:
+            json.dump(index, f)
+        self.assertEqual(self.cache.prune(0), 2)
+        self.assertFalse(self.cache.contains('first'))
+
+    def test_processes_sharing_the_cache(self):
+        script = ("import sys, tempfile\n"
+                  "sys.path.insert(0, %r)\n"
+                  "from TransitionCache import TransitionCache\n"
+                  "cache = TransitionCache(sys.argv[1])\n"
+                  "run_dir = tempfile.mkdtemp(dir=sys.argv[2])\n"
+                  "with open(run_dir + '/a.idf', 'w') as f:\n"
+                  "    f.write('Version,8.7;')\n"
+                  "for i in range(10):\n"
+                  "    cache.store('%%s-%%d' %% (sys.argv[3], i), run_dir, 'a.idf')\n"
+                  "    cache.lookup('missing', run_dir, 'a.idf')\n") % os.path.join(
+            os.path.dirname(os.path.realpath(__file__)), '..', 'IDFVersionUpdater')
+        processes = [subprocess.Popen([sys.executable, '-c', script, self.cache.cache_directory, self.temp_dir, str(i)])
+                     for i in range(4)]
+        self.assertEqual([p.wait() for p in processes], [0] * 4)
+        stats = self.cache.stats()
+        self.assertEqual((stats['entries'], stats['misses']), (40, 40))
+
+    def test_run_thread_uses_cache(self):
+        input_path = self.write('model.idf', 'Version,8.5;\nZone,A;')
+        chain = self.ep_path.get_transition_chain(EnergyPlusVersion(8, 5))
+        for expect_hit in [False, True]:
+            messages = []
+            thread = TransitionRunThread(chain, self.run_dir, input_path, False, messages.append, messages.append,
+                                         isolated=True, cache=self.cache)
+            thread.run()
+            self.assertFalse(thread.failed)
+            self.assertEqual(thread.cache_hit, expect_hit)
+            self.assertEqual(len([m for m in messages if m.startswith('Running Transition')]), 0 if expect_hit else 2)
+            with open(os.path.join(thread.run_dir, 'model.idf')) as f:
+                self.assertEqual(f.read(), 'Version,8.7;\nZone,A;')
+            thread.cleanup()
+
+    def test_intermediate_keys(self):
+        chain = self.ep_path.transitions_available
+        keys = TransitionCache.intermediate_keys_for('digest', chain)
+        self.assertEqual(len(keys), 2)
+        self.assertEqual(keys[0], TransitionCache.intermediate_keys_for('digest', chain[:1])[0])
+        self.assertNotEqual(keys, TransitionCache.intermediate_keys_for('other', chain))
+
+    def test_run_resumes_from_deepest_cached_intermediate(self):
+        input_path = self.write('model.idf', 'Version,8.5;\nZone,A;')
+        chain = self.ep_path.get_transition_chain(EnergyPlusVersion(8, 5))
+        thread = TransitionRunThread(chain[:1], self.run_dir, input_path, False, lambda m: None, lambda m: None,
+                                     isolated=True, cache=self.cache)
+        thread.run()
+        thread.cleanup()
+        # a newer installation ships different programs for the same hops, but the intermediates are still usable
+        other_ep_path = make_energyplus_path(os.path.join(self.temp_dir, 'other'), ['8.5', '8.6', '8.7'])
+        other_run_dir = other_ep_path.transition_directory
+        other_chain = other_ep_path.get_transition_chain(EnergyPlusVersion(8, 5))
+        with open(other_chain[0].full_path_to_binary, 'a') as f:
+            f.write('# rebuilt\n')
+        messages = []
+        thread = TransitionRunThread(other_chain, other_run_dir, input_path, True, messages.append, messages.append,
+                                     isolated=True, cache=self.cache)
+        self.assertEqual(thread.prepare(), other_chain[1:])
+        self.assertEqual(messages, ['Resuming from cached version 8.6'])
+        with open(os.path.join(thread.run_dir, 'model_8.5.idf')) as f:
+            self.assertEqual(f.read(), 'Version,8.5;\nZone,A;')
+        for tr in other_chain[1:]:
+            self.assertTrue(thread.run_transition(tr))
+        thread.finish()
+        self.assertFalse(thread.failed)
+        with open(os.path.join(thread.run_dir, 'model.idf')) as f:
+            self.assertEqual(f.read(), 'Version,8.7;\nZone,A;')
+        with open(os.path.join(thread.run_dir, 'model_8.6.idf')) as f:
+            self.assertEqual(f.read(), 'Version,8.6;\nZone,A;')
+        thread.cleanup()
+
+    def test_in_memory_run_defers_intermediates(self):
+        if not hasattr(os, 'statvfs'):
+            self.skipTest('free space cannot be checked on this platform')
+        ram_dir = os.path.join(self.temp_dir, 'ram')
+        os.makedirs(ram_dir)
+        input_path = self.write('model.idf', 'Version,8.5;\nZone,A;')
+        chain = self.ep_path.get_transition_chain(EnergyPlusVersion(8, 5))
+        thread = TransitionRunThread(chain, self.run_dir, input_path, False, lambda m: None, lambda m: None,
+                                     isolated=True, cache=self.cache, ram_directory=ram_dir)
+        for tr in thread.prepare():
+            self.assertTrue(thread.run_transition(tr))
+        self.assertTrue(thread.in_memory)
+        self.assertEqual(os.path.dirname(thread.run_dir), ram_dir)
+        self.assertFalse(any(self.cache.contains(key) for key in thread.intermediate_cache_keys))
+        thread.finish()
+        self.assertTrue(all(self.cache.contains(key) for key in thread.intermediate_cache_keys))
+        self.assertEqual(sorted(os.listdir(thread.run_dir)),
+                         sorted(os.listdir(self.run_dir) + ['model.idf', 'model.idfold']))
+        thread.cleanup()
@@ -0,0 +1,47 @@
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'IDFVersionUpdater'))
+
+from EnergyPlusVersion import EnergyPlusVersion
+from TransitionBinary import TransitionBinary
+from TransitionGraph import TransitionGraph
+
+V84, V85, V86, V87 = [EnergyPlusVersion(8, minor) for minor in range(4, 8)]
+
+
+def binaries(installation, *names):
+    return [TransitionBinary(os.path.join('/EnergyPlus-%s' % installation, 'Transition-V%s' % name)) for name in names]
+
+
+class TestTransitionGraph(unittest.TestCase):
+    def setUp(self):
+        self.old = binaries('8-6-0', '8-4-0-to-V8-5-0', '8-5-0-to-V8-6-0')
+        self.new = binaries('8-7-0', '8-5-0-to-V8-6-0', '8-6-0-to-V8-7-0', '8-5-0-to-V8-7-0')
+
+    def names(self, chain):
+        return [tr.full_path_to_binary for tr in chain]
+
+    def test_merges_installations(self):
+        graph = TransitionGraph(self.old + self.new)
+        self.assertEqual(graph.versions(), [V84, V85, V86, V87])
+        # the newer installation's program replaces the older one for the same step
+        self.assertEqual(self.names(graph.plan(V84, V86)), [self.old[0].full_path_to_binary,
+                                                           self.new[0].full_path_to_binary])
+
+    def test_prefers_fewer_steps_when_unmeasured(self):
+        graph = TransitionGraph(self.old + self.new)
+        self.assertEqual(self.names(graph.plan(V85, V87)), [self.new[2].full_path_to_binary])
+
+    def test_prefers_measured_quicker_chain(self):
+        step_seconds = {self.new[0].full_path_to_binary: 1.0, self.new[1].full_path_to_binary: 1.0,
+                        self.new[2].full_path_to_binary: 5.0}
+        graph = TransitionGraph(self.old + self.new, step_seconds)
+        self.assertEqual(self.names(graph.plan(V85, V87)), self.names(self.new[:2]))
+
+    def test_unreachable_and_current(self):
+        graph = TransitionGraph(self.new)
+        self.assertIsNone(graph.plan(V84, V87))
+        self.assertIsNone(graph.plan(V87, V85))
+        self.assertEqual(graph.plan(V87, V87), [])
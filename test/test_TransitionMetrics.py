@@ -0,0 +1,95 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+try:
+    from urllib.request import urlopen
+    from urllib.error import HTTPError
+except ImportError:  # Python 2
+    from urllib2 import urlopen, HTTPError
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'IDFVersionUpdater'))
+
+from BatchTransition import BatchTransition
+from TransitionMetrics import Histogram, MetricsHTTPServer, TransitionMetrics, format_labels
+from fake_energyplus import make_energyplus_path
+
+
+class TestHistogram(unittest.TestCase):
+    def test_cumulative_buckets(self):
+        histogram = Histogram([1, 2.5])
+        for value in [0.5, 1, 2, 7]:
+            histogram.observe(value)
+        self.assertEqual(histogram.samples('duration', [('source', '8.5')]), [
+            'duration_bucket{source="8.5",le="1"} 2',
+            'duration_bucket{source="8.5",le="2.5"} 3',
+            'duration_bucket{source="8.5",le="+Inf"} 4',
+            'duration_sum{source="8.5"} 10.5',
+            'duration_count{source="8.5"} 4',
+        ])
+
+    def test_label_escaping(self):
+        self.assertEqual(format_labels([('name', 'a "b"\\c\n')]), '{name="a \\"b\\"\\\\c\\n"}')
+        self.assertEqual(format_labels([]), '')
+
+
+class TestTransitionMetrics(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.input_dir = os.path.join(self.temp_dir, 'models')
+        os.makedirs(self.input_dir)
+        self.ep_path = make_energyplus_path(os.path.join(self.temp_dir, 'installations'), ['8.5', '8.6', '8.7'])
+        self.metrics = TransitionMetrics()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def run_batch(self):
+        for file_name, contents in [('a.idf', 'Version,8.5;'), ('b.idf', 'Version,8.6;'),
+                                    ('broken.idf', 'Version,8.5;\nZone,FAIL;')]:
+            with open(os.path.join(self.input_dir, file_name), 'w') as f:
+                f.write(contents)
+        batch = BatchTransition(self.input_dir, os.path.join(self.temp_dir, 'out'), self.ep_path, workers=2,
+                                metrics=self.metrics)
+        batch.run()
+
+    def test_batch_is_counted(self):
+        self.run_batch()
+        lines = self.metrics.render().splitlines()
+        for expected in [
+                'idfversionupdater_transitions_started_total{source="8.5",target="8.6"} 2',
+                'idfversionupdater_transitions_started_total{source="8.6",target="8.7"} 2',
+                'idfversionupdater_transitions_finished_total{source="8.5",target="8.6",outcome="failed"} 1',
+                'idfversionupdater_transitions_finished_total{source="8.5",target="8.6",outcome="succeeded"} 1',
+                'idfversionupdater_transitions_finished_total{source="8.6",target="8.7",outcome="succeeded"} 2',
+                'idfversionupdater_transition_duration_seconds_count{source="8.6",target="8.7"} 2',
+                'idfversionupdater_transition_input_bytes_bucket{source="8.5",target="8.6",le="10240"} 2',
+                'idfversionupdater_runs_total{outcome="succeeded"} 2',
+                'idfversionupdater_runs_total{outcome="failed"} 1',
+                'idfversionupdater_runs_total{outcome="cancelled"} 0',
+                'idfversionupdater_runs_in_flight 0']:
+            self.assertIn(expected, lines)
+        self.assertIn('# TYPE idfversionupdater_transition_duration_seconds histogram', lines)
+
+    def test_write_textfile(self):
+        self.run_batch()
+        path = os.path.join(self.temp_dir, 'idfversionupdater.prom')
+        self.metrics.write_textfile(path)
+        self.metrics.write_textfile(path)
+        with open(path) as f:
+            self.assertEqual(f.read(), self.metrics.render())
+        self.assertFalse([name for name in os.listdir(self.temp_dir) if name.endswith('.tmp')])
+
+    def test_http_server(self):
+        server = MetricsHTTPServer(('127.0.0.1', 0), self.metrics)
+        server.start()
+        try:
+            url = 'http://127.0.0.1:%d' % server.server_address[1]
+            response = urlopen(url + '/metrics')
+            self.assertTrue(response.info().get('Content-Type').startswith('text/plain'))
+            self.assertEqual(response.read().decode('utf-8'), self.metrics.render())
+            self.assertRaises(HTTPError, urlopen, url + '/other')
+        finally:
+            server.stop()
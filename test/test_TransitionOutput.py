@@ -0,0 +1,43 @@
+import os
+import subprocess
+import sys
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'IDFVersionUpdater'))
+
+from TransitionOutput import OutputMonitor, parse_progress
+
+# a stand-in for a chatty transition program, which reports its progress through a few thousand objects
+CHATTY_PROGRAM = """
+import sys, time
+for i in range(1, 2001):
+    sys.stdout.write('Object %d of 2000\\n' % i)
+sys.stdout.flush()
+time.sleep(0.3)
+sys.stderr.write('warning: done\\n')
+"""
+
+
+class TestParseProgress(unittest.TestCase):
+    def test_progress_lines(self):
+        self.assertEqual(parse_progress('Processed 50%'), 0.5)
+        self.assertEqual(parse_progress('Object 25 of 100'), 0.25)
+        self.assertIsNone(parse_progress('Processing IDD -- V8-5-0-Energy+.idd'))
+        self.assertIsNone(parse_progress('Object 200 of 100'))
+
+
+class TestOutputMonitor(unittest.TestCase):
+    def test_follow(self):
+        messages = []
+        process = subprocess.Popen([sys.executable, '-c', CHATTY_PROGRAM], stdout=subprocess.PIPE,
+                                   stderr=subprocess.PIPE)
+        monitor = OutputMonitor(messages.append, 'Running', max_lines=10, interval=0.1)
+        self.assertEqual(monitor.follow(process), 0)
+        self.assertEqual(len(monitor.lines['stdout']), 10)
+        self.assertTrue(monitor.output('stdout').endswith(b'Object 2000 of 2000\n'))
+        self.assertEqual(monitor.output('stderr').strip(), b'warning: done')
+        self.assertEqual(monitor.fraction_complete, 1.0)
+        # thousands of lines, but only a handful of messages
+        self.assertLess(len(messages), 20)
+        self.assertEqual(messages[-1], 'Running: warning: done')
+        self.assertIn('Running (100%)', messages)
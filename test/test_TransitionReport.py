@@ -0,0 +1,101 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'IDFVersionUpdater'))
+
+from EnergyPlusVersion import EnergyPlusVersion
+from TransitionBinary import TransitionBinary
+from TransitionReport import RunReport, StepReport, file_size, OUTCOME_FAILED, OUTCOME_SUCCEEDED
+from TransitionRunThread import TransitionRunThread
+from fake_energyplus import make_energyplus_path
+
+
+class TestReports(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_file_size(self):
+        path = os.path.join(self.temp_dir, 'in.idf')
+        with open(path, 'w') as f:
+            f.write('Version,8.5;')
+        self.assertEqual(file_size(path), 12)
+        self.assertIsNone(file_size(os.path.join(self.temp_dir, 'missing.idf')))
+
+    def test_slowest_step(self):
+        report = RunReport(os.path.join(self.temp_dir, 'missing.idf'))
+        self.assertIsNone(report.input_bytes)
+        self.assertIsNone(report.slowest_step())
+        for name, seconds in [('Transition-V8-5-0-to-V8-6-0', 1.0), ('Transition-V8-6-0-to-V8-7-0', 4.25),
+                              ('Transition-V8-7-0-to-V8-8-0', 2.0)]:
+            step = StepReport(TransitionBinary(os.path.join(self.temp_dir, name)), 100)
+            step.wall_seconds = seconds
+            report.steps.append(step)
+        self.assertEqual(report.slowest_step().describe(), '8.6 -> 8.7 (4.2 s)')
+
+    def test_save(self):
+        report = RunReport(os.path.join(self.temp_dir, 'missing.idf'))
+        report.steps.append(StepReport(TransitionBinary(os.path.join(self.temp_dir, 'Transition-V8-5-0-to-V8-6-0')),
+                                       100))
+        report.finish(OUTCOME_FAILED)
+        path = os.path.join(self.temp_dir, 'report.json')
+        report.save(path)
+        with open(path) as f:
+            saved = json.load(f)
+        self.assertEqual(saved['outcome'], OUTCOME_FAILED)
+        self.assertEqual([(s['source_version'], s['target_version'], s['input_bytes']) for s in saved['steps']],
+                         [('8.5', '8.6', 100)])
+
+
+class TestRunThreadReport(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.ep_path = make_energyplus_path(os.path.join(self.temp_dir, 'installations'), ['8.5', '8.6', '8.7', '8.8'])
+        self.run_dir = self.ep_path.transition_directory
+        self.steps = []
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def run_file(self, contents):
+        path = os.path.join(self.temp_dir, 'model.idf')
+        with open(path, 'w') as f:
+            f.write(contents)
+        chain = self.ep_path.get_transition_chain(EnergyPlusVersion(8, 5))
+        thread = TransitionRunThread(chain, self.run_dir, path, True, lambda m: None, lambda m: None, isolated=True,
+                                     step_callback=self.steps.append)
+        thread.run()
+        thread.cleanup()
+        return thread.report
+
+    def test_steps_are_measured(self):
+        report = self.run_file('Version,8.5;\nZone,A;')
+        self.assertEqual(report.outcome, OUTCOME_SUCCEEDED)
+        self.assertEqual(report.input_bytes, 20)
+        self.assertEqual([step.describe().split(' (')[0] for step in report.steps],
+                         ['8.5 -> 8.6', '8.6 -> 8.7', '8.7 -> 8.8'])
+        self.assertEqual(self.steps, report.steps)
+        for step in report.steps:
+            self.assertEqual(step.outcome, OUTCOME_SUCCEEDED)
+            self.assertEqual(step.return_code, 0)
+            self.assertEqual((step.input_bytes, step.output_bytes), (20, 20))
+            self.assertGreater(step.wall_seconds, 0.0)
+            self.assertIsNotNone(step.backup_seconds)
+            if hasattr(os, 'wait4'):
+                self.assertGreater(step.max_rss_bytes, 0)
+                self.assertGreaterEqual(step.user_cpu_seconds, 0.0)
+        self.assertGreaterEqual(report.elapsed, sum(step.wall_seconds for step in report.steps))
+
+    def test_failed_step(self):
+        report = self.run_file('Version,8.5;\nFAIL')
+        self.assertEqual(report.outcome, OUTCOME_FAILED)
+        self.assertEqual(len(report.steps), 1)
+        self.assertEqual(report.steps[0].outcome, OUTCOME_FAILED)
+        self.assertEqual(report.steps[0].return_code, 1)
+        self.assertEqual(self.steps, report.steps)
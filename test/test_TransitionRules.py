@@ -0,0 +1,158 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'IDFVersionUpdater'))
+
+from EnergyPlusVersion import EnergyPlusVersion
+from TransitionCache import binary_identity
+from TransitionRules import RuleRegistry, RuleSet, transform_file
+from TransitionRunThread import TransitionRunThread
+from fake_energyplus import make_energyplus_path
+
+RULES_8_5_TO_8_6 = {
+    'source': '8.5',
+    'target': '8.6',
+    'rules': [
+        {'rule': 'rename_object', 'class': 'Lead Input', 'new_class': 'Lead:Input'},
+        {'rule': 'delete_object', 'class': 'Output:Reports'},
+        {'rule': 'insert_field', 'class': 'Zone', 'field': 3, 'value': 'autocalculate', 'note': 'Ceiling Height'},
+        {'rule': 'delete_field', 'class': 'Zone', 'field': 2},
+        {'rule': 'rename_field', 'class': 'Zone', 'field': 1, 'note': 'Zone Name'},
+        {'rule': 'replace_value', 'class': 'Building', 'field': 2, 'values': {'city': 'Urban'}},
+    ],
+}
+
+RULES_8_6_TO_8_7 = {
+    'source': '8.6',
+    'target': '8.7',
+    'rules': [{'rule': 'rename_field', 'class': 'Zone', 'field': 2, 'note': 'Height'}],
+}
+
+MODEL_IDF = """Version,8.5;
+
+Zone,
+  Core,          !- Name
+  0;             !- Direction of Relative North
+
+Building,Office,CITY;
+lead input;
+Output:Reports,VariableDictionary;
+"""
+
+TRANSITIONED_IDF = """Version,8.6;
+
+Zone,
+    Core,                    !- Zone Name
+    autocalculate;           !- Ceiling Height
+
+Building,Office,Urban;
+Lead:Input;
+"""
+
+
+class TestTransitionRules(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.ep_path = make_energyplus_path(os.path.join(self.temp_dir, 'installations'), ['8.5', '8.6', '8.7', '8.8'])
+        self.rule_set = RuleSet.from_dict(RULES_8_5_TO_8_6)
+        self.next_rule_set = RuleSet.from_dict(RULES_8_6_TO_8_7)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write(self, name, contents):
+        path = os.path.join(self.temp_dir, name)
+        with open(path, 'w') as f:
+            f.write(contents)
+        return path
+
+    def test_transform_file(self):
+        output_path = os.path.join(self.temp_dir, 'out.idf')
+        self.rule_set.transform_file(self.write('in.idf', MODEL_IDF), output_path)
+        with open(output_path) as f:
+            self.assertEqual(f.read(), TRANSITIONED_IDF)
+
+    def test_transform_file_in_one_pass(self):
+        input_path = self.write('in.idf', MODEL_IDF)
+        one_by_one = os.path.join(self.temp_dir, 'one_by_one.idf')
+        self.rule_set.transform_file(input_path, os.path.join(self.temp_dir, 'between.idf'))
+        self.next_rule_set.transform_file(os.path.join(self.temp_dir, 'between.idf'), one_by_one)
+        fused = os.path.join(self.temp_dir, 'fused.idf')
+        transform_file([self.rule_set, self.next_rule_set], input_path, fused)
+        with open(one_by_one) as f:
+            expected = f.read()
+        with open(fused) as f:
+            self.assertEqual(f.read(), expected)
+        self.assertIn('Version,8.7;', expected)
+        self.assertIn('!- Height', expected)
+        self.assertRaises(ValueError, transform_file, [self.next_rule_set, self.rule_set], input_path, fused)
+
+    def test_json_round_trip(self):
+        self.assertEqual(RuleSet.from_dict(self.rule_set.to_dict()).digest, self.rule_set.digest)
+        other = dict(RULES_8_5_TO_8_6, rules=RULES_8_5_TO_8_6['rules'][:1])
+        self.assertNotEqual(RuleSet.from_dict(other).digest, self.rule_set.digest)
+
+    def test_invalid_rules(self):
+        self.assertRaises(ValueError, RuleSet.from_dict, {'source': '8.5', 'target': '8.6',
+                                                          'rules': [{'rule': 'explode', 'class': 'Zone'}]})
+        self.assertRaises(ValueError, RuleSet.from_dict, {'source': '8.5', 'target': '8.6',
+                                                          'rules': [{'rule': 'delete_field', 'class': 'Zone'}]})
+        self.assertRaises(ValueError, RuleSet.from_dict, {'target': '8.6'})
+        self.assertRaises(ValueError, RuleSet.load, self.write('broken.json', '{"source": '))
+
+    def test_registry_attaches_to_matching_transitions(self):
+        rules_dir = os.path.join(self.temp_dir, 'rules')
+        os.makedirs(rules_dir)
+        with open(os.path.join(rules_dir, '8.5-to-8.6.json'), 'w') as f:
+            json.dump(RULES_8_5_TO_8_6, f)
+        registry = RuleRegistry()
+        self.assertEqual(registry.load_directory(rules_dir), 1)
+        chain = self.ep_path.get_transition_chain(EnergyPlusVersion(8, 5))
+        binary_key = binary_identity(chain[0])
+        self.assertEqual(registry.attach(chain), 1)
+        self.assertEqual(chain[0].native_rules.digest, self.rule_set.digest)
+        self.assertIsNone(chain[1].native_rules)
+        self.assertNotEqual(binary_identity(chain[0]), binary_key)
+
+    def test_run_mixes_native_and_program_transitions(self):
+        input_path = self.write('model.idf', MODEL_IDF)
+        chain = self.ep_path.get_transition_chain(EnergyPlusVersion(8, 5))
+        chain[0].native_rules = self.rule_set
+        messages = []
+        thread = TransitionRunThread(chain, self.ep_path.transition_directory, input_path, True, messages.append,
+                                     messages.append, isolated=True)
+        thread.run()
+        self.assertFalse(thread.failed)
+        self.assertIn('Running Transition 8.5 -> 8.6', messages)
+        self.assertEqual([step.engine for step in thread.report.steps], ['native', 'binary', 'binary'])
+        with open(os.path.join(thread.run_dir, 'model.idf')) as f:
+            self.assertEqual(f.read(), TRANSITIONED_IDF.replace('Version,8.6;', 'Version,8.8;'))
+        with open(os.path.join(thread.run_dir, 'model_8.6.idf')) as f:
+            self.assertEqual(f.read(), TRANSITIONED_IDF)
+        self.assertFalse([name for name in os.listdir(thread.run_dir) if name.endswith('.idfnew')])
+        thread.cleanup()
+
+    def test_consecutive_native_transitions_are_fused(self):
+        input_path = self.write('model.idf', MODEL_IDF)
+        chain = self.ep_path.get_transition_chain(EnergyPlusVersion(8, 5))
+        chain[0].native_rules = self.rule_set
+        chain[1].native_rules = self.next_rule_set
+        messages = []
+        thread = TransitionRunThread(chain, self.ep_path.transition_directory, input_path, False, messages.append,
+                                     messages.append, isolated=True)
+        self.assertEqual(thread.plan_steps(chain), [chain[:2], chain[2:]])
+        thread.run()
+        self.assertFalse(thread.failed)
+        self.assertIn('Running Transition 8.5 -> 8.7', messages)
+        self.assertEqual([step.engine for step in thread.report.steps], ['native', 'native', 'binary'])
+        self.assertEqual([tr for tr, seconds in thread.step_times], chain[2:])
+        with open(os.path.join(thread.run_dir, 'model.idf')) as f:
+            self.assertIn('Version,8.8;', f.read())
+        thread.cleanup()
+        # every version must be written out to keep a backup of it
+        thread.keep_old = True
+        self.assertEqual(thread.plan_steps(chain), [[tr] for tr in chain])
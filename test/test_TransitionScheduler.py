@@ -0,0 +1,127 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from multiprocessing import cpu_count
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'IDFVersionUpdater'))
+
+from EnergyPlusVersion import EnergyPlusVersion
+from TransitionRunThread import TransitionRunThread
+from TransitionScheduler import TransitionScheduler, queue
+from fake_energyplus import make_energyplus_path
+
+
+class TestTransitionScheduler(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.ep_path = make_energyplus_path(os.path.join(self.temp_dir, 'installations'), ['8.5', '8.6', '8.7', '8.8'])
+        self.run_dir = self.ep_path.transition_directory
+        self.messages = []
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def make_run(self, file_name, source_version, contents=''):
+        path = os.path.join(self.temp_dir, file_name)
+        with open(path, 'w') as f:
+            f.write('Version,%s;\n%s' % (source_version, contents))
+        chain = self.ep_path.get_transition_chain(EnergyPlusVersion.parse(source_version))
+        return TransitionRunThread(chain, self.run_dir, path, False, self.messages.append, self.messages.append,
+                                   isolated=True)
+
+    def run_jobs(self, queue_factory):
+        scheduler = TransitionScheduler(workers=2, queue_factory=queue_factory)
+        finished = []
+        runs = [self.make_run('a.idf', '8.5'), self.make_run('b.idf', '8.7'), self.make_run('c.idf', '8.6')]
+        for run in runs:
+            scheduler.submit(run, finished.append)
+        scheduler.run()
+        self.assertEqual(len(finished), 3)
+        for run in runs:
+            self.assertFalse(run.failed)
+            with open(os.path.join(run.run_dir, os.path.basename(run.input_file))) as f:
+                self.assertEqual(f.read(), 'Version,8.8;\n')
+            run.cleanup()
+        self.assertEqual(sorted(job.next_step for job in finished), [1, 2, 3])
+
+    def test_fifo_queue(self):
+        self.run_jobs(queue.Queue)
+
+    def test_priority_queue(self):
+        self.run_jobs(queue.PriorityQueue)
+
+    def test_lifo_queue(self):
+        self.run_jobs(queue.LifoQueue)
+
+    def test_failures_are_independent(self):
+        scheduler = TransitionScheduler(workers=2)
+        good = self.make_run('good.idf', '8.5')
+        bad = self.make_run('bad.idf', '8.5', 'Zone,FAIL;')
+        missing = self.make_run('missing.idf', '8.5')
+        os.remove(missing.input_file)
+        jobs = [scheduler.submit(good), scheduler.submit(bad), scheduler.submit(missing)]
+        scheduler.run()
+        self.assertFalse(good.failed)
+        self.assertTrue(bad.failed)
+        self.assertEqual(jobs[1].next_step, 1)
+        self.assertTrue(missing.failed)
+        self.assertIsNotNone(jobs[2].error)
+        for run in [good, bad, missing]:
+            run.cleanup()
+
+    def test_feed_drawn_while_running(self):
+        scheduler = TransitionScheduler(workers=1)
+        finished = []
+        planned_after = []
+        scheduler.submit(self.make_run('a.idf', '8.5'), finished.append)
+
+        def plan(file_name):
+            # planning is done outside the lock, so other workers can draw from the feed meanwhile
+            self.assertTrue(scheduler._feed_lock.acquire(False))
+            scheduler._feed_lock.release()
+            planned_after.append(len(finished))
+            return None if file_name is None else (self.make_run(file_name, '8.6'), finished.append)
+
+        scheduler.run(lambda file_name=file_name: plan(file_name) for file_name in ['b.idf', None, 'c.idf'])
+        self.assertEqual(len(finished), 3)
+        self.assertEqual(planned_after, [1, 2, 2])
+        for job in finished:
+            self.assertFalse(job.run_thread.failed)
+            job.run_thread.cleanup()
+
+    def test_feed_error_raised_after_running(self):
+        scheduler = TransitionScheduler(workers=1)
+        finished = []
+
+        def plan_failure():
+            raise RuntimeError("cannot plan this file")
+
+        def feed():
+            yield lambda: (self.make_run('a.idf', '8.7'), finished.append)
+            yield plan_failure
+            yield lambda: (self.make_run('b.idf', '8.7'), finished.append)
+            raise RuntimeError("no more files")
+
+        with self.assertRaises(RuntimeError) as context:
+            scheduler.run(feed())
+        self.assertEqual(str(context.exception), "cannot plan this file")
+        self.assertEqual(len(finished), 2)
+        for job in finished:
+            job.run_thread.cleanup()
+
+    def test_workers_bounded_by_cpu_count(self):
+        self.assertEqual(TransitionScheduler(workers=100000).workers, cpu_count())
+        self.assertGreaterEqual(TransitionScheduler(workers=0).workers, 1)
+
+    def test_stop_between_steps(self):
+        run = self.make_run('a.idf', '8.5')
+        steps = run.prepare()
+        run.stop()  # nothing is running yet
+        self.assertIsNone(run.p)
+        self.assertFalse(run.run_transition(steps[0]))
+        self.assertIsNone(run.p)
+        run.finish()
+        self.assertEqual(self.messages[-1], 'Transition Cancelled')
+        run.cleanup()
@@ -0,0 +1,117 @@
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+try:
+    from urllib.request import Request, urlopen
+    from urllib.error import HTTPError
+except ImportError:  # Python 2
+    from urllib2 import Request, urlopen, HTTPError
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'IDFVersionUpdater'))
+
+from TransitionMetrics import TransitionMetrics
+from TransitionServer import QueueFullError, TransitionHTTPServer, TransitionService, JOB_FAILED, JOB_SUCCEEDED
+from fake_energyplus import make_energyplus_path
+
+
+class TestTransitionServer(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.ep_path = make_energyplus_path(os.path.join(self.temp_dir, 'installations'), ['8.5', '8.6', '8.7'])
+        self.service = TransitionService(self.ep_path, os.path.join(self.temp_dir, 'jobs'), workers=1,
+                                         transition_metrics=TransitionMetrics())
+        self.server = TransitionHTTPServer(('127.0.0.1', 0), self.service, max_upload_bytes=1024, log_requests=False)
+        self.url = 'http://127.0.0.1:%d' % self.server.server_address[1]
+        self.server_thread = threading.Thread(target=self.server.serve_forever)
+        self.server_thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.server_thread.join()
+        self.service.close()
+        shutil.rmtree(self.temp_dir)
+
+    def request(self, path, data=None, method=None, headers=None):
+        request = Request(self.url + path, data=data, headers=headers or {})
+        if method is not None:
+            request.get_method = lambda: method
+        try:
+            response = urlopen(request)
+        except HTTPError as e:
+            return e.code, json.loads(e.read().decode('utf-8'))
+        body = response.read()
+        if response.info().get('Content-Type') == 'application/json':
+            body = json.loads(body.decode('utf-8'))
+        return response.getcode(), body
+
+    def wait_for(self, job_id):
+        for _ in range(200):
+            status, job = self.request('/jobs/' + job_id)
+            if job['state'] in (JOB_SUCCEEDED, JOB_FAILED):
+                return job
+            time.sleep(0.05)
+        self.fail("Job did not finish")
+
+    def test_transition_upload(self):
+        status, job = self.request('/jobs?name=model.idf', b'Version,8.5;\nZone,AUDIT;')
+        self.assertEqual(status, 202)
+        job = self.wait_for(job['id'])
+        self.assertEqual(job['state'], JOB_SUCCEEDED)
+        self.assertEqual(job['source_version'], '8.5')
+        self.assertEqual(job['target_version'], '8.7')
+        self.assertEqual(job['files'], ['model.audit', 'model.idf'])
+        status, body = self.request('/jobs/%s/files/model.idf' % job['id'])
+        self.assertEqual(body, b'Version,8.7;\nZone,AUDIT;')
+        self.assertEqual(self.request('/jobs/%s/files/..%%2Fmodel.idf' % job['id'])[0], 404)
+        status, metrics = self.request('/metrics')
+        self.assertEqual((metrics['succeeded'], metrics['failed'], metrics['queued']), (1, 0, 0))
+        status, text = self.request('/metrics/prometheus')
+        text = text.decode('utf-8')
+        self.assertIn('idfversionupdater_transitions_finished_total{source="8.6",target="8.7",outcome="succeeded"} 1',
+                      text)
+        self.assertIn('idfversionupdater_runs_in_flight 0', text)
+        self.assertIn('idfversionupdater_jobs_queued 0', text)
+        self.assertEqual(self.request('/jobs/' + job['id'], method='DELETE')[0], 200)
+        self.assertEqual(self.request('/jobs')[1], [])
+
+    def test_failed_transition(self):
+        status, job = self.request('/jobs?name=model.idf', b'Version,8.5;\nZone,FAIL;')
+        job = self.wait_for(job['id'])
+        self.assertEqual(job['state'], JOB_FAILED)
+        self.assertEqual(self.request('/metrics')[1]['failed'], 1)
+
+    def test_rejected_uploads(self):
+        self.assertEqual(self.request('/jobs?name=notes.txt', b'Version,8.5;')[0], 400)
+        self.assertEqual(self.request('/jobs', b'Version,8.5;')[0], 400)
+        self.assertEqual(self.request('/jobs?name=big.idf', b' ' * 2048)[0], 413)
+        for length in ['-5', '0', '1.5', 'ten']:
+            status, body = self.request('/jobs?name=model.idf', b'Version,8.5;', headers={'Content-Length': length})
+            self.assertEqual(status, 400)
+            self.assertIn('Content-Length', body['error'])
+        self.assertEqual(self.request('/jobs/missing')[0], 404)
+
+    def test_queue_limit_and_cancel(self):
+        slow = b'Version,8.5;\nZone,SLOW;'
+        status, running = self.request('/jobs?name=running.idf', slow)
+        for _ in range(200):
+            if self.service.metrics()['running'] == 1:
+                break
+            time.sleep(0.05)
+        status, queued = self.request('/jobs?name=queued.idf', slow)
+        self.service.max_queued = 1
+        self.assertRaises(QueueFullError, self.service.submit, 'refused.idf', io.BytesIO(slow), len(slow))
+        self.assertEqual(self.request('/jobs?name=refused.idf', slow)[0], 503)
+        self.assertEqual(self.request('/jobs/' + running['id'], method='DELETE')[0], 409)
+        self.assertEqual(self.request('/jobs/%s/cancel' % queued['id'], b'')[0], 200)
+        self.assertEqual(self.request('/jobs/%s/cancel' % running['id'], b'')[0], 200)
+        self.assertEqual(self.wait_for(queued['id'])['message'], 'Cancelled')
+        self.assertEqual(self.wait_for(running['id'])['state'], JOB_FAILED)
+        self.assertEqual(self.request('/metrics')[1]['failed'], 2)
@@ -0,0 +1,121 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'IDFVersionUpdater'))
+
+import TransitionWorkspace as transition_workspace_module
+from TransitionWorkspace import TransitionWorkspace, ram_scratch_parent, clone_file, reflink_file
+from TransitionWorkspace import CLONE_COPY, CLONE_REFLINK
+
+
+class TestTransitionWorkspace(unittest.TestCase):
+    def setUp(self):
+        self.transition_dir = tempfile.mkdtemp()
+        for file_name in ['Transition-V8-5-0-to-V8-6-0', 'V8-5-0-Energy+.idd', 'Report Variables 8-5-0 to 8-6-0.csv',
+                          'in.idf', 'in.VCpErr']:
+            with open(os.path.join(self.transition_dir, file_name), 'w') as f:
+                f.write(file_name)
+
+    def tearDown(self):
+        shutil.rmtree(self.transition_dir)
+
+    def test_resources_are_linked(self):
+        with TransitionWorkspace(self.transition_dir) as workspace:
+            self.assertNotEqual(workspace.path, self.transition_dir)
+            self.assertEqual(sorted(os.listdir(workspace.path)),
+                             ['Report Variables 8-5-0 to 8-6-0.csv', 'Transition-V8-5-0-to-V8-6-0',
+                              'V8-5-0-Energy+.idd'])
+            with open(os.path.join(workspace.path, 'V8-5-0-Energy+.idd')) as f:
+                self.assertEqual(f.read(), 'V8-5-0-Energy+.idd')
+            path = workspace.path
+        self.assertFalse(os.path.exists(path))
+        self.assertTrue(os.path.exists(os.path.join(self.transition_dir, 'V8-5-0-Energy+.idd')))
+
+    def test_resources_from_other_installations(self):
+        other_dir = tempfile.mkdtemp()
+        try:
+            for file_name in ['Transition-V8-4-0-to-V8-5-0', 'V8-5-0-Energy+.idd']:
+                with open(os.path.join(other_dir, file_name), 'w') as f:
+                    f.write('other')
+            with TransitionWorkspace(self.transition_dir) as workspace:
+                workspace.add_resources(other_dir)
+                self.assertIn('Transition-V8-4-0-to-V8-5-0', os.listdir(workspace.path))
+                with open(os.path.join(workspace.path, 'V8-5-0-Energy+.idd')) as f:
+                    self.assertEqual(f.read(), 'V8-5-0-Energy+.idd')
+        finally:
+            shutil.rmtree(other_dir)
+
+    def test_workspaces_are_independent(self):
+        first = TransitionWorkspace(self.transition_dir)
+        second = TransitionWorkspace(self.transition_dir)
+        try:
+            self.assertNotEqual(first.create(), second.create())
+            with open(os.path.join(first.path, 'in.idf'), 'w') as f:
+                f.write('first')
+            self.assertFalse(os.path.exists(os.path.join(second.path, 'in.idf')))
+        finally:
+            first.cleanup()
+            second.cleanup()
+
+    def test_parent_directory(self):
+        parent = tempfile.mkdtemp()
+        try:
+            with TransitionWorkspace(self.transition_dir, parent) as workspace:
+                self.assertEqual(os.path.dirname(workspace.path), parent)
+        finally:
+            shutil.rmtree(parent)
+
+
+class TestRamScratchParent(unittest.TestCase):
+    def setUp(self):
+        self.ram_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.ram_dir)
+
+    def test_directory_with_room(self):
+        if not hasattr(os, 'statvfs'):
+            self.skipTest('free space cannot be checked on this platform')
+        self.assertEqual(ram_scratch_parent(1, self.ram_dir), self.ram_dir)
+
+    def test_directory_without_room(self):
+        self.assertIsNone(ram_scratch_parent(2 ** 62, self.ram_dir))
+
+    def test_missing_directory(self):
+        self.assertIsNone(ram_scratch_parent(1, os.path.join(self.ram_dir, 'missing')))
+        self.assertIsNone(ram_scratch_parent(1, None))
+
+
+class TestCloneFile(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.source = os.path.join(self.temp_dir, 'in.idf')
+        with open(self.source, 'w') as f:
+            f.write('Version,8.5;')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_clone_survives_rewriting_the_source_in_place(self):
+        target = os.path.join(self.temp_dir, 'in_8.5.idf')
+        self.assertIn(clone_file(self.source, target), [CLONE_COPY, CLONE_REFLINK])
+        with open(self.source, 'w') as f:
+            f.write('Version,8.6;')
+        with open(target) as f:
+            self.assertEqual(f.read(), 'Version,8.5;')
+
+    def test_copy_fallback(self):
+        target = os.path.join(self.temp_dir, 'in_8.5.idf')
+        saved_fcntl = transition_workspace_module.fcntl
+        try:
+            transition_workspace_module.fcntl = None
+            self.assertFalse(reflink_file(self.source, target))
+            self.assertFalse(os.path.exists(target))
+            self.assertEqual(clone_file(self.source, target), CLONE_COPY)
+        finally:
+            transition_workspace_module.fcntl = saved_fcntl
+        with open(target) as f:
+            self.assertEqual(f.read(), 'Version,8.5;')
@@ -0,0 +1,76 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'IDFVersionUpdater'))
+
+from VersionSniffer import sniff_idf_version, parse_version_string
+
+
+class TestParseVersionString(unittest.TestCase):
+    def test_full_version(self):
+        self.assertEqual(parse_version_string('8.5.0'), (8, 5, 0))
+
+    def test_short_version_is_padded(self):
+        self.assertEqual(parse_version_string(' 9.4 '), (9, 4, 0))
+
+    def test_two_digit_components(self):
+        self.assertEqual(parse_version_string('22.10.1'), (22, 10, 1))
+
+    def test_bad_version(self):
+        with self.assertRaises(ValueError):
+            parse_version_string('x.y.z')
+
+
+class TestSniffIDFVersion(unittest.TestCase):
+    def setUp(self):
+        self.idf_name = tempfile.mktemp()
+
+    def tearDown(self):
+        if os.path.exists(self.idf_name):
+            os.remove(self.idf_name)
+
+    def write(self, contents):
+        with open(self.idf_name, 'w') as f:
+            f.write(contents)
+
+    def test_simple_version(self):
+        self.write("Version,8.5.0;")
+        self.assertEqual(sniff_idf_version(self.idf_name), (8, 5, 0))
+
+    def test_version_after_other_objects_and_comments(self):
+        self.write("! Version,1.0.0;\nBuilding,\n  My Building; ! with Version,2.0; in a comment\n"
+                   "  Version,  !- the version object\n    9.3;      !- Version Identifier\n")
+        self.assertEqual(sniff_idf_version(self.idf_name), (9, 3, 0))
+
+    def test_objects_and_comments_split_across_chunks(self):
+        contents = ("! a long comment with ; and , in it\n" * 20 +
+                    "Zone,\n  Zone One, !- Name\n  0;\n" * 20 +
+                    "VERSION,\n  ! intervening comment\n  22.1.0;\nZone,Last;\n")
+        self.write(contents)
+        for chunk_size in [1, 2, 3, 7, 64, 1024]:
+            self.assertEqual(sniff_idf_version(self.idf_name, chunk_size=chunk_size), (22, 1, 0))
+
+    def test_utf8_byte_order_mark(self):
+        with open(self.idf_name, 'wb') as f:
+            f.write(b'\xef\xbb\xbfVersion,8.5;\nZone,One;\n')
+        for chunk_size in [1, 2, 64]:
+            self.assertEqual(sniff_idf_version(self.idf_name, chunk_size=chunk_size), (8, 5, 0))
+
+    def test_missing_version(self):
+        self.write("Zone,One;\nZone,Two;\n")
+        self.assertIsNone(sniff_idf_version(self.idf_name))
+
+    def test_version_without_fields(self):
+        self.write("Version;\n")
+        self.assertIsNone(sniff_idf_version(self.idf_name))
+
+    def test_bad_version(self):
+        self.write("Version,x.y.z;")
+        with self.assertRaises(ValueError):
+            sniff_idf_version(self.idf_name)
+
+    def test_long_class_name_without_comma_is_skipped(self):
+        self.write("A" * 1000 + "\nVersion;\nVersion,8.9;")
+        self.assertEqual(sniff_idf_version(self.idf_name, chunk_size=16), (8, 9, 0))
@@ -5,6 +5,8 @@ import unittest
 
 sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'IDFVersionUpdater'))
 
+import VersionUpdaterWindow as version_updater_window_module
+from EnergyPlusVersion import EnergyPlusVersion
 from VersionUpdaterWindow import VersionUpdaterWindow
 
 
@@ -16,7 +18,7 @@ class TestGetIDFVersion(unittest.TestCase):
         with open(self.idf_name, 'w') as f:
             f.write("Version,8.5.0;")
         version = VersionUpdaterWindow.get_idf_version(self.idf_name)
-        self.assertEqual(version, 8.5)
+        self.assertEqual(version, EnergyPlusVersion(8, 5))
 
     def test_bad_version_number(self):
         with open(self.idf_name, 'w') as f:
@@ -29,3 +31,29 @@ class TestGetIDFVersion(unittest.TestCase):
             f.write("x,y;")
         version = VersionUpdaterWindow.get_idf_version(self.idf_name)
         self.assertIsNone(version)
+
+
+class TestPreflightThread(unittest.TestCase):
+    def test_unreadable_file_is_reported(self):
+        class FakeEnergyPlusPath(object):
+            transition_directory = tempfile.gettempdir()
+
+        class FakeWindow(object):
+            ep_run_folder = FakeEnergyPlusPath()
+
+            def on_preflight_error(self, message):
+                pass
+
+            def on_preflight_done(self, preflight, path_to_idf, keep_old):
+                pass
+
+        calls = []
+        saved_call_after = version_updater_window_module.wx.CallAfter
+        version_updater_window_module.wx.CallAfter = lambda function, *args: calls.append((function.__name__, args))
+        try:
+            missing = os.path.join(tempfile.mkdtemp(), 'missing.idf')
+            # called on a stand-in for the window, which needs a running wx application to be built
+            VersionUpdaterWindow.__dict__['run_preflight_check'](FakeWindow(), missing, False)
+        finally:
+            version_updater_window_module.wx.CallAfter = saved_call_after
+        self.assertEqual([name for name, args in calls], ['on_preflight_error'])